@@ -0,0 +1,3 @@
+"""
+效能測試套件：產生測試資料、計時各處理階段並與基準結果比較
+"""
@@ -0,0 +1,277 @@
+"""
+效能測試資料產生器：合成來源樹、對應的設定檔與空資料夾樹
+
+所有內容都由固定的亂數種子產生，同一組參數每次產生完全相同的檔案。
+"""
+import os
+import csv
+import random
+from constants import (COL_FILE_PATH, COL_FILE, COL_NEW_NAME, COL_NEW_FOLDER_PATH, COL_NEW_FOLDER_PATH2,
+                       COL_NEW_FOLDER_PATH3, COL_RENAME_FOLDER, CLEANUP_JUNK_PATTERNS)
+
+MANIFEST_COLUMNS = [COL_FILE_PATH, COL_FILE, COL_NEW_NAME, COL_NEW_FOLDER_PATH, COL_NEW_FOLDER_PATH2,
+                    COL_NEW_FOLDER_PATH3, COL_RENAME_FOLDER]
+
+# 寫入檔案內容時每次產生的位元組數
+WRITE_BLOCK = 1024 * 1024
+
+# 產生中日韓檔名使用的字元
+CJK_CHARACTERS = '資料夾檔案報告會議紀錄設計圖面規格書測試結果年度預算日本語テスト한국어파일'
+
+def write_file(path, size, rng):
+    """
+    寫入指定大小的亂數內容檔案
+
+    Args:
+        path: 檔案路徑
+        size: 位元組數
+        rng: random.Random
+    """
+    with open(path, 'wb') as output:
+        remaining = size
+        while remaining > 0:
+            block = min(remaining, WRITE_BLOCK)
+            output.write(rng.randbytes(block))
+            remaining -= block
+
+def cjk_name(rng, length=6):
+    """
+    產生中日韓字元組成的名稱（含空白與特殊符號）
+
+    Args:
+        rng: random.Random
+        length: 字元數
+
+    Returns:
+        str: 名稱
+    """
+    name = ''.join(rng.choice(CJK_CHARACTERS) for _ in range(length))
+    return f"{name} （{rng.randint(1, 999)}）"
+
+def file_row(source_dir, file_name, target_paths, new_name=None):
+    """
+    建立檔案複製的設定檔資料列
+
+    Args:
+        source_dir: 來源資料夾
+        file_name: 來源檔案名稱
+        target_paths: 目標路徑列表（最多三個）
+        new_name: 新檔案名稱（不含副檔名）
+
+    Returns:
+        dict: 資料列
+    """
+    targets = list(target_paths) + [None] * (3 - len(target_paths))
+    return {
+        COL_FILE_PATH: source_dir,
+        COL_FILE: file_name,
+        COL_NEW_NAME: new_name,
+        COL_NEW_FOLDER_PATH: targets[0],
+        COL_NEW_FOLDER_PATH2: targets[1],
+        COL_NEW_FOLDER_PATH3: targets[2],
+        COL_RENAME_FOLDER: None,
+    }
+
+def folder_row(source_dir, target_paths):
+    """
+    建立資料夾複製的設定檔資料列
+
+    Args:
+        source_dir: 來源資料夾
+        target_paths: 目標路徑列表（最多三個）
+
+    Returns:
+        dict: 資料列
+    """
+    row = file_row(source_dir, None, target_paths)
+    row[COL_FILE] = None
+    return row
+
+def write_manifest(path, rows, manifest_format='csv'):
+    """
+    寫入設定檔
+
+    Args:
+        path: 設定檔路徑（不含副檔名）
+        rows: 資料列列表
+        manifest_format: csv 或 xlsx（xlsx 需要 openpyxl）
+
+    Returns:
+        str: 設定檔完整路徑
+    """
+    if manifest_format == 'xlsx':
+        from openpyxl import Workbook
+
+        manifest_path = path + '.xlsx'
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(MANIFEST_COLUMNS)
+        for row in rows:
+            sheet.append([row[column] for column in MANIFEST_COLUMNS])
+        workbook.save(manifest_path)
+        return manifest_path
+
+    manifest_path = path + '.csv'
+    with open(manifest_path, 'w', newline='', encoding='utf-8') as manifest_file:
+        writer = csv.DictWriter(manifest_file, fieldnames=MANIFEST_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return manifest_path
+
+def generate_small_files(base, scale=1.0, seed=0):
+    """
+    大量小檔案：每個檔案複製到一個目標
+
+    Args:
+        base: 場景資料夾
+        scale: 規模倍數
+        seed: 亂數種子
+
+    Returns:
+        list: 設定檔資料列
+    """
+    rng = random.Random(seed)
+    source = os.path.join(base, 'src')
+    os.makedirs(source, exist_ok=True)
+    rows = []
+    for index in range(max(1, int(2000 * scale))):
+        name = f"small_{index:06d}.dat"
+        write_file(os.path.join(source, name), rng.randint(512, 8192), rng)
+        rows.append(file_row(source, name, [os.path.join(base, 'out', 'small')]))
+    return rows
+
+def generate_large_files(base, scale=1.0, seed=0):
+    """
+    少量大檔案：每個檔案複製到兩個目標
+
+    Args:
+        base: 場景資料夾
+        scale: 規模倍數
+        seed: 亂數種子
+
+    Returns:
+        list: 設定檔資料列
+    """
+    rng = random.Random(seed)
+    source = os.path.join(base, 'src')
+    os.makedirs(source, exist_ok=True)
+    rows = []
+    for index in range(4):
+        name = f"large_{index}.bin"
+        write_file(os.path.join(source, name), max(1, int(64 * 1024 * 1024 * scale)), rng)
+        rows.append(file_row(source, name, [os.path.join(base, 'out', 'a'), os.path.join(base, 'out', 'b')]))
+    return rows
+
+def generate_deep_nesting(base, scale=1.0, seed=0):
+    """
+    深層巢狀資料夾：以資料夾複製操作複製整棵樹
+
+    Args:
+        base: 場景資料夾
+        scale: 規模倍數
+        seed: 亂數種子
+
+    Returns:
+        list: 設定檔資料列
+    """
+    rng = random.Random(seed)
+    source = os.path.join(base, 'src', 'tree')
+    branches = max(1, int(8 * scale))
+    for branch in range(branches):
+        path = os.path.join(source, f"branch_{branch}")
+        for depth in range(16):
+            path = os.path.join(path, f"level_{depth:02d}")
+            os.makedirs(path, exist_ok=True)
+            for index in range(4):
+                write_file(os.path.join(path, f"f{index}.txt"), rng.randint(100, 4096), rng)
+    return [folder_row(source, [os.path.join(base, 'out', 'deep')])]
+
+def generate_cjk_names(base, scale=1.0, seed=0):
+    """
+    中日韓檔名：來源與新名稱都含中日韓字元與特殊符號
+
+    Args:
+        base: 場景資料夾
+        scale: 規模倍數
+        seed: 亂數種子
+
+    Returns:
+        list: 設定檔資料列
+    """
+    rng = random.Random(seed)
+    source = os.path.join(base, 'src', cjk_name(rng))
+    os.makedirs(source, exist_ok=True)
+    target = os.path.join(base, 'out', cjk_name(rng))
+    rows = []
+    used = set()
+    for index in range(max(1, int(1000 * scale))):
+        name = f"{cjk_name(rng)}_{index}.txt"
+        if name in used:
+            continue
+        used.add(name)
+        write_file(os.path.join(source, name), rng.randint(256, 4096), rng)
+        rows.append(file_row(source, name, [target], new_name=f"{cjk_name(rng)}_{index}"))
+    return rows
+
+def generate_multi_target(base, scale=1.0, seed=0):
+    """
+    多目標資料列：每個檔案同時複製到三個目標
+
+    Args:
+        base: 場景資料夾
+        scale: 規模倍數
+        seed: 亂數種子
+
+    Returns:
+        list: 設定檔資料列
+    """
+    rng = random.Random(seed)
+    source = os.path.join(base, 'src')
+    os.makedirs(source, exist_ok=True)
+    targets = [os.path.join(base, 'out', f"target_{index}") for index in range(3)]
+    rows = []
+    for index in range(max(1, int(500 * scale))):
+        name = f"multi_{index:05d}.dat"
+        write_file(os.path.join(source, name), rng.randint(4096, 256 * 1024), rng)
+        rows.append(file_row(source, name, targets))
+    return rows
+
+# 場景名稱 -> 來源樹與設定檔產生函數
+PIPELINE_SCENARIOS = {
+    'small_files': generate_small_files,
+    'large_files': generate_large_files,
+    'deep_nesting': generate_deep_nesting,
+    'cjk_names': generate_cjk_names,
+    'multi_target': generate_multi_target,
+}
+
+def generate_empty_forest(root, scale=1.0, seed=0, fanout=4, depth=6):
+    """
+    產生空資料夾樹：大部分葉節點為空，部分含一般檔案或可忽略的系統檔案
+
+    Args:
+        root: 根目錄
+        scale: 規模倍數（調整根目錄下的子樹數量）
+        seed: 亂數種子
+        fanout: 每個資料夾的子資料夾數量
+        depth: 樹的深度
+
+    Returns:
+        int: 產生的資料夾數量
+    """
+    rng = random.Random(seed)
+    count = 0
+    stack = [(os.path.join(root, f"tree_{index}"), depth) for index in range(max(1, int(4 * scale)))]
+    while stack:
+        path, level = stack.pop()
+        os.makedirs(path, exist_ok=True)
+        count += 1
+        if level == 0:
+            roll = rng.random()
+            if roll < 0.15:
+                open(os.path.join(path, 'keep.txt'), 'w').close()
+            elif roll < 0.3:
+                open(os.path.join(path, rng.choice(CLEANUP_JUNK_PATTERNS)), 'w').close()
+            continue
+        stack.extend((os.path.join(path, f"d{index}"), level - 1) for index in range(fanout))
+    return count
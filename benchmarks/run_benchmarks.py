@@ -0,0 +1,300 @@
+"""
+效能測試執行程式：計時搬移／複製流程與空資料夾清理，將結果寫入 JSON 並與基準結果比較
+
+在專案根目錄執行：
+    python -m benchmarks.run_benchmarks --repeat 3 --output 結果.json --baseline 基準.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import tempfile
+from constants import APP_VERSION, CLEANUP_JUNK_PATTERNS
+from excel_processor import ExcelProcessor
+from dir_cleaner import EmptyDirectoryCleaner
+from parallel_executor import default_worker_count
+from benchmarks.generators import PIPELINE_SCENARIOS, generate_empty_forest, write_manifest
+
+CLEANUP_SCENARIOS = ('cleanup_serial', 'cleanup_parallel')
+RESULT_VERSION = 1
+
+def default_workdir():
+    """
+    取得預設的工作資料夾：有 /dev/shm（tmpfs）時使用，避免磁碟快取狀態影響結果
+
+    Returns:
+        str: 資料夾路徑
+    """
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+def quiet_log(message, level=None):
+    """
+    效能測試時不輸出處理日誌
+
+    Args:
+        message: 訊息內容
+        level: 日誌層級
+    """
+
+def run_pipeline(name, base, args):
+    """
+    以 ExcelProcessor 執行一個流程場景，每次重複前刪除上次的輸出
+
+    Args:
+        name: 場景名稱
+        base: 場景資料夾
+        args: 命令行參數
+
+    Returns:
+        dict: 場景結果
+    """
+    generate = PIPELINE_SCENARIOS[name]
+    start = time.perf_counter()
+    rows = generate(base, args.scale, args.seed)
+    manifest = write_manifest(os.path.join(base, 'manifest'), rows, args.manifest_format)
+    generate_seconds = time.perf_counter() - start
+
+    runs = []
+    for _ in range(args.repeat):
+        shutil.rmtree(os.path.join(base, 'out'), ignore_errors=True)
+        report_path = os.path.join(base, 'report.json')
+        processor = ExcelProcessor(
+            log_callback=quiet_log,
+            confirm_delete_callback=lambda message: False,
+            max_workers=args.workers,
+            report_path=report_path,
+            journal_path=os.path.join(base, 'journal.jsonl')
+        )
+        start = time.perf_counter()
+        success = processor.read_and_process_excel(manifest)
+        elapsed = time.perf_counter() - start
+        with open(report_path, encoding='utf-8') as report_file:
+            report = json.load(report_file)
+        runs.append({
+            'success': bool(success),
+            'elapsed_seconds': elapsed,
+            'stages': report.get('stages', {}),
+            'files_copied': report.get('files_copied', 0),
+            'bytes_copied': report.get('bytes_copied', 0),
+            'errors': report.get('errors', {}),
+        })
+
+    result = summarize(runs)
+    result.update({
+        'rows': len(rows),
+        'generate_seconds': round(generate_seconds, 6),
+        'files_copied': runs[-1]['files_copied'],
+        'bytes_copied': runs[-1]['bytes_copied'],
+        'errors': runs[-1]['errors'],
+        'success': all(run['success'] for run in runs),
+    })
+    median = result['elapsed_seconds']
+    if median > 0:
+        result['files_per_second'] = round(result['files_copied'] / median, 1)
+        result['bytes_per_second'] = round(result['bytes_copied'] / median, 1)
+    return result
+
+def run_cleanup(name, base, args):
+    """
+    執行空資料夾清理場景，每次重複前重新產生空資料夾樹
+
+    Args:
+        name: cleanup_serial（單執行緒）或 cleanup_parallel（多執行緒）
+        base: 場景資料夾
+        args: 命令行參數
+
+    Returns:
+        dict: 場景結果
+    """
+    workers = 1 if name == 'cleanup_serial' else (args.workers or default_worker_count())
+    runs = []
+    directories = 0
+    for _ in range(args.repeat):
+        root = os.path.join(base, 'forest')
+        shutil.rmtree(root, ignore_errors=True)
+        directories = generate_empty_forest(root, args.scale, args.seed)
+        cleaner = EmptyDirectoryCleaner(CLEANUP_JUNK_PATTERNS, quiet_log, max_workers=workers)
+        start = time.perf_counter()
+        removed = cleaner.clean(root)
+        elapsed = time.perf_counter() - start
+        runs.append({
+            'success': True,
+            'elapsed_seconds': elapsed,
+            'stages': {'cleanup': elapsed},
+            'directories_removed': removed,
+            'directories_scanned': cleaner.directories_scanned,
+        })
+
+    result = summarize(runs)
+    result.update({
+        'workers': workers,
+        'directories': directories,
+        'directories_removed': runs[-1]['directories_removed'],
+        'success': True,
+    })
+    if result['elapsed_seconds'] > 0:
+        result['directories_per_second'] = round(runs[-1]['directories_scanned'] / result['elapsed_seconds'], 1)
+    return result
+
+def summarize(runs):
+    """
+    計算多次執行的中位數與最短耗時
+
+    Args:
+        runs: 每次執行的結果列表
+
+    Returns:
+        dict: 彙總結果
+    """
+    elapsed = [run['elapsed_seconds'] for run in runs]
+    stage_names = sorted({name for run in runs for name in run['stages']})
+    return {
+        'repeat': len(runs),
+        'elapsed_seconds': round(statistics.median(elapsed), 6),
+        'min_seconds': round(min(elapsed), 6),
+        'max_seconds': round(max(elapsed), 6),
+        'stages': {name: round(statistics.median(run['stages'].get(name, 0.0) for run in runs), 6)
+                   for name in stage_names},
+    }
+
+def compare_results(results, baseline, threshold):
+    """
+    將本次結果與基準結果比較（以中位數耗時）
+
+    Args:
+        results: 本次的場景結果
+        baseline: 基準結果檔的內容
+        threshold: 容許變慢的比例（0.1 表示 10%）
+
+    Returns:
+        tuple: (比較結果列表, 是否有場景變慢超過容許比例)
+    """
+    comparisons = []
+    regressed = False
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous.get('elapsed_seconds'):
+            continue
+        ratio = result['elapsed_seconds'] / previous['elapsed_seconds']
+        is_regression = ratio > 1 + threshold
+        regressed = regressed or is_regression
+        comparisons.append({
+            'scenario': name,
+            'baseline_seconds': previous['elapsed_seconds'],
+            'current_seconds': result['elapsed_seconds'],
+            'ratio': round(ratio, 3),
+            'regression': is_regression,
+        })
+    return comparisons, regressed
+
+def parse_arguments(argv=None):
+    """
+    解析命令行參數
+
+    Args:
+        argv: 參數列表，None 時使用 sys.argv
+
+    Returns:
+        argparse.Namespace: 解析後的參數
+    """
+    scenarios = list(PIPELINE_SCENARIOS) + list(CLEANUP_SCENARIOS)
+    parser = argparse.ArgumentParser(description='檔案管理工具效能測試')
+    parser.add_argument('--scenarios', default=','.join(scenarios),
+                        help=f"要執行的場景，以逗號分隔（可用: {', '.join(scenarios)}）")
+    parser.add_argument('--scale', type=float, default=1.0, help='測試資料規模倍數')
+    parser.add_argument('--repeat', type=int, default=3, help='每個場景重複次數（取中位數）')
+    parser.add_argument('--seed', type=int, default=0, help='產生測試資料的亂數種子')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='工作執行緒數量，預設依 CPU 數量決定')
+    parser.add_argument('--manifest-format', choices=('csv', 'xlsx'), default='csv',
+                        help='設定檔格式（xlsx 需要 openpyxl）')
+    parser.add_argument('--workdir', default=None, help='測試資料所在的資料夾，預設為 /dev/shm 或系統暫存資料夾')
+    parser.add_argument('--keep', action='store_true', help='保留測試資料')
+    parser.add_argument('--output', default='benchmark_results.json', help='結果 JSON 檔路徑')
+    parser.add_argument('--baseline', default=None, help='基準結果 JSON 檔，比較後有場景變慢超過容許比例時結束碼為 1')
+    parser.add_argument('--threshold', type=float, default=0.10, help='容許變慢的比例（預設 0.10）')
+    args = parser.parse_args(argv)
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in args.scenarios if name not in scenarios]
+    if unknown:
+        parser.error(f"未知的場景: {', '.join(unknown)}")
+    if args.repeat < 1:
+        parser.error('--repeat 必須大於 0')
+    return args
+
+def main(argv=None):
+    """
+    效能測試主函數
+
+    Args:
+        argv: 參數列表，None 時使用 sys.argv
+
+    Returns:
+        int: 結束碼
+    """
+    args = parse_arguments(argv)
+    workdir = tempfile.mkdtemp(prefix='file_mover_bench_', dir=args.workdir or default_workdir())
+    print(f"測試資料夾: {workdir}")
+
+    results = {}
+    try:
+        for name in args.scenarios:
+            base = os.path.join(workdir, name)
+            os.makedirs(base, exist_ok=True)
+            print(f"執行場景 {name} ...", flush=True)
+            if name in CLEANUP_SCENARIOS:
+                results[name] = run_cleanup(name, base, args)
+            else:
+                results[name] = run_pipeline(name, base, args)
+            result = results[name]
+            status = '' if result['success'] else '（有失敗的執行）'
+            print(f"  中位數 {result['elapsed_seconds']:.3f} 秒，最短 {result['min_seconds']:.3f} 秒{status}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        'version': RESULT_VERSION,
+        'meta': {
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'app_version': APP_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'workdir': args.workdir or default_workdir(),
+            'scale': args.scale,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'workers': args.workers,
+            'manifest_format': args.manifest_format,
+        },
+        'results': results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        comparisons, regressed = compare_results(results, baseline, args.threshold)
+        output['comparison'] = {'baseline': args.baseline, 'threshold': args.threshold, 'scenarios': comparisons}
+        print(f"與基準結果比較（容許變慢 {args.threshold:.0%}）:")
+        for item in comparisons:
+            mark = '  變慢' if item['regression'] else ''
+            print(f"  {item['scenario']}: {item['baseline_seconds']:.3f} 秒 -> "
+                  f"{item['current_seconds']:.3f} 秒（{item['ratio']:.2f} 倍）{mark}")
+        if regressed:
+            exit_code = 1
+
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump(output, output_file, ensure_ascii=False, indent=2)
+    print(f"結果已寫入: {args.output}")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,8 +3,15 @@
 """
 import os
 import sys
+import time
 import argparse
-from utils import clean_empty_directories, normalize_path
+from constants import CLEANUP_JUNK_PATTERNS
+from utils import normalize_path
+from dir_cleaner import EmptyDirectoryCleaner
+from tree_snapshot import TreeSnapshot
+from profiling import Profiler, span
+from parallel_executor import default_worker_count
+from metrics import RunMetrics
 
 def main():
     """
@@ -14,6 +21,17 @@ def main():
     parser.add_argument('path', help='要清理的資料夾路徑')
     parser.add_argument('--recursive', '-r', action='store_true', help='是否遞歸清理子資料夾')
     parser.add_argument('--verbose', '-v', action='store_true', help='輸出詳細資訊')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='同時列出目錄的工作執行緒數量（預設依 CPU 數量決定，1 表示單執行緒）')
+    parser.add_argument('--snapshot', default=None, metavar='PATH',
+                        help='目錄樹快照檔：沿用上次的掃描結果，只重新列出修改時間有變更的資料夾')
+    parser.add_argument('--profile', default=None, metavar='PATH',
+                        help='以 cProfile 分析執行效能，統計寫入指定檔案，摘要寫入 <PATH>.txt')
+    parser.add_argument('--report', default=None, help='將執行統計寫入指定的 JSON 報告檔')
+    parser.add_argument('--ignore-junk', action='store_true',
+                        help=f"只含系統檔案（{', '.join(CLEANUP_JUNK_PATTERNS)}）的資料夾也視為空資料夾")
+    parser.add_argument('--junk-pattern', action='append', default=[], metavar='PATTERN',
+                        help='其他可忽略的檔名樣式（萬用字元，可重複指定）')
 
     args = parser.parse_args()
     
@@ -27,6 +45,22 @@ def main():
     # 顯示開始訊息
     print(f"開始清理空資料夾: {path}")
     print(f"遞歸模式: {'開啟' if args.recursive else '關閉'}")
+    workers = args.workers if args.workers else default_worker_count()
+    if args.recursive:
+        print(f"工作執行緒: {workers}")
+    
+    junk_patterns = list(CLEANUP_JUNK_PATTERNS) if args.ignore_junk else []
+    junk_patterns += args.junk_pattern
+    if junk_patterns:
+        print(f"可忽略的檔案: {', '.join(junk_patterns)}")
+    
+    snapshot = None
+    if args.snapshot and args.recursive:
+        snapshot = TreeSnapshot(args.snapshot, path, junk_patterns)
+        if snapshot.load():
+            print(f"使用目錄樹快照: {args.snapshot}")
+        else:
+            print(f"沒有可沿用的目錄樹快照，將完整掃描並建立: {args.snapshot}")
     
     # 定義日誌函數
     def log_message(msg):
@@ -34,9 +68,48 @@ def main():
             print(msg)
     
     # 執行清理
+    metrics = RunMetrics()
+    cleaner = EmptyDirectoryCleaner(junk_patterns, log_message, max_workers=workers, snapshot=snapshot)
+    profiler = Profiler(args.profile) if args.profile else None
+    if profiler:
+        profiler.start()
     try:
-        deleted_count = clean_empty_directories(path, args.recursive, log_message)
+        start = time.perf_counter()
+        try:
+            with metrics.stage('cleanup'), span('clean_empty_directories'):
+                deleted_count = cleaner.clean(path, args.recursive)
+        finally:
+            if profiler:
+                if profiler.stop():
+                    print(f"效能分析已寫入: {args.profile}（摘要: {profiler.summary_path}）")
+                else:
+                    print(f"無法寫入效能分析: {args.profile}")
+        elapsed = time.perf_counter() - start
+        metrics.finish()
+        scan_rate = cleaner.directories_scanned / elapsed if elapsed > 0 else 0.0
         print(f"清理完成！已刪除 {deleted_count} 個空資料夾")
+        print(f"已掃描 {cleaner.directories_scanned} 個資料夾（每秒 {scan_rate:.0f} 個）")
+        if snapshot is not None:
+            print(f"沿用快照 {snapshot.reused} 個資料夾，重新列出 {snapshot.listed} 個")
+            if not snapshot.save():
+                print(f"無法寫入目錄樹快照: {args.snapshot}")
+        for line in metrics.format_summary():
+            print(line)
+        if args.report:
+            extra = {
+                'path': path,
+                'deleted_directories': deleted_count,
+                'junk_files_removed': cleaner.junk_files_removed,
+                'directories_scanned': cleaner.directories_scanned,
+                'directories_per_second': round(scan_rate, 1),
+                'workers': workers,
+            }
+            if snapshot is not None:
+                extra['snapshot'] = {'path': args.snapshot, 'reused': snapshot.reused, 'listed': snapshot.listed}
+            if metrics.write_report(args.report, extra):
+                print(f"執行報告已寫入: {args.report}")
+            else:
+                print(f"無法寫入執行報告: {args.report}")
         return 0
     except Exception as e:
         print(f"清理過程中發生錯誤: {e}")
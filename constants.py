@@ -11,5 +11,102 @@ COL_NEW_FOLDER_PATH2 = 'New Folder Path 2'
 COL_NEW_FOLDER_PATH3 = 'New Folder Path 3'
 COL_RENAME_FOLDER = 'Rename Folder'
 
+# 平行處理設定
+MAX_DEFAULT_WORKERS = 32  # 預設工作執行緒數量的上限
+
+# 路徑正規化快取的最大項目數
+PATH_CACHE_SIZE = 65536
+
+# 檔案複製設定
+COPY_CHUNK_SIZE = 1024 * 1024  # 分段複製時每次讀取的位元組數
+
+# 檔案複製方式
+COPY_BACKEND_AUTO = 'auto'  # 依序嘗試 reflink、copy_file_range、sendfile、分段緩衝複製
+COPY_BACKEND_REFLINK = 'reflink'
+COPY_BACKEND_COPY_FILE_RANGE = 'copy_file_range'
+COPY_BACKEND_SENDFILE = 'sendfile'
+COPY_BACKEND_BUFFERED = 'buffered'
+COPY_BACKEND_FANOUT = 'fanout'  # 多目標時讀取一次、同時寫入（僅用於統計）
+COPY_BACKENDS = (
+    COPY_BACKEND_AUTO,
+    COPY_BACKEND_REFLINK,
+    COPY_BACKEND_COPY_FILE_RANGE,
+    COPY_BACKEND_SENDFILE,
+    COPY_BACKEND_BUFFERED,
+)
+
+# 多目標連結模式：同一檔案系統上的多個目標只實際複製一次，其他目標以連結建立
+LINK_MODE_OFF = 'off'  # 每個目標都實際複製
+LINK_MODE_HARDLINK = 'hardlink'  # 以硬連結建立（各目標共用同一個檔案）
+LINK_MODE_REFLINK = 'reflink'  # 以 reflink 建立（共用資料區塊，修改時各自獨立）
+LINK_MODES = (LINK_MODE_OFF, LINK_MODE_HARDLINK, LINK_MODE_REFLINK)
+
+# 目標資料夾已存在時的處理方式
+FOLDER_SYNC_REPLACE = 'replace'  # 刪除後重新複製
+FOLDER_SYNC_INCREMENTAL = 'incremental'  # 只複製新增或變更的檔案
+FOLDER_SYNC_MODES = (FOLDER_SYNC_REPLACE, FOLDER_SYNC_INCREMENTAL)
+SYNC_MTIME_TOLERANCE = 2.0  # 修改時間差距在此秒數內視為相同（FAT 等檔案系統只有 2 秒精度）
+
+# I/O 排程設定
+IO_DEVICE_LIMIT = 4  # 每個儲存裝置同時進行的複製操作數量預設上限
+IO_ROTATIONAL_LIMIT = 1  # 傳統（旋轉式）硬碟同時進行的複製操作數量上限
+IO_PATH_CACHE_SIZE = 65536  # 記錄路徑所屬裝置分組的數量上限，超過時清除重新判斷
+
+# 日誌設定
+LOG_MAX_LINES = 5000  # 日誌視窗與緩衝區最多保留的行數
+LOG_FILE_BATCH = 200  # 累積多少行日誌才寫入日誌檔
+LOG_FLUSH_INTERVAL_MS = 100  # GUI 批次更新日誌視窗的間隔（毫秒）
+LOG_FILE_NAME = 'file_mover.log'  # GUI 的完整日誌檔名稱（位於程式目錄）
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024  # 日誌檔超過此大小時輪替（0 為不輪替）
+LOG_FILE_BACKUP_COUNT = 3  # 輪替時保留的舊日誌檔數量（.1 為最新）
+
+# 執行統計設定
+LATENCY_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000)  # 操作延遲分布的分組上限（毫秒）
+METRICS_SUMMARY_TARGETS = 10  # 統計摘要最多列出的目標數
+REPORT_SUFFIX = '_report.json'  # 預設執行報告檔名：<設定檔名稱>_report.json，位於設定檔旁
+
+# 複製驗證的雜湊演算法（xxh64、xxh3_128 需要安裝 xxhash 套件）
+HASH_BLAKE2B = 'blake2b'
+HASH_SHA256 = 'sha256'
+HASH_XXH64 = 'xxh64'
+HASH_XXH3_128 = 'xxh3_128'
+HASH_ALGORITHMS = (HASH_BLAKE2B, HASH_SHA256, HASH_XXH64, HASH_XXH3_128)
+
+# 操作紀錄（journal）設定
+JOURNAL_SUFFIX = '_journal.jsonl'  # 預設紀錄檔名：<設定檔名稱>_journal.jsonl，位於設定檔旁
+JOURNAL_FSYNC_BATCH = 256  # 累積多少筆紀錄 fsync 一次
+JOURNAL_FSYNC_INTERVAL = 1.0  # 距上次 fsync 超過此秒數時立即 fsync
+
+# 來源檢查設定
+SOURCE_SUGGESTION_COUNT = 3  # 來源不存在時最多提示的相近名稱數量
+SOURCE_SUGGESTION_CUTOFF = 0.6  # 相近名稱的最低相似度（0~1）
+
+# 內容索引設定
+CONTENT_INDEX_VERSION = 1  # 內容索引資料庫格式版本
+CONTENT_INDEX_COMMIT_BATCH = 500  # 累積多少筆紀錄提交一次
+CONTENT_INDEX_MTIME_GUARD = 2.0  # 修改時間距現在不到此秒數的檔案可能仍在寫入，不記錄
+
+# 空資料夾清理設定
+CLEANUP_JUNK_PATTERNS = ('Thumbs.db', '.DS_Store', 'desktop.ini')  # 預設可忽略的系統檔案
+SNAPSHOT_VERSION = 1  # 目錄樹快照格式版本
+SNAPSHOT_MTIME_GUARD = 2.0  # 修改時間距上次掃描開始不到此秒數的目錄一律重新列出
+
+# 命令行刪除原始資料的方式
+DELETE_KEEP = 'keep'  # 保留原始資料
+DELETE_ASK = 'ask'  # 在終端機詢問
+DELETE_YES = 'yes'  # 直接刪除（搬移模式）
+DELETE_POLICIES = (DELETE_KEEP, DELETE_ASK, DELETE_YES)
+
+# 監看資料夾設定
+WATCH_EXTENSIONS = ('.xlsx', '.xlsm', '.csv')  # 要處理的設定檔副檔名
+WATCH_POLL_INTERVAL = 2.0  # 檢查收件資料夾的間隔秒數（使用 inotify 時為最長等待時間）
+WATCH_SETTLE_SECONDS = 2.0  # 設定檔修改後需經過多少秒才視為寫入完成
+WATCH_PROCESSING_DIR = 'processing'  # 處理中的設定檔所在的子資料夾
+WATCH_DONE_DIR = 'done'  # 處理成功的設定檔移入的子資料夾
+WATCH_FAILED_DIR = 'failed'  # 處理失敗的設定檔移入的子資料夾
+
+# 效能分析設定
+PROFILE_TOP_FUNCTIONS = 30  # 效能分析摘要中列出的函數數量
+
 # 應用程式版本
 APP_VERSION = "V5.0"  # 更新版本號，包含空資料夾清理功能
\ No newline at end of file
@@ -0,0 +1,381 @@
+"""
+內容索引模組：以 SQLite 持久記錄來源與目標檔案的狀態與雜湊值，跨執行略過內容未變更的複製
+
+每個檔案以 (裝置, inode, 大小, 修改時間) 識別，任一項改變即視為內容可能已變更，
+索引中的雜湊值與複製來源紀錄隨之失效。由本程式複製的目標會記錄當時來源的識別，
+只要兩者都沒有變更，下次執行只需兩次 stat 與一次查詢即可確認目標內容相同，不必讀取檔案。
+"""
+import os
+import time
+import logging
+import sqlite3
+import threading
+from constants import (HASH_BLAKE2B, COPY_CHUNK_SIZE, CONTENT_INDEX_VERSION, CONTENT_INDEX_COMMIT_BATCH,
+                       CONTENT_INDEX_MTIME_GUARD)
+from verification import hash_file
+from log_sink import emit_log, supports_level
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE IF NOT EXISTS files ("
+    "path TEXT PRIMARY KEY, device INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER, "
+    "digest TEXT, origin TEXT)",
+)
+
+def file_identity(stat_result):
+    """
+    取得檔案的識別（任一項改變即視為內容可能已變更）
+
+    Args:
+        stat_result: os.stat 的結果
+
+    Returns:
+        tuple: (裝置, inode, 大小, 修改時間奈秒)
+    """
+    return (stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+
+def _origin_key(stat_result):
+    """
+    將來源檔案的識別轉換為儲存在目標紀錄中的字串
+
+    Args:
+        stat_result: 來源檔案的 os.stat 結果
+
+    Returns:
+        str: 識別字串
+    """
+    return ':'.join(str(value) for value in file_identity(stat_result))
+
+class ContentIndex:
+    """
+    持久化的檔案內容索引
+
+    可由多個執行緒（以及多個處理器）共用；雜湊值在鎖外計算，資料庫存取以鎖保護並批次提交。
+    """
+    def __init__(self, path, algorithm=HASH_BLAKE2B, chunk_size=COPY_CHUNK_SIZE, log_callback=None):
+        """
+        初始化內容索引
+
+        Args:
+            path: SQLite 資料庫檔案路徑
+            algorithm: 雜湊演算法名稱（更換演算法時清除索引）
+            chunk_size: 計算雜湊值時每次讀取的位元組數
+            log_callback: 日誌輸出回呼函數
+        """
+        self.path = path
+        self.algorithm = algorithm
+        self.chunk_size = chunk_size
+        self.log_callback = log_callback
+        self._connection = None
+        self._pending_writes = 0
+        self._lock = threading.Lock()
+        self.reset_report()
+
+    @supports_level
+    def log_message(self, message, level=logging.INFO):
+        """
+        輸出日誌訊息
+
+        Args:
+            message: 訊息內容
+            level: 日誌層級
+        """
+        if self.log_callback:
+            emit_log(self.log_callback, message, level)
+        else:
+            print(message)
+
+    def open(self):
+        """
+        開啟索引資料庫，版本或雜湊演算法不同時清除舊的紀錄
+
+        Returns:
+            bool: 開啟成功返回True，否則返回False
+        """
+        if self._connection is not None:
+            return True
+        try:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+            if meta.get('version') != str(CONTENT_INDEX_VERSION) or meta.get('algorithm') != self.algorithm:
+                if meta:
+                    self.log_message(f"內容索引的版本或雜湊演算法不同，已清除舊的紀錄: {self.path}", logging.WARNING)
+                connection.execute("DELETE FROM files")
+                connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                       [('version', str(CONTENT_INDEX_VERSION)), ('algorithm', self.algorithm)])
+            connection.commit()
+        except sqlite3.Error as e:
+            self.log_message(f"無法開啟內容索引 {self.path}，本次執行不使用索引: {e}", logging.WARNING)
+            return False
+        self._connection = connection
+        return True
+
+    def close(self):
+        """
+        提交尚未寫入的紀錄並關閉資料庫
+        """
+        with self._lock:
+            connection, self._connection = self._connection, None
+            if connection is None:
+                return
+            try:
+                connection.commit()
+                connection.close()
+            except sqlite3.Error as e:
+                self.log_message(f"無法寫入內容索引 {self.path}: {e}", logging.WARNING)
+
+    def _key(self, path):
+        """
+        取得路徑在索引中的鍵值
+
+        Args:
+            path: 檔案路徑
+
+        Returns:
+            str: 正規化的絕對路徑
+        """
+        return os.path.normcase(os.path.abspath(path))
+
+    def _lookup(self, path, stat_result):
+        """
+        查詢檔案的紀錄，檔案狀態與紀錄不符時視為沒有紀錄
+
+        Args:
+            path: 檔案路徑
+            stat_result: 檔案目前的 os.stat 結果
+
+        Returns:
+            tuple: (雜湊值, 複製來源識別)，沒有有效紀錄時為 None
+        """
+        with self._lock:
+            if self._connection is None:
+                return None
+            try:
+                row = self._connection.execute(
+                    "SELECT device, inode, size, mtime_ns, digest, origin FROM files WHERE path = ?",
+                    (self._key(path),)
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+        if row is None or tuple(row[:4]) != file_identity(stat_result):
+            return None
+        return row[4], row[5]
+
+    def _store(self, path, stat_result, digest=None, origin=None):
+        """
+        寫入檔案的紀錄（修改時間太接近現在的檔案可能仍在寫入，不記錄）
+
+        Args:
+            path: 檔案路徑
+            stat_result: 計算雜湊值前的 os.stat 結果
+            digest: 雜湊值
+            origin: 複製來源識別
+        """
+        if time.time() - stat_result.st_mtime < CONTENT_INDEX_MTIME_GUARD:
+            return
+        with self._lock:
+            if self._connection is None:
+                return
+            try:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO files (path, device, inode, size, mtime_ns, digest, origin) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self._key(path),) + file_identity(stat_result) + (digest, origin)
+                )
+                self._pending_writes += 1
+                if self._pending_writes >= CONTENT_INDEX_COMMIT_BATCH:
+                    self._connection.commit()
+                    self._pending_writes = 0
+            except sqlite3.Error as e:
+                self.log_message(f"無法寫入內容索引: {e}", logging.DEBUG)
+
+    def digest(self, path, stat_result=None):
+        """
+        取得檔案的雜湊值，索引中有效的紀錄直接使用，否則計算後寫入索引
+
+        Args:
+            path: 檔案路徑
+            stat_result: 檔案的 os.stat 結果，None 時重新取得
+
+        Returns:
+            str: 十六進位雜湊值
+        """
+        if stat_result is None:
+            stat_result = os.stat(path)
+        record = self._lookup(path, stat_result)
+        if record is not None and record[0]:
+            with self._lock:
+                self.index_hits += 1
+            return record[0]
+
+        digest = hash_file(path, self.algorithm, self.chunk_size)
+        with self._lock:
+            self.files_hashed += 1
+        # 計算期間檔案被修改時不記錄
+        if file_identity(os.stat(path)) == file_identity(stat_result):
+            self._store(path, stat_result, digest, record[1] if record else None)
+        return digest
+
+    def is_identical(self, source_file, target_file):
+        """
+        判斷目標檔案的內容是否與來源檔案相同
+
+        大小不同時直接判定不同；目標由本程式從未變更的來源複製且之後未被修改時直接判定相同；
+        其他情況比對兩者的雜湊值（索引中有效的雜湊值不必重新計算）。
+
+        Args:
+            source_file: 來源檔案路徑
+            target_file: 目標檔案路徑
+
+        Returns:
+            bool: 內容相同返回True，否則返回False
+        """
+        try:
+            source_stat = os.stat(source_file)
+            target_stat = os.stat(target_file)
+        except OSError:
+            return False
+        if source_stat.st_size != target_stat.st_size:
+            return False
+
+        origin = _origin_key(source_stat)
+        record = self._lookup(target_file, target_stat)
+        if record is not None and record[1] == origin:
+            with self._lock:
+                self.index_hits += 1
+            return True
+
+        try:
+            source_digest = self.digest(source_file, source_stat)
+            target_digest = self.digest(target_file, target_stat)
+        except OSError:
+            return False
+        if source_digest != target_digest:
+            return False
+        # 記錄比對結果，下次只要兩者都未變更就不必再計算雜湊值
+        self._store(target_file, target_stat, target_digest, origin)
+        return True
+
+    def record_copy(self, source_file, target_file, source_digest=None):
+        """
+        記錄一次完成的複製
+
+        Args:
+            source_file: 來源檔案路徑
+            target_file: 目標檔案路徑
+            source_digest: 複製時計算的來源雜湊值
+        """
+        try:
+            source_stat = os.stat(source_file)
+            target_stat = os.stat(target_file)
+        except OSError:
+            return
+        if source_stat.st_size != target_stat.st_size:
+            return
+        if source_digest:
+            self._store(source_file, source_stat, source_digest)
+        self._store(target_file, target_stat, source_digest, _origin_key(source_stat))
+
+    def note_source(self, source_file, row_number):
+        """
+        記錄本次執行的來源檔案，找出與先前資料列的來源內容相同的檔案
+
+        同一大小只出現一個來源時不計算雜湊值；出現第二個時才計算該大小所有來源的雜湊值。
+
+        Args:
+            source_file: 來源檔案路徑
+            row_number: 資料列的列號
+
+        Returns:
+            tuple: 內容相同的 (來源檔案, 列號)，沒有時為 None
+        """
+        try:
+            source_stat = os.stat(source_file)
+        except OSError:
+            return None
+        key = self._key(source_file)
+        size = source_stat.st_size
+        with self._lock:
+            if size not in self._hashed_sizes and size not in self._unhashed_sources:
+                self._unhashed_sources[size] = (key, source_file, row_number)
+                return None
+            earlier = self._unhashed_sources.pop(size, None)
+            self._hashed_sizes.add(size)
+
+        try:
+            if earlier is not None:
+                self._add_source_digest(self.digest(earlier[1]), earlier)
+            duplicate = self._add_source_digest(self.digest(source_file, source_stat), (key, source_file, row_number))
+        except OSError:
+            return None
+        if duplicate is None:
+            return None
+        with self._lock:
+            self.duplicates.append({
+                'row': row_number,
+                'source': source_file,
+                'duplicate_of_row': duplicate[2],
+                'duplicate_of': duplicate[1],
+            })
+        return duplicate[1], duplicate[2]
+
+    def _add_source_digest(self, digest, source):
+        """
+        記錄來源的雜湊值，並找出先前內容相同的其他來源檔案
+
+        Args:
+            digest: 來源的雜湊值
+            source: (鍵值, 來源檔案, 列號)
+
+        Returns:
+            tuple: 先前內容相同的 (鍵值, 來源檔案, 列號)，沒有或為同一檔案時為 None
+        """
+        with self._lock:
+            earlier = self._sources_by_digest.setdefault(digest, source)
+        if earlier is source or earlier[0] == source[0]:
+            return None
+        return earlier
+
+    def get_report(self):
+        """
+        取得本次執行的索引統計
+
+        Returns:
+            dict: 統計資料
+        """
+        with self._lock:
+            return {
+                'path': self.path,
+                'index_hits': self.index_hits,
+                'files_hashed': self.files_hashed,
+                'duplicate_sources': list(self.duplicates),
+            }
+
+    def reset_report(self):
+        """
+        清除本次執行的統計與來源紀錄
+        """
+        self.index_hits = 0
+        self.files_hashed = 0
+        self.duplicates = []
+        # 大小 -> 該大小唯一一個尚未計算雜湊值的來源 (鍵值, 來源檔案, 列號)
+        self._unhashed_sources = {}
+        # 已計算來源雜湊值的大小
+        self._hashed_sizes = set()
+        # 雜湊值 -> 最早出現的來源 (鍵值, 來源檔案, 列號)
+        self._sources_by_digest = {}
+
+    def format_report(self):
+        """
+        將索引統計格式化為日誌訊息
+
+        Returns:
+            str: 統計訊息
+        """
+        report = self.get_report()
+        return (f"內容索引: 命中 {report['index_hits']} 次，計算雜湊值 {report['files_hashed']} 個檔案，"
+                f"內容重複的來源 {len(report['duplicate_sources'])} 個")
@@ -0,0 +1,464 @@
+"""
+檔案複製後端模組，提供核心層級的零複製（zero-copy）檔案複製
+"""
+import os
+import sys
+import stat
+import errno
+import shutil
+import threading
+from contextlib import contextmanager
+from constants import (
+    COPY_CHUNK_SIZE,
+    COPY_BACKEND_AUTO,
+    COPY_BACKEND_REFLINK,
+    COPY_BACKEND_COPY_FILE_RANGE,
+    COPY_BACKEND_SENDFILE,
+    COPY_BACKEND_BUFFERED,
+    COPY_BACKENDS,
+    LINK_MODE_HARDLINK,
+    LINK_MODE_REFLINK,
+)
+from verification import new_hasher
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl
+    fcntl = None
+
+# Linux 的 FICLONE ioctl，btrfs、XFS 等檔案系統可藉此建立 reflink 複本
+FICLONE = 0x40049409
+
+# 單次系統呼叫最多複製的位元組數
+_MAX_KERNEL_BLOCK = 1 << 30
+_MIN_KERNEL_BLOCK = 8 * 1024 * 1024
+
+# 這些錯誤代表此方式不適用於這組檔案系統，應改用下一種方式
+_FALLBACK_ERRNOS = {
+    errno.ENOSYS,
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EBADF,
+    errno.ETXTBSY,
+    getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP),
+}
+
+def _is_linux():
+    """
+    判斷是否在 Linux 上執行
+
+    Returns:
+        bool: 是 Linux 返回True
+    """
+    return sys.platform.startswith('linux')
+
+def is_backend_available(name):
+    """
+    判斷複製方式在目前平台是否可用
+
+    Args:
+        name: 複製方式名稱
+
+    Returns:
+        bool: 可用返回True，否則返回False
+    """
+    if name == COPY_BACKEND_REFLINK:
+        return fcntl is not None and _is_linux()
+    if name == COPY_BACKEND_COPY_FILE_RANGE:
+        return hasattr(os, 'copy_file_range')
+    if name == COPY_BACKEND_SENDFILE:
+        return hasattr(os, 'sendfile') and _is_linux()
+    return name in (COPY_BACKEND_BUFFERED, COPY_BACKEND_AUTO)
+
+def _kernel_block_size(size):
+    """
+    計算核心複製每次呼叫的位元組數
+
+    Args:
+        size: 檔案大小
+
+    Returns:
+        int: 每次呼叫的位元組數
+    """
+    return min(max(size, _MIN_KERNEL_BLOCK), _MAX_KERNEL_BLOCK)
+
+def _copy_reflink(src_fd, dst_fd, size):
+    """
+    以 reflink 複製檔案內容（共用資料區塊，不實際複製資料）
+
+    Returns:
+        int: 目標檔案的位元組數
+    """
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    return os.fstat(dst_fd).st_size
+
+def _copy_file_range(src_fd, dst_fd, size):
+    """
+    以 copy_file_range 在核心中複製檔案內容
+
+    Returns:
+        int: 複製的位元組數
+    """
+    block_size = _kernel_block_size(size)
+    copied = 0
+    while True:
+        count = os.copy_file_range(src_fd, dst_fd, block_size)
+        if not count:
+            return copied
+        copied += count
+
+def _copy_sendfile(src_fd, dst_fd, size):
+    """
+    以 sendfile 在核心中複製檔案內容
+
+    Returns:
+        int: 複製的位元組數
+    """
+    block_size = _kernel_block_size(size)
+    offset = 0
+    while True:
+        sent = os.sendfile(dst_fd, src_fd, offset, block_size)
+        if not sent:
+            return offset
+        offset += sent
+
+_KERNEL_COPIERS = {
+    COPY_BACKEND_REFLINK: _copy_reflink,
+    COPY_BACKEND_COPY_FILE_RANGE: _copy_file_range,
+    COPY_BACKEND_SENDFILE: _copy_sendfile,
+}
+
+def format_size(size):
+    """
+    將位元組數格式化為易讀的字串
+
+    Args:
+        size: 位元組數
+
+    Returns:
+        str: 格式化後的字串
+    """
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+class CopyBackend:
+    """
+    可替換的檔案複製後端
+
+    auto 模式依序嘗試 reflink、copy_file_range、sendfile，最後改用分段緩衝複製；
+    指定其他方式時，不支援的情況同樣會改用分段緩衝複製。
+    """
+    def __init__(self, name=COPY_BACKEND_AUTO, chunk_size=COPY_CHUNK_SIZE):
+        """
+        初始化複製後端
+
+        Args:
+            name: 複製方式名稱
+            chunk_size: 分段緩衝複製時每次讀取的位元組數
+        """
+        if name not in COPY_BACKENDS:
+            raise ValueError(f"不支援的複製方式: {name}")
+
+        self.name = name
+        self.chunk_size = chunk_size
+
+        candidates = _KERNEL_COPIERS if name == COPY_BACKEND_AUTO else [name]
+        self._methods = [method for method in candidates
+                         if method in _KERNEL_COPIERS and is_backend_available(method)]
+
+        # (複製方式, 來源裝置, 目標裝置) -> 已知不支援
+        self._unsupported = set()
+        self._lock = threading.Lock()
+        self._report = {}
+        # 執行統計（RunMetrics），設定後每個複製的檔案都會計入其目標
+        self.metrics = None
+        # 複製驗證使用的雜湊演算法，設定後分段緩衝複製會同時計算來源的雜湊值
+        self.hash_algorithm = None
+        # 內容索引（ContentIndex），設定後每次完成的複製都會記錄，下次執行可略過內容相同的目標
+        self.content_index = None
+        self._local = threading.local()
+
+    def copy_file(self, source_file, target_file):
+        """
+        複製檔案內容與中繼資料，可作為 shutil.copytree 的 copy_function
+
+        Args:
+            source_file: 來源檔案路徑
+            target_file: 目標檔案路徑
+
+        Returns:
+            str: 目標檔案路徑
+        """
+        if os.path.exists(target_file) and os.path.samefile(source_file, target_file):
+            raise shutil.SameFileError(f"{source_file} 與 {target_file} 是同一個檔案")
+
+        hasher = self.new_hasher()
+        with open(source_file, 'rb') as source:
+            source_stat = os.fstat(source.fileno())
+            with open(target_file, 'wb') as target:
+                method = self._copy_data(source.fileno(), target.fileno(), source_stat, hasher)
+
+        shutil.copystat(source_file, target_file)
+        self.record(method, source_stat.st_size, [target_file])
+        # 核心複製不經過使用者空間，無法同時計算雜湊值
+        digest = hasher.hexdigest() if hasher is not None and method == COPY_BACKEND_BUFFERED else None
+        self.track_copy(source_file, target_file, digest)
+        return target_file
+
+    def link_file(self, source_file, target_file, mode, origin=None):
+        """
+        以硬連結或 reflink 從已複製完成的檔案建立目標檔案（目標已存在時取代）
+
+        Args:
+            source_file: 已複製完成的檔案路徑（須與目標位於同一檔案系統）
+            target_file: 目標檔案路徑
+            mode: hardlink 或 reflink
+            origin: 原始來源檔案路徑（供複製驗證使用），None 時為 source_file
+
+        Returns:
+            bool: 建立成功返回True；此檔案系統不支援時返回False，由呼叫端改用複製
+        """
+        if mode == LINK_MODE_REFLINK and not is_backend_available(COPY_BACKEND_REFLINK):
+            return False
+        source_stat = os.stat(source_file)
+        key = (mode, source_stat.st_dev)
+        if key in self._unsupported:
+            return False
+
+        if os.path.lexists(target_file):
+            if os.path.samefile(source_file, target_file):
+                # 上次執行已建立的硬連結
+                self.record(mode, source_stat.st_size, [target_file], linked=True)
+                self.track_copy(origin or source_file, target_file)
+                return True
+            os.remove(target_file)
+
+        try:
+            if mode == LINK_MODE_HARDLINK:
+                os.link(source_file, target_file)
+            else:
+                with open(source_file, 'rb') as source, open(target_file, 'wb') as target:
+                    _copy_reflink(source.fileno(), target.fileno(), source_stat.st_size)
+                shutil.copystat(source_file, target_file)
+        except OSError as e:
+            if e.errno in _FALLBACK_ERRNOS or e.errno in (errno.EPERM, errno.EMLINK):
+                self._unsupported.add(key)
+            try:
+                os.remove(target_file)
+            except OSError:
+                pass
+            return False
+
+        self.record(mode, source_stat.st_size, [target_file], linked=True)
+        self.track_copy(origin or source_file, target_file)
+        return True
+
+    def _copy_data(self, src_fd, dst_fd, source_stat, hasher=None):
+        """
+        依序嘗試可用的複製方式複製檔案內容
+
+        Args:
+            src_fd: 來源檔案描述子
+            dst_fd: 目標檔案描述子
+            source_stat: 來源檔案的 stat 結果
+            hasher: 分段緩衝複製時同時更新的雜湊物件
+
+        Returns:
+            str: 實際使用的複製方式名稱
+        """
+        target_device = os.fstat(dst_fd).st_dev
+        for method in self._methods:
+            key = (method, source_stat.st_dev, target_device)
+            if key in self._unsupported:
+                continue
+            try:
+                copied = _KERNEL_COPIERS[method](src_fd, dst_fd, source_stat.st_size)
+            except OSError as e:
+                if e.errno not in _FALLBACK_ERRNOS:
+                    raise
+                self._unsupported.add(key)
+            else:
+                if copied >= source_stat.st_size:
+                    return method
+                # 部分檔案系統（如 procfs、部分 FUSE）不回報錯誤而是複製 0 位元組，
+                # 與 shutil 相同，這個檔案改用下一種方式
+            # 清除可能已寫入的部分內容，改用下一種方式
+            os.ftruncate(dst_fd, 0)
+            os.lseek(src_fd, 0, os.SEEK_SET)
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+
+        self._copy_buffered(src_fd, dst_fd, hasher)
+        return COPY_BACKEND_BUFFERED
+
+    def _copy_buffered(self, src_fd, dst_fd, hasher=None):
+        """
+        以固定大小的緩衝區分段複製檔案內容
+
+        Args:
+            src_fd: 來源檔案描述子
+            dst_fd: 目標檔案描述子
+            hasher: 同時以讀入的內容更新的雜湊物件
+        """
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        with open(src_fd, 'rb', buffering=0, closefd=False) as source, \
+                open(dst_fd, 'wb', buffering=0, closefd=False) as target:
+            while True:
+                read = source.readinto(buffer)
+                if not read:
+                    break
+                if hasher is not None:
+                    hasher.update(view[:read])
+                written = 0
+                while written < read:
+                    written += target.write(view[written:read])
+
+    @contextmanager
+    def tracking(self):
+        """
+        記錄目前執行緒在區塊內複製的檔案（供複製驗證使用）
+
+        Yields:
+            list: (來源檔案, 目標檔案, 複製時計算的來源雜湊值或 None) 列表
+        """
+        copies = self._local.copies = []
+        try:
+            yield copies
+        finally:
+            self._local.copies = None
+
+    def tracked_copies(self):
+        """
+        取得目前執行緒到目前為止記錄的複製
+
+        Returns:
+            list: (來源檔案, 目標檔案, 複製時計算的來源雜湊值或 None) 列表，未記錄時為空列表
+        """
+        return list(getattr(self._local, 'copies', None) or [])
+
+    def new_hasher(self):
+        """
+        建立複製時同時計算來源雜湊值的物件
+
+        Returns:
+            雜湊物件，未啟用驗證或目前執行緒未記錄複製時為 None
+        """
+        if self.hash_algorithm is None or getattr(self._local, 'copies', None) is None:
+            return None
+        return new_hasher(self.hash_algorithm)
+
+    def track_copy(self, source_file, target_file, source_digest=None):
+        """
+        記錄一次完成的檔案複製：寫入內容索引，並在目前執行緒記錄複製時加入清單
+
+        Args:
+            source_file: 來源檔案路徑
+            target_file: 目標檔案路徑
+            source_digest: 複製時計算的來源雜湊值
+        """
+        content_index = self.content_index
+        if content_index is not None:
+            content_index.record_copy(source_file, target_file, source_digest)
+        copies = getattr(self._local, 'copies', None)
+        if copies is not None:
+            copies.append((source_file, target_file, source_digest))
+
+    def record(self, method, size, target_files, linked=False):
+        """
+        記錄一次複製所使用的方式
+
+        Args:
+            method: 複製方式名稱
+            size: 複製的位元組數（每個目標檔案）
+            target_files: 目標檔案路徑列表
+            linked: 目標是否以連結建立（不實際寫入資料）
+        """
+        with self._lock:
+            entry = self._report.setdefault(method, {'files': 0, 'bytes': 0})
+            entry['files'] += len(target_files)
+            entry['bytes'] += size * len(target_files)
+        if self.metrics is not None:
+            for target_file in target_files:
+                self.metrics.record_copy(target_file, size, linked)
+
+    def record_unchanged(self, source_file, target_file, size):
+        """
+        記錄一個內容與來源相同、因此略過複製的目標檔案
+
+        Args:
+            source_file: 來源檔案路徑
+            target_file: 目標檔案路徑
+            size: 檔案位元組數
+        """
+        if self.metrics is not None:
+            self.metrics.record_unchanged(target_file, size)
+        self.track_unchanged(source_file, target_file)
+
+    def copy_unchanged_stat(self, source_file, target_file):
+        """
+        將來源的權限與修改時間複製到內容相同而略過複製的目標檔案，結果與重新複製相同
+
+        屬性變更後目標在內容索引中的紀錄失效，因此重新記錄，下次執行仍可直接判定相同。
+
+        Args:
+            source_file: 來源檔案路徑
+            target_file: 目標檔案路徑
+        """
+        source_stat = os.stat(source_file)
+        target_stat = os.stat(target_file)
+        if (stat.S_IMODE(source_stat.st_mode) == stat.S_IMODE(target_stat.st_mode)
+                and source_stat.st_mtime_ns == target_stat.st_mtime_ns):
+            return
+        shutil.copystat(source_file, target_file)
+        if self.content_index is not None:
+            self.content_index.record_copy(source_file, target_file)
+
+    def track_unchanged(self, source_file, target_file):
+        """
+        在目前執行緒記錄複製時加入略過複製的目標檔案，啟用複製驗證時仍確認目標與來源相同
+
+        Args:
+            source_file: 來源檔案路徑
+            target_file: 目標檔案路徑
+        """
+        copies = getattr(self._local, 'copies', None)
+        if copies is not None:
+            copies.append((source_file, target_file, None))
+
+    def get_report(self):
+        """
+        取得本次執行各複製方式的使用統計
+
+        Returns:
+            dict: 複製方式名稱 -> {'files': 檔案數, 'bytes': 位元組數}
+        """
+        with self._lock:
+            return {method: dict(entry) for method, entry in self._report.items()}
+
+    def reset_report(self):
+        """
+        清除使用統計
+        """
+        with self._lock:
+            self._report = {}
+
+    def format_report(self):
+        """
+        將使用統計格式化為日誌訊息
+
+        Returns:
+            str: 統計訊息
+        """
+        report = self.get_report()
+        if not report:
+            return f"複製方式統計（{self.name}）: 沒有複製任何檔案"
+        parts = [
+            f"{method} {entry['files']} 個檔案 ({format_size(entry['bytes'])})"
+            for method, entry in sorted(report.items())
+        ]
+        return f"複製方式統計（{self.name}）: " + "，".join(parts)
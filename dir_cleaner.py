@@ -0,0 +1,352 @@
+"""
+空資料夾清理模組，以 os.scandir 單次走訪刪除所有空資料夾
+"""
+import os
+import re
+import queue
+import fnmatch
+import logging
+import threading
+from log_sink import emit_log, supports_level
+from utils import normalize_path, _log_to_logger
+from parallel_executor import default_worker_count
+
+def compile_junk_patterns(patterns):
+    """
+    將可忽略檔案的萬用字元樣式編譯為正規表示式（不分大小寫）
+
+    Args:
+        patterns: 檔名樣式列表，例如 ['Thumbs.db', '*.tmp']
+
+    Returns:
+        re.Pattern: 符合任一樣式的正規表示式，沒有樣式時為 None
+    """
+    patterns = [pattern for pattern in (patterns or ()) if pattern]
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns), re.IGNORECASE)
+
+class _DirectoryFrame:
+    """
+    走訪中的目錄：記錄尚未刪除的項目數量與可忽略的檔案
+    """
+    __slots__ = ('path', 'parent', 'remaining', 'junk_files', 'subdirs', 'pending')
+
+    def __init__(self, path, parent):
+        """
+        初始化目錄狀態
+
+        Args:
+            path: 目錄路徑
+            parent: 上層目錄的 _DirectoryFrame，根目錄為 None
+        """
+        self.path = path
+        self.parent = parent
+        self.remaining = 0
+        self.junk_files = []
+        self.subdirs = []
+        # 平行走訪時尚未處理完的子目錄數量
+        self.pending = 0
+
+class EmptyDirectoryCleaner:
+    """
+    空資料夾清理器
+
+    以後序單次走訪整棵目錄樹：每個目錄記錄尚未刪除的項目數量，
+    子目錄被刪除時上層的數量減一，歸零的目錄在子目錄處理完後立即刪除，
+    因此巢狀的空資料夾一次就能清除，不需重複執行。
+    只含可忽略檔案（例如 Thumbs.db、.DS_Store）的目錄也視為空目錄，刪除前先刪除這些檔案。
+
+    多個工作執行緒時，各子樹由執行緒池同時列出（網路儲存空間上每次列目錄都要等待往返時間），
+    目錄在所有子目錄都處理完後，由處理最後一個子目錄的執行緒決定是否刪除，
+    因此目錄一定在其下所有目錄之後才刪除。
+    """
+    def __init__(self, junk_patterns=None, log_callback=None, cancel_event=None, max_workers=1, snapshot=None):
+        """
+        初始化空資料夾清理器
+
+        Args:
+            junk_patterns: 可忽略的檔名樣式列表（萬用字元，不分大小寫）
+            log_callback: 日誌回呼函數
+            cancel_event: threading.Event，設定後在處理下一個目錄前停止
+            max_workers: 列出目錄的工作執行緒數量，None 時使用預設值，1 時在呼叫端執行緒依序處理
+            snapshot: 已載入的 TreeSnapshot，修改時間未變更的目錄沿用快照內容而不重新列出
+        """
+        self.junk_patterns = list(junk_patterns or ())
+        self._junk = compile_junk_patterns(self.junk_patterns)
+        self.log_callback = log_callback if log_callback else _log_to_logger
+        self.cancel_event = cancel_event
+        self.max_workers = max_workers if max_workers else default_worker_count()
+        self.snapshot = snapshot
+        self.directories_scanned = 0
+        self.directories_removed = 0
+        self.junk_files_removed = 0
+        self._lock = threading.Lock()
+
+    @supports_level
+    def log_message(self, message, level=logging.INFO):
+        """
+        輸出日誌訊息
+
+        Args:
+            message: 訊息內容
+            level: 日誌層級
+        """
+        emit_log(self.log_callback, message, level)
+
+    def _is_junk(self, name):
+        """
+        判斷檔名是否符合可忽略的樣式
+
+        Args:
+            name: 檔名
+
+        Returns:
+            bool: 符合返回True，否則返回False
+        """
+        return self._junk is not None and self._junk.match(name) is not None
+
+    def _scan(self, frame):
+        """
+        列出目錄內容，計算尚未刪除的項目數量
+
+        Args:
+            frame: 目錄的 _DirectoryFrame
+
+        Returns:
+            bool: 列出成功返回True，否則返回False
+        """
+        with self._lock:
+            self.directories_scanned += 1
+        try:
+            if self.snapshot is not None:
+                # 修改時間須在列出前取得，列出期間的變更才會在下次執行時被發現
+                mtime_ns = os.stat(frame.path).st_mtime_ns
+                cached = self.snapshot.lookup(frame.path, mtime_ns)
+                if cached is not None:
+                    files, subdir_names, junk_names = cached
+                    frame.subdirs = [os.path.join(frame.path, name) for name in subdir_names]
+                    frame.junk_files = [os.path.join(frame.path, name) for name in junk_names]
+                    frame.remaining = files + len(subdir_names)
+                    return True
+
+            with os.scandir(frame.path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        frame.subdirs.append(entry.path)
+                    elif self._is_junk(entry.name):
+                        frame.junk_files.append(entry.path)
+                        continue
+                    frame.remaining += 1
+        except OSError as e:
+            self.log_message(f"無法讀取目錄: {e}, 路徑: {frame.path}", logging.WARNING)
+            return False
+
+        if self.snapshot is not None:
+            self.snapshot.record(
+                frame.path,
+                mtime_ns,
+                frame.remaining - len(frame.subdirs),
+                [os.path.basename(path) for path in frame.subdirs],
+                [os.path.basename(path) for path in frame.junk_files]
+            )
+        return True
+
+    def _remove(self, frame):
+        """
+        刪除已清空的目錄（含可忽略的檔案）
+
+        Args:
+            frame: 目錄的 _DirectoryFrame
+
+        Returns:
+            bool: 刪除成功返回True，否則返回False
+        """
+        try:
+            for junk_file in frame.junk_files:
+                os.remove(junk_file)
+                with self._lock:
+                    self.junk_files_removed += 1
+                self.log_message(f"已刪除可忽略的檔案: {junk_file}", logging.DEBUG)
+            os.rmdir(frame.path)
+        except OSError as e:
+            self.log_message(f"刪除目錄時發生錯誤: {e}, 路徑: {frame.path}", logging.WARNING)
+            return False
+
+        with self._lock:
+            self.directories_removed += 1
+        if self.snapshot is not None:
+            self.snapshot.discard(frame.path)
+        self.log_message(f"已刪除空目錄: {frame.path}", logging.DEBUG)
+        return True
+
+    def _cancelled(self):
+        """
+        檢查是否已要求停止
+
+        Returns:
+            bool: 已要求停止返回True
+        """
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def clean(self, root_path, recursive=True):
+        """
+        清理空目錄（根目錄清空後也會一併刪除）
+
+        Args:
+            root_path: 要清理的根目錄路徑
+            recursive: 是否遞歸清理子目錄，否則只檢查根目錄本身
+
+        Returns:
+            int: 本次刪除的空目錄數量
+        """
+        removed_before = self.directories_removed
+        root = _DirectoryFrame(root_path, None)
+        if not self._scan(root):
+            return 0
+        if not recursive:
+            if root.remaining == 0:
+                self._remove(root)
+        elif self.max_workers > 1:
+            self._clean_parallel(root)
+        else:
+            self._clean_serial(root)
+        if self._cancelled():
+            self.log_message("清理已取消", logging.WARNING)
+        return self.directories_removed - removed_before
+
+    def _clean_serial(self, root):
+        """
+        在目前執行緒依序清理
+
+        Args:
+            root: 已列出內容的根目錄 _DirectoryFrame
+        """
+        # 以堆疊模擬後序走訪：子目錄都處理完後才決定是否刪除該目錄
+        stack = [root]
+        while stack:
+            frame = stack[-1]
+            if frame.subdirs:
+                if self._cancelled():
+                    return
+                child = _DirectoryFrame(frame.subdirs.pop(), frame)
+                if self._scan(child):
+                    stack.append(child)
+                continue
+            stack.pop()
+            if frame.remaining == 0 and self._remove(frame) and frame.parent is not None:
+                frame.parent.remaining -= 1
+
+    def _clean_parallel(self, root):
+        """
+        以執行緒池同時列出各子樹並清理
+
+        工作佇列為後進先出，讓走訪接近深度優先，已處理完的子樹可以及早釋放。
+
+        Args:
+            root: 已列出內容的根目錄 _DirectoryFrame
+        """
+        work = queue.LifoQueue()
+        done = threading.Event()
+
+        def worker():
+            while True:
+                frame = work.get()
+                if frame is None:
+                    return
+                self._expand(frame, work, done)
+
+        self._expand(root, work, done, scanned=True)
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.max_workers)]
+        for thread in threads:
+            thread.start()
+        done.wait()
+        for _ in threads:
+            work.put(None)
+        for thread in threads:
+            thread.join()
+
+    def _expand(self, frame, work, done, scanned=False):
+        """
+        列出目錄並將子目錄放入工作佇列，沒有子目錄時立即完成該目錄
+
+        Args:
+            frame: 目錄的 _DirectoryFrame
+            work: 工作佇列
+            done: 根目錄完成時設定的 threading.Event
+            scanned: 目錄內容是否已列出
+        """
+        if not scanned:
+            try:
+                scanned = not self._cancelled() and self._scan(frame)
+            except Exception as e:
+                # 工作執行緒不能中途結束，否則上層目錄永遠等不到此目錄完成
+                self.log_message(f"處理目錄時發生錯誤: {e}, 路徑: {frame.path}", logging.ERROR)
+            if not scanned:
+                # 無法列出或已取消的目錄視為非空，其上層目錄也不會被刪除
+                frame.subdirs = []
+                frame.remaining += 1
+        children = [_DirectoryFrame(path, frame) for path in frame.subdirs]
+        frame.subdirs = []
+        if not children:
+            self._finish(frame, done)
+            return
+        frame.pending = len(children)
+        for child in children:
+            work.put(child)
+
+    def _finish(self, frame, done):
+        """
+        目錄及其下所有子目錄都處理完後決定是否刪除，並逐層通知上層目錄
+
+        Args:
+            frame: 已處理完的目錄 _DirectoryFrame
+            done: 根目錄完成時設定的 threading.Event
+        """
+        while True:
+            # 所有子目錄都已完成，remaining 不會再被其他執行緒修改
+            removed = frame.remaining == 0 and self._remove(frame)
+            parent = frame.parent
+            if parent is None:
+                done.set()
+                return
+            with self._lock:
+                if removed:
+                    parent.remaining -= 1
+                parent.pending -= 1
+                if parent.pending:
+                    return
+            frame = parent
+
+def clean_empty_directories(root_path, recursive=True, log_callback=None, cancel_event=None,
+                            junk_patterns=None, max_workers=1):
+    """
+    清理空目錄
+
+    Args:
+        root_path: 要清理的根目錄路徑
+        recursive: 是否遞歸清理子目錄
+        log_callback: 日誌回呼函數
+        cancel_event: threading.Event，設定後在處理下一個目錄前停止
+        junk_patterns: 可忽略的檔名樣式列表，只含這些檔案的目錄也視為空目錄
+        max_workers: 列出目錄的工作執行緒數量，None 時使用預設值
+
+    Returns:
+        int: 已刪除的空目錄數量
+    """
+    # 日誌函數處理
+    log_func = log_callback if log_callback else _log_to_logger
+
+    # 正規化根目錄路徑
+    root_path = normalize_path(root_path, log_callback)
+
+    if not os.path.isdir(root_path):
+        emit_log(log_func, f"指定的路徑不是目錄: {root_path}", logging.ERROR)
+        return 0
+
+    cleaner = EmptyDirectoryCleaner(junk_patterns, log_func, cancel_event, max_workers)
+    return cleaner.clean(root_path, recursive)
@@ -2,38 +2,211 @@
 Excel 檔案處理模組
 """
 import os
-import pandas as pd
+import time
+import logging
+import itertools
+import threading
+from contextlib import nullcontext
 from constants import *
-from utils import normalize_path, create_directory_safely
+from utils import normalize_path, contains_files, DirectoryCache
 from file_operations import FileOperator
+from manifest_reader import ManifestReader, count_manifest_rows
+from log_sink import LogSink, emit_log, supports_level
+from metrics import RunMetrics
+from journal import OperationJournal, JournalState
+from verification import CopyVerifier
+from source_index import SourceIndex
+from content_index import ContentIndex
+from profiling import span, spanned
+from parallel_executor import ParallelRowExecutor, default_worker_count, path_ancestors
+from planner import (
+    OperationPlanner,
+    OPERATION_LABELS,
+    OP_RENAME,
+    OP_COPY_FILE,
+    OP_COPY_FOLDER,
+    OP_CREATE_FOLDER,
+)
 
 class ExcelProcessor:
     """
     Excel 檔案處理類別
     """
-    def __init__(self, log_callback=None, confirm_delete_callback=None):
+    def __init__(self, log_callback=None, confirm_delete_callback=None, max_workers=None,
+                 confirm_delete_upfront=False, copy_backend=COPY_BACKEND_AUTO,
+                 copy_chunk_size=COPY_CHUNK_SIZE, folder_sync_mode=FOLDER_SYNC_REPLACE, sync_hash=False,
+                 dry_run=False, revalidate_directories=False, plan_first=False, count_rows=False, report_path=None,
+                 journal_path=None, resume=False, verify=False, verify_algorithm=HASH_BLAKE2B,
+                 verify_workers=None, directory_cache=None, io_scheduler=None, link_mode=LINK_MODE_OFF,
+                 content_index_path=None):
         """
         初始化 Excel 處理器
         
         Args:
-            log_callback: 日誌輸出回呼函數
+            log_callback: 日誌輸出回呼函數，可為 LogSink（由呼叫端負責定期 flush）
             confirm_delete_callback: 確認刪除操作的回呼函數
+            max_workers: 平行處理的工作執行緒數量，None 時依 CPU 數量決定，1 為依序處理
+            confirm_delete_upfront: 是否在處理前先確認刪除原始資料；確認後同一檔案系統的項目會直接改名搬移
+            copy_backend: 檔案複製方式（auto、reflink、copy_file_range、sendfile、buffered）
+            copy_chunk_size: 分段緩衝複製時每次讀取的位元組數
+            folder_sync_mode: 目標資料夾已存在時的處理方式（replace 或 incremental）
+            sync_hash: 增量同步時是否以內容雜湊值判斷檔案是否變更
+            dry_run: 試跑模式，只輸出操作計畫而不實際執行
+            revalidate_directories: 目錄快取命中時是否仍確認目錄存在
+            plan_first: 是否先規劃全部資料列再執行，以取得總操作數（顯示進度與預估剩餘時間用）
+            count_rows: 是否先計算設定檔的資料列數作為進度總數，資料列仍逐列規劃與執行（不需 plan_first 的完整計畫）
+            report_path: 執行報告（JSON）路徑，None 時寫在設定檔旁（<設定檔名稱>_report.json）
+            journal_path: 操作紀錄檔路徑，None 時寫在設定檔旁（<設定檔名稱>_journal.jsonl）
+            resume: 是否依操作紀錄繼續先前中斷的執行，略過已完成的操作
+            verify: 是否以雜湊值驗證複本，只有通過驗證的項目才會刪除原始資料
+            verify_algorithm: 驗證使用的雜湊演算法（blake2b、sha256，安裝 xxhash 時另有 xxh64、xxh3_128）
+            verify_workers: 驗證的工作執行緒數量，None 時依 CPU 數量決定
+            directory_cache: 跨多次執行（或多個處理器）共用的 DirectoryCache，None 時每次執行建立新的快取
+            io_scheduler: IOScheduler，依儲存裝置限制同時進行的複製操作（可由多個處理器共用），None 時不限制
+            link_mode: 多個目標位於同一檔案系統時只實際複製一次，其他目標以 hardlink 或 reflink 建立（off 為不使用）
+            content_index_path: 內容索引（SQLite）檔案路徑，指定時略過內容已與來源相同的目標，
+                                並找出不同資料列中內容相同的來源檔案；None 時不使用
         """
         self.log_callback = log_callback
+        if isinstance(log_callback, LogSink):
+            self.log_sink = log_callback
+            self._owns_log_sink = False
+        else:
+            # 可接受層級的回呼（例如監看模式的工作日誌）需要保留每則訊息的層級
+            self.log_sink = LogSink(self._emit_lines,
+                                    with_levels=getattr(log_callback, 'supports_level', False))
+            self._owns_log_sink = True
         self.confirm_delete_callback = confirm_delete_callback
-        self.file_operator = FileOperator(log_callback)
+        self.max_workers = max_workers if max_workers else default_worker_count()
+        self.confirm_delete_upfront = confirm_delete_upfront
+        self.dry_run = dry_run
+        self.revalidate_directories = revalidate_directories
+        self.shared_directory_cache = directory_cache
+        self.plan_first = plan_first
+        self.count_rows = count_rows
+        self.report_path = report_path
+        self.journal_path = journal_path
+        self.resume = resume
+        self.verify = verify
+        self.verify_algorithm = verify_algorithm
+        self.verify_workers = verify_workers
+        self.verifier = None
+        # 先前的執行中已通過驗證、本次略過的原始項目
+        self._verified_before = set()
+        self.metrics = None
+        self.journal = None
+        self._resume_state = JournalState()
+        self._report_target = None
+        self._journal_target = None
+        self._manifest_path = None
+        self._manifest_info = None
+        self._plan = None
+        self._io_report = None
+        self._cancel_event = threading.Event()
+        self._progress_lock = threading.Lock()
+        self._operations_done = 0
+        self._operations_total = None
+        # 進度總數為資料列數時，略過的資料列也計入完成數
+        self._total_counts_rows = False
+        self._row_count = None
+        self._started = None
+        self._movable_sources = set()
+        self.file_operator = FileOperator(
+            self.log_message,
+            copy_chunk_size=copy_chunk_size,
+            copy_backend=copy_backend,
+            folder_sync_mode=folder_sync_mode,
+            sync_hash=sync_hash,
+            io_scheduler=io_scheduler,
+            link_mode=link_mode
+        )
+        self.source_index = SourceIndex()
+        self.content_index = None
+        if content_index_path:
+            self.content_index = ContentIndex(content_index_path, chunk_size=copy_chunk_size,
+                                              log_callback=self.log_message)
+        self._main_thread = threading.current_thread()
     
-    def log_message(self, message):
+    @supports_level
+    def log_message(self, message, level=logging.INFO):
         """
         輸出日誌訊息
         
         Args:
             message: 訊息內容
+            level: 日誌層級
         """
-        if self.log_callback:
-            self.log_callback(message)
-        else:
-            print(message)
+        self.log_sink.log(message, level)
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.record_log(level)
+        # 工作執行緒的訊息先暫存，由處理中的執行緒統一輸出
+        if self._owns_log_sink and threading.current_thread() is self._main_thread:
+            self.log_sink.flush()
+
+    def cancel(self):
+        """
+        要求停止處理，執行中的操作完成後不再開始新的操作（可從任何執行緒呼叫）
+
+        停止要求只對目前的執行有效，下一次呼叫 read_and_process_excel 或 process_excel 時清除。
+        """
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        """
+        是否已要求停止處理
+
+        Returns:
+            bool: 已要求停止返回True
+        """
+        return self._cancel_event.is_set()
+
+    def has_failures(self):
+        """
+        檢查最近一次執行是否有錯誤，或有無法執行、未全部完成或未通過驗證的資料列
+
+        Returns:
+            bool: 有失敗返回True，否則返回False
+        """
+        metrics = self.metrics
+        return metrics is not None and (metrics.failed_rows > 0 or metrics.errors['errors'] > 0)
+
+    def get_progress(self):
+        """
+        取得目前的處理進度（可從任何執行緒呼叫）
+
+        Returns:
+            dict: operations_done、operations_total（未知時為 None）、files、bytes、elapsed（秒）
+        """
+        report = self.file_operator.copy_backend.get_report()
+        with self._progress_lock:
+            done = self._operations_done
+            if self._total_counts_rows and self._plan is not None:
+                done += self._plan.skipped_rows
+            return {
+                'operations_done': done,
+                'operations_total': self._operations_total,
+                'files': sum(entry['files'] for entry in report.values()),
+                'bytes': sum(entry['bytes'] for entry in report.values()),
+                'elapsed': time.monotonic() - self._started if self._started else 0.0,
+            }
+
+    def _emit_lines(self, lines):
+        """
+        將日誌緩衝區的訊息逐行交給日誌回呼函數
+
+        Args:
+            lines: 訊息列表，回呼可接受層級時為 (訊息, 層級) 的列表
+        """
+        for line in lines:
+            if not self.log_callback:
+                print(line)
+            elif self.log_sink.with_levels:
+                message, level = line
+                emit_log(self.log_callback, message, level)
+            else:
+                self.log_callback(line)
     
     def get_all_target_paths(self, row):
         """
@@ -45,133 +218,564 @@ class ExcelProcessor:
         Returns:
             list: 目標路徑列表
         """
-        paths = []
-        # 檢查第一個路徑
-        if COL_NEW_FOLDER_PATH in row and pd.notna(row[COL_NEW_FOLDER_PATH]):
-            path = str(row[COL_NEW_FOLDER_PATH])
-            paths.append(normalize_path(path, self.log_message))
-        
-        # 檢查第二個路徑
-        if COL_NEW_FOLDER_PATH2 in row and pd.notna(row[COL_NEW_FOLDER_PATH2]):
-            path = str(row[COL_NEW_FOLDER_PATH2])
-            paths.append(normalize_path(path, self.log_message))
-        
-        # 檢查第三個路徑
-        if COL_NEW_FOLDER_PATH3 in row and pd.notna(row[COL_NEW_FOLDER_PATH3]):
-            path = str(row[COL_NEW_FOLDER_PATH3])
-            paths.append(normalize_path(path, self.log_message))
-        
-        # 記錄找到的路徑
-        self.log_message(f"找到的目標路徑: {paths}")
-        return paths
-    
-    def process_excel(self, df):
+        return OperationPlanner(self.log_message).get_all_target_paths(row)
+
+    def execute_operation(self, operation):
+        """
+        執行單一操作
+
+        Args:
+            operation: 規劃器產生的 Operation
+
+        Returns:
+            str: 複製成功且可刪除的原始項目路徑，沒有則為 None
+        """
+        return self._execute_operation(operation)[0]
+
+    def _execute_operation(self, operation, sync_mode=None):
+        """
+        執行單一操作，並回報操作是否完全成功
+
+        Args:
+            operation: 規劃器產生的 Operation
+            sync_mode: 目標資料夾已存在時的處理方式，None 時使用 folder_sync_mode
+
+        Returns:
+            tuple: (可刪除的原始項目路徑或 None, 是否所有目標都已完成)
+        """
+        source = operation.source
+        target_paths = operation.target_paths
+
+        try:
+            # 情況四: 純重命名操作
+            if operation.kind == OP_RENAME:
+                self.log_message(f"執行純重命名操作", logging.DEBUG)
+                renamed = self.file_operator.rename_file_in_place(
+                    os.path.dirname(source), operation.file_name, operation.new_name
+                )
+                return None, bool(renamed)
+
+            # 情況一：檔案操作（複製/改名）；情況二：資料夾操作（複製/改名）
+            elif operation.kind in (OP_COPY_FILE, OP_COPY_FOLDER):
+                is_file = operation.kind == OP_COPY_FILE
+                exists, is_dir, _ = self.source_index.lookup(source)
+                if is_file and not exists:
+                    self.log_message(f"檔案 {source} 不存在", logging.WARNING)
+                    return None, False
+                if not is_file and not is_dir:
+                    self.log_message(f"指定的路徑 {source} 不是資料夾", logging.WARNING)
+                    return None, False
+
+                # 資料夾改名模式直接使用New Folder Path作為目標路徑，否則保持原名複製
+                if os.path.normcase(source) in self._movable_sources:
+                    successful_copies, moved = self.file_operator.move_to_multiple_paths(
+                        source, target_paths,
+                        is_file=is_file, new_name=operation.new_name,
+                        rename_folder=operation.rename_folder,
+                        sync_mode=sync_mode,
+                        verify_copies=self.verifier.verify if self.verifier is not None else None
+                    )
+                    if moved:
+                        return None, True
+                else:
+                    successful_copies = self.file_operator.copy_to_multiple_paths(
+                        source, target_paths,
+                        is_file=is_file, new_name=operation.new_name,
+                        rename_folder=operation.rename_folder,
+                        sync_mode=sync_mode
+                    )
+                completed = len(successful_copies) == len(target_paths)
+                return (source if successful_copies else None), completed
+
+            # 情況三：建立新資料夾
+            elif operation.kind == OP_CREATE_FOLDER:
+                results = [self.file_operator.ensure_directory(path) for path in target_paths]
+                return None, all(results)
+
+        except Exception as e:
+            self.log_message(f"處理時發生錯誤: {e}", logging.ERROR)
+            import traceback
+            self.log_message(traceback.format_exc(), logging.ERROR)
+
+        return None, False
+
+    def _run_operation(self, operation):
+        """
+        執行單一操作並更新進度，已要求停止時略過
+
+        Args:
+            operation: 規劃器產生的 Operation
+
+        Returns:
+            str: 複製成功且可刪除的原始項目路徑，沒有則為 None
+        """
+        if self._cancel_event.is_set():
+            return None
+
+        journal = self.journal
+        sync_mode = None
+        if journal is not None:
+            key = operation.key
+            if key in self._resume_state.completed:
+                self.log_message(f"第 {operation.row_number} 列已在先前的執行中完成，略過", logging.DEBUG)
+                with self._progress_lock:
+                    self._operations_done += 1
+                original = self._resume_state.completed[key]
+                if original and not os.path.lexists(original):
+                    self.log_message(f"第 {operation.row_number} 列的原始資料 {original} 已在先前的執行中刪除",
+                                     logging.DEBUG)
+                    return None
+                if original and self.verifier is not None:
+                    if key not in self._resume_state.verified:
+                        self.log_message(f"第 {operation.row_number} 列的複本在先前的執行中未通過驗證，"
+                                         f"原始資料 {original} 不會被刪除", logging.WARNING)
+                        return None
+                    with self._progress_lock:
+                        self._verified_before.add(original)
+                return original
+            if key in self._resume_state.in_progress and operation.kind == OP_COPY_FOLDER:
+                # 中斷的資料夾複製只補齊缺少或變更的檔案，不重新複製整個資料夾
+                self.log_message(f"繼續第 {operation.row_number} 列中斷的資料夾複製（增量同步）")
+                sync_mode = FOLDER_SYNC_INCREMENTAL
+            journal.start(key, operation.row_number)
+
+        self.metrics.add_target_roots(operation.target_paths)
+        content_index = self.file_operator.content_index
+        if content_index is not None and operation.kind == OP_COPY_FILE:
+            duplicate = content_index.note_source(operation.source, operation.row_number)
+            if duplicate:
+                self.log_message(f"第 {operation.row_number} 列的來源 {operation.source} "
+                                 f"與第 {duplicate[1]} 列的來源 {duplicate[0]} 內容相同")
+        # 啟用驗證時記錄本操作複製的檔案
+        tracking = self.file_operator.copy_backend.tracking() if self.verifier is not None else nullcontext([])
+        start = time.perf_counter()
+        try:
+            with tracking as copies, span('process_excel.' + operation.kind):
+                original, completed = self._execute_operation(operation, sync_mode)
+        finally:
+            self.metrics.record_operation(operation.kind, time.perf_counter() - start)
+            with self._progress_lock:
+                self._operations_done += 1
+
+        if not completed and not self._cancel_event.is_set():
+            self.metrics.record_failed_rows()
+        if journal is not None:
+            if completed:
+                journal.complete(key, operation.row_number, original)
+            elif original:
+                # 只有所有目標都已完成的操作才能刪除原始資料
+                self.log_message(f"第 {operation.row_number} 列未全部完成，原始資料 {original} 不會被刪除",
+                                 logging.WARNING)
+                original = None
+
+        if original and self.verifier is not None:
+            if not copies and contains_files(original):
+                # 沒有記錄到任何複本時無法確認目標內容，不可視為驗證成功
+                self.log_message(f"第 {operation.row_number} 列沒有可驗證的複本，原始資料 {original} 不會被刪除",
+                                 logging.WARNING)
+                self.metrics.record_failed_rows()
+                return None
+            on_verified = None
+            if journal is not None:
+                on_verified = lambda: journal.record_verified(key, operation.row_number)
+            self.verifier.submit(original, copies, on_verified)
+        return original
+
+    def find_movable_sources(self, operations):
+        """
+        找出可以直接搬移的來源
+
+        來源必須屬於複製操作，且沒有其他操作涉及此來源、其上層目錄或其下的路徑，
+        否則搬移後其他操作會找不到來源。
+
+        Args:
+            operations: 操作列表
+
+        Returns:
+            set: 可搬移來源路徑（os.path.normcase 後）的集合
+        """
+        row_keys = [{os.path.normcase(path) for path in operation.paths} for operation in operations]
+
+        # 路徑 -> 直接涉及此路徑的資料列數；路徑 -> 涉及此路徑或其下路徑的資料列數
+        exact_counts = {}
+        subtree_counts = {}
+        for keys in row_keys:
+            covered = set(keys)
+            for key in keys:
+                exact_counts[key] = exact_counts.get(key, 0) + 1
+                covered.update(path_ancestors(key))
+            for key in covered:
+                subtree_counts[key] = subtree_counts.get(key, 0) + 1
+
+        movable = set()
+        for operation, keys in zip(operations, row_keys):
+            if operation.kind not in (OP_COPY_FILE, OP_COPY_FOLDER):
+                continue
+            source = os.path.normcase(operation.source)
+
+            # 扣除本資料列自身的計數後，確認沒有其他資料列與來源重疊
+            own_ancestors = sum(1 for ancestor in path_ancestors(source) if ancestor in keys)
+            others = subtree_counts.get(source, 0) - 1
+            others += sum(exact_counts.get(ancestor, 0) for ancestor in path_ancestors(source)) - own_ancestors
+            if others == 0:
+                movable.add(source)
+
+        return movable
+
+    def _flush_log(self):
+        """
+        輸出工作執行緒暫存的日誌訊息（外部提供的 LogSink 由呼叫端負責輸出）
+        """
+        if self._owns_log_sink:
+            self.log_sink.flush()
+
+    def plan_excel(self, rows):
+        """
+        建立完整的操作計畫並輸出（試跑模式），不會變更任何檔案
+
+        Args:
+            rows: 資料列的可迭代物件（如 ManifestReader）
+
+        Returns:
+            OperationPlan: 操作計畫
+        """
+        planner = OperationPlanner(self.log_message, estimate_folder_bytes=True)
+        plan = planner.build_plan(rows)
+
+        self.log_message("試跑模式：以下操作不會實際執行")
+        for operation in plan.operations:
+            self.log_message(operation.describe())
+        for line in plan.format_summary():
+            self.log_message(line)
+        return plan
+
+    def _start_metrics(self, report_path=None, journal_path=None):
+        """
+        開始新的執行統計
+
+        Args:
+            report_path: 執行結束時寫入報告的路徑，None 時不寫入
+            journal_path: 操作紀錄檔路徑，None 時不記錄
+        """
+        self.metrics = RunMetrics()
+        self._report_target = report_path
+        self._journal_target = journal_path
+        self._plan = None
+        self.file_operator.copy_backend.metrics = self.metrics
+        # I/O 排程可能由多個處理器共用，本次執行的名額統計另外記錄
+        self._io_report = {}
+
+    def _finish_metrics(self):
+        """
+        結束執行統計，輸出摘要並寫入執行報告（試跑模式不輸出）
+        """
+        metrics = self.metrics
+        if metrics is None or metrics.finished:
+            return
+        metrics.finish()
+        if self.dry_run:
+            return
+
+        for line in metrics.format_summary(OPERATION_LABELS):
+            self.log_message(line)
+        if not self._report_target:
+            return
+
+        extra = {
+            'manifest': self._manifest_path,
+            'journal': self._journal_target,
+            'resumed': self.resume,
+            'cancelled': self.cancelled,
+            'copy_backends': self.file_operator.copy_backend.get_report(),
+            'link_mode': self.file_operator.link_mode,
+        }
+        if self.file_operator.io_scheduler is not None:
+            extra['io_groups'] = self.file_operator.io_scheduler.get_report(self._io_report)
+        if self.content_index is not None:
+            extra['content_index'] = self.content_index.get_report()
+        if self._plan is not None:
+            extra['plan'] = {
+                'operations': dict(self._plan.counts),
+                'skipped_rows': self._plan.skipped_rows,
+                'invalid_rows': self._plan.invalid_rows,
+                'removed_duplicates': self._plan.removed_duplicates,
+            }
+        if metrics.write_report(self._report_target, extra):
+            self.log_message(f"執行報告已寫入: {self._report_target}")
+        else:
+            self.log_message(f"無法寫入執行報告: {self._report_target}", logging.WARNING)
+
+    def _open_journal(self):
+        """
+        開啟操作紀錄，繼續執行時先讀取先前的紀錄
+        """
+        self.journal = None
+        self._resume_state = JournalState()
+        if not self._journal_target:
+            return
+
+        journal = OperationJournal(self._journal_target)
+        if self.resume:
+            self._resume_state = state = journal.load()
+            if not state.completed and not state.in_progress:
+                self.log_message(f"找不到先前的執行紀錄，將從頭執行: {self._journal_target}")
+            else:
+                if state.manifest and self._manifest_info and state.manifest != self._manifest_info:
+                    self.log_message("設定檔在上次執行後已變更，內容不同的資料列會重新執行", logging.WARNING)
+                status = "先前的執行已全部完成" if state.finished else "繼續先前中斷的執行"
+                self.log_message(
+                    f"{status}：已完成 {len(state.completed)} 項操作，"
+                    f"{len(state.in_progress)} 項中斷的操作將重做"
+                )
+        try:
+            journal.open(self._manifest_info, append=self.resume)
+        except OSError as e:
+            self.log_message(f"無法寫入操作紀錄，本次執行無法繼續: {e}", logging.WARNING)
+            return
+        self.journal = journal
+
+    def _open_verifier(self):
+        """
+        啟用驗證時建立複製驗證器，並讓分段複製同時計算來源雜湊值
+        """
+        self.verifier = None
+        self._verified_before = set()
+        if not self.verify:
+            return
+        self.verifier = CopyVerifier(
+            self.verify_algorithm,
+            self.verify_workers or default_worker_count(),
+            self.file_operator.copy_chunk_size,
+            self.log_message
+        )
+        self.file_operator.copy_backend.hash_algorithm = self.verify_algorithm
+
+    def _close_verifier(self):
+        """
+        關閉複製驗證器
+        """
+        if self.verifier is not None:
+            self.verifier.shutdown()
+            self.verifier = None
+        self.file_operator.copy_backend.hash_algorithm = None
+
+    def _open_content_index(self):
+        """
+        開啟內容索引，無法開啟時本次執行不使用索引
+        """
+        self.file_operator.content_index = None
+        if self.content_index is None:
+            return
+        self.content_index.reset_report()
+        if self.content_index.open():
+            self.file_operator.content_index = self.content_index
+
+    def _close_content_index(self):
+        """
+        提交並關閉內容索引
+        """
+        self.file_operator.content_index = None
+        if self.content_index is not None:
+            self.content_index.close()
+
+    def _verified_items(self, original_items):
+        """
+        等待所有驗證完成，只保留所有複本都通過驗證的原始項目
+
+        Args:
+            original_items: 原始項目路徑列表
+
+        Returns:
+            list: 通過驗證的原始項目路徑列表
+        """
+        with self.metrics.stage('verify'):
+            verified = self.verifier.results() | self._verified_before
+        rejected = [item for item in original_items if item not in verified]
+        self.log_message(
+            f"驗證複本（{self.verify_algorithm}）: {self.verifier.files_verified} 個檔案，"
+            f"{self.verifier.mismatches} 個內容不符"
+        )
+        if rejected:
+            self.log_message(f"{len(rejected)} 個項目未通過驗證，原始資料不會被刪除", logging.WARNING)
+            self.metrics.record_failed_rows(len(rejected))
+        return [item for item in original_items if item in verified]
+
+    def _close_journal(self):
+        """
+        關閉操作紀錄
+        """
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def _delete_originals(self, items):
+        """
+        刪除原始資料，刪除前先確認所有完成紀錄都已寫入磁碟
+
+        Args:
+            items: 要刪除的原始項目路徑列表
+        """
+        if self.journal is not None:
+            self.journal.sync()
+        with self.metrics.stage('delete'):
+            self.file_operator.delete_items(items)
+
+    def process_excel(self, rows):
         """
         處理 Excel 資料
-        
+
+        資料列先經由規劃器轉換為操作，再交給執行器執行；操作會邊讀取邊執行，
+        只有在事先確認刪除（需要完整計畫判斷可搬移的來源）或指定 plan_first 時才會先規劃全部資料列。
+        呼叫 cancel() 後會在操作之間停止，且不會刪除任何原始資料。
+        結束時輸出執行統計，並在有報告路徑時寫入執行報告。
+
         Args:
-            df: pandas DataFrame
-            
+            rows: 資料列的可迭代物件（如 ManifestReader），或 pandas DataFrame
+
         Returns:
             list: 處理過的原始項目列表
         """
-        original_items = []
+        # 由 read_and_process_excel 呼叫時，統計由該方法開始與結束
+        owns_metrics = self.metrics is None or self.metrics.finished
+        if owns_metrics:
+            # 處理器可重複使用，先前執行的停止要求不影響這次執行
+            self._cancel_event.clear()
+            self._start_metrics(self.report_path, self.journal_path)
+        try:
+            return self._process_rows(rows)
+        finally:
+            self._close_verifier()
+            self._close_content_index()
+            self._close_journal()
+            if owns_metrics:
+                self._finish_metrics()
 
-        for index, row in df.iterrows():
-            # 處理檔案路徑和文件名，支援特殊符號
-            file_path = str(row[COL_FILE_PATH]) if pd.notna(row[COL_FILE_PATH]) else None
-            file_name = str(row[COL_FILE]) if pd.notna(row[COL_FILE]) else None
-            new_name = str(row[COL_NEW_NAME]) if pd.notna(row.get(COL_NEW_NAME)) else None
-            
-            # 正規化路徑
-            if file_path:
-                file_path = normalize_path(file_path, self.log_message)
-            
-            # 檢查Rename Folder欄位的值
-            rename_folder = False
-            if COL_RENAME_FOLDER in row and pd.notna(row[COL_RENAME_FOLDER]):
-                folder_value = str(row[COL_RENAME_FOLDER]).strip().lower()
-                rename_folder = folder_value == '是' or folder_value == 'true' or folder_value == '1'
-                
-            target_paths = self.get_all_target_paths(row)
-
-            try:
-                # 情況四: 純重命名操作 - 有文件路徑、文件名和新名稱，但沒有目標路徑
-                if file_path and file_name and new_name and not target_paths:
-                    self.log_message(f"執行純重命名操作")
-                    self.file_operator.rename_file_in_place(file_path, file_name, new_name)
-                    continue  # 處理下一行
-                
-                # 情況一：檔案操作（複製/改名）
-                elif file_path and file_name and target_paths:
-                    full_file_path = os.path.join(file_path, file_name)
-                    if os.path.exists(full_file_path):
-                        successful_copies = self.file_operator.copy_to_multiple_paths(
-                            full_file_path, target_paths, 
-                            is_file=True, new_name=new_name
-                        )
-                        if successful_copies:
-                            original_items.append(full_file_path)
-                    else:
-                        self.log_message(f"檔案 {full_file_path} 不存在")
-                        # 嘗試列出目錄內容，以幫助調試
-                        try:
-                            dir_contents = os.listdir(file_path)
-                            self.log_message(f"目錄 {file_path} 包含的檔案: {dir_contents}")
-                        except Exception as e:
-                            self.log_message(f"無法列出目錄內容: {e}")
-
-                # 情況二：資料夾操作（複製/改名）
-                elif file_path and not file_name:
-                    if os.path.isdir(file_path):
-                        if rename_folder:
-                            # 改名模式：直接使用New Folder Path作為目標路徑
-                            successful_copies = self.file_operator.copy_to_multiple_paths(
-                                file_path, target_paths,
-                                is_file=False,
-                                rename_folder=True
-                            )
-                        else:
-                            # 保持原名複製模式
-                            successful_copies = self.file_operator.copy_to_multiple_paths(
-                                file_path, target_paths,
-                                is_file=False,
-                                rename_folder=False
-                            )
-                        
-                        if successful_copies:
-                            original_items.append(file_path)
-                    else:
-                        self.log_message(f"指定的路徑 {file_path} 不是資料夾")
-
-                # 情況三：建立新資料夾
-                elif not file_path and not file_name and target_paths:
-                    for path in target_paths:
-                        create_directory_safely(path, self.log_message)
-                        
-                # 檢查是否有未處理的情況
-                else:
-                    if not file_path:
-                        self.log_message("未指定檔案路徑，無法進行操作")
-                    if not file_name and not (not file_path):
-                        self.log_message("未指定檔案名稱，無法進行檔案操作")
-                    if not new_name and not target_paths and file_path and file_name:
-                        self.log_message("未指定新名稱或目標路徑，無法進行操作")
-
-            except Exception as e:
-                self.log_message(f"處理時發生錯誤: {e}")
-                import traceback
-                self.log_message(traceback.format_exc())
+    def _process_rows(self, rows):
+        """
+        規劃並執行所有資料列，再依設定刪除原始資料
+
+        Args:
+            rows: 資料列的可迭代物件，或 pandas DataFrame
+
+        Returns:
+            list: 處理過的原始項目列表
+        """
+        self._main_thread = threading.current_thread()
+        if hasattr(rows, 'iterrows'):
+            rows = (row for _, row in rows.iterrows())
+        rows = self.metrics.timed(rows, 'read_manifest')
+
+        if self.dry_run:
+            self.plan_excel(rows)
+            return []
+
+        self._open_journal()
+        self._open_verifier()
+        self._open_content_index()
+        # 每次執行使用新的來源索引，同一來源資料夾只列出一次
+        self.source_index = SourceIndex()
+        self.file_operator.source_index = self.source_index
+        # 繼續中斷的執行時，已完成操作的來源可能已被搬移或刪除，由 _run_operation 略過
+        planner = OperationPlanner(self.log_message, source_index=self.source_index,
+                                   completed_keys=self._resume_state.completed)
+        self._plan = planner.plan
+        # 要求停止後不再讀取與規劃後續的資料列
+        operations = itertools.takewhile(lambda _: not self._cancel_event.is_set(),
+                                         self.metrics.timed(planner.iter_operations(rows), 'plan'))
+        row_count, self._row_count = self._row_count, None
+        with self._progress_lock:
+            self._operations_done = 0
+            self._operations_total = None
+            self._total_counts_rows = False
+            self._started = time.monotonic()
+        self.file_operator.copy_backend.reset_report()
+        # 同一目標目錄只檢查和建立一次；沒有共用快取時每次執行使用新的目錄快取
+        directory_cache = self.shared_directory_cache
+        if directory_cache is None:
+            directory_cache = DirectoryCache(self.revalidate_directories)
+        self.file_operator.directory_cache = directory_cache
+
+        # 事先確認刪除原始資料時，同一檔案系統的來源可直接改名搬移
+        delete_confirmed = None
+        self._movable_sources = set()
+        if self.confirm_delete_upfront and self.confirm_delete_callback:
+            delete_confirmed = bool(self.confirm_delete_callback(
+                "是否在處理完成後刪除所有原始資料？同一檔案系統上的項目將直接搬移"
+            ))
+            if delete_confirmed:
+                operations = list(operations)
+                with self.metrics.stage('plan'):
+                    self._movable_sources = self.find_movable_sources(operations)
+        if self.plan_first and not isinstance(operations, list):
+            operations = list(operations)
+        if isinstance(operations, list):
+            with self._progress_lock:
+                self._operations_total = len(operations)
+        elif row_count is not None:
+            with self._progress_lock:
+                self._operations_total = row_count
+                self._total_counts_rows = True
+
+        io_scheduler = self.file_operator.io_scheduler
+        io_reporting = io_scheduler.reporting(self._io_report) if io_scheduler is not None else nullcontext()
+        with self.metrics.stage('copy'), io_reporting:
+            if self.max_workers <= 1:
+                original_items = []
+                for operation in operations:
+                    if self._cancel_event.is_set():
+                        break
+                    item = self._run_operation(operation)
+                    if item:
+                        original_items.append(item)
+            else:
+                self.log_message(f"以 {self.max_workers} 個工作執行緒平行處理")
+                executor = ParallelRowExecutor(self.max_workers, self.log_message,
+                                               io_scheduler=self.file_operator.io_scheduler)
+                tasks = (
+                    (operation.paths, lambda operation=operation: self._run_operation(operation))
+                    for operation in operations
+                )
+                try:
+                    original_items = executor.run(tasks, poll_callback=self._flush_log)
+                finally:
+                    self._flush_log()
+
+        self.metrics.record_failed_rows(planner.plan.invalid_rows)
+        for line in planner.plan.format_summary():
+            self.log_message(line)
+        self.log_message(self.file_operator.copy_backend.format_report())
+        if self.file_operator.io_scheduler is not None:
+            for line in self.file_operator.io_scheduler.format_report(self._io_report):
+                self.log_message(line)
+        if self.file_operator.content_index is not None:
+            self.log_message(self.file_operator.content_index.format_report())
+
+        self._movable_sources = set()
+
+        if self.verifier is not None:
+            original_items = self._verified_items(original_items)
+
+        if self._cancel_event.is_set():
+            self.log_message("處理已取消，尚未執行的操作已略過，原始資料已保留", logging.WARNING)
+            return original_items
 
         # 處理原始檔案的刪除
-        if original_items and self.confirm_delete_callback:
+        if delete_confirmed is not None:
+            if delete_confirmed and original_items:
+                self._delete_originals(original_items)
+            elif not delete_confirmed:
+                self.log_message("原始資料已保留")
+        elif original_items and self.confirm_delete_callback:
             if self.confirm_delete_callback("是否刪除所有原始資料？"):
-                self.file_operator.delete_items(original_items)
+                self._delete_originals(original_items)
             else:
                 self.log_message("原始資料已保留")
 
+        if self.journal is not None:
+            self.journal.finish()
         return original_items
     
+    @spanned('read_and_process_excel')
     def read_and_process_excel(self, excel_file_path):
         """
         讀取並處理 Excel 檔案
@@ -182,47 +786,74 @@ class ExcelProcessor:
         Returns:
             bool: 處理成功返回True，否則返回False
         """
+        self._main_thread = threading.current_thread()
+        # 處理器可重複使用（如監看模式的常駐處理器），先前執行的停止要求不影響這次執行
+        self._cancel_event.clear()
+        self._start_metrics()
+        self._manifest_info = None
+        self._row_count = None
         try:
             # 正規化 Excel 檔案路徑
             excel_file_path = normalize_path(excel_file_path, self.log_message)
+            self._manifest_path = excel_file_path
+            manifest_stem = os.path.splitext(excel_file_path)[0]
+            self._report_target = self.report_path or manifest_stem + REPORT_SUFFIX
+            self._journal_target = self.journal_path or manifest_stem + JOURNAL_SUFFIX
             
             # 檢查檔案是否存在
             if not os.path.exists(excel_file_path):
-                self.log_message(f"錯誤: 找不到Excel檔案: {excel_file_path}")
+                self.log_message(f"錯誤: 找不到Excel檔案: {excel_file_path}", logging.ERROR)
                 return False
                 
-            # 讀取 Excel 檔案
+            manifest_stat = os.stat(excel_file_path)
+            self._manifest_info = {
+                'path': excel_file_path,
+                'size': manifest_stat.st_size,
+                'mtime': manifest_stat.st_mtime,
+            }
+
+            # 開啟 Excel 檔案，只先讀取標題列
             self.log_message(f"正在讀取Excel檔案: {excel_file_path}")
-            df = pd.read_excel(excel_file_path)
-            self.log_message(f"成功讀取Excel檔案，開始處理...")
-            
-            # 檢查必要的欄位是否存在
-            required_columns = [
-                COL_FILE_PATH,
-                COL_FILE,
-                COL_NEW_NAME,
-                COL_NEW_FOLDER_PATH,
-                COL_NEW_FOLDER_PATH2,
-                COL_NEW_FOLDER_PATH3,
-                COL_RENAME_FOLDER
-            ]
-            
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                error_msg = f"Excel檔案缺少必要的欄位：{', '.join(missing_columns)}"
-                self.log_message(error_msg)
+            with self.metrics.stage('read_manifest'):
+                reader = ManifestReader(excel_file_path)
+            with reader:
+                # 檢查必要的欄位是否存在
+                required_columns = [
+                    COL_FILE_PATH,
+                    COL_FILE,
+                    COL_NEW_NAME,
+                    COL_NEW_FOLDER_PATH,
+                    COL_NEW_FOLDER_PATH2,
+                    COL_NEW_FOLDER_PATH3,
+                    COL_RENAME_FOLDER
+                ]
+
+                missing_columns = [col for col in required_columns if col not in reader.columns]
+                if missing_columns:
+                    error_msg = f"Excel檔案缺少必要的欄位：{', '.join(missing_columns)}"
+                    self.log_message(error_msg, logging.ERROR)
+                    return False
+
+                if self.count_rows and not self.plan_first:
+                    with self.metrics.stage('read_manifest'):
+                        self._row_count = count_manifest_rows(excel_file_path)
+
+                # 邊讀取邊處理 Excel 資料
+                self.log_message(f"成功開啟Excel檔案，開始處理...")
+                self.process_excel(reader)
+
+            if self._cancel_event.is_set():
                 return False
-            
-            # 處理 Excel 資料
-            self.process_excel(df)
             self.log_message("處理完成！")
             return True
             
         except Exception as e:
-            self.log_message(f"錯誤: {str(e)}")
-            self.log_message(f"檔案路徑: {excel_file_path}")
+            self.log_message(f"錯誤: {str(e)}", logging.ERROR)
+            self.log_message(f"檔案路徑: {excel_file_path}", logging.ERROR)
             if hasattr(e, '__traceback__'):
                 import traceback
-                self.log_message("詳細錯誤訊息:")
-                self.log_message(traceback.format_exc())
-            return False
\ No newline at end of file
+                self.log_message("詳細錯誤訊息:", logging.ERROR)
+                self.log_message(traceback.format_exc(), logging.ERROR)
+            return False
+        finally:
+            self._finish_metrics()
\ No newline at end of file
@@ -3,34 +3,127 @@
 """
 import os
 import shutil
+import hashlib
+import logging
+from constants import (
+    COPY_CHUNK_SIZE,
+    COPY_BACKEND_AUTO,
+    COPY_BACKEND_BUFFERED,
+    COPY_BACKEND_FANOUT,
+    FOLDER_SYNC_REPLACE,
+    FOLDER_SYNC_INCREMENTAL,
+    SYNC_MTIME_TOLERANCE,
+    LINK_MODE_OFF,
+)
+from copy_backends import CopyBackend
+from log_sink import emit_log, supports_level
 from utils import normalize_path, create_directory_safely, safe_path_join
+from profiling import spanned
 
 class FileOperator:
     """
     檔案和資料夾操作類
     """
-    def __init__(self, log_callback=None):
+    def __init__(self, log_callback=None, fanout_copy=True, copy_chunk_size=COPY_CHUNK_SIZE,
+                 copy_backend=COPY_BACKEND_AUTO, folder_sync_mode=FOLDER_SYNC_REPLACE, sync_hash=False,
+                 directory_cache=None, source_index=None, io_scheduler=None, link_mode=LINK_MODE_OFF,
+                 content_index=None):
         """
         初始化檔案操作類
         
         Args:
             log_callback: 日誌輸出回呼函數
+            fanout_copy: 複製到多個目標時，是否只讀取來源一次並同時寫入所有目標
+            copy_chunk_size: 分段複製時每次讀取的位元組數
+            copy_backend: 檔案複製方式（auto、reflink、copy_file_range、sendfile、buffered）
+            folder_sync_mode: 目標資料夾已存在時的處理方式，replace 為刪除後重新複製，incremental 為增量同步
+            sync_hash: 增量同步時，大小相同的檔案是否以內容雜湊值（而非修改時間）判斷是否變更
+            directory_cache: 共用的 DirectoryCache，None 時每次都檢查目錄
+            source_index: 共用的 SourceIndex，None 時每次都直接檢查來源
+            io_scheduler: 共用的 IOScheduler，依儲存裝置限制同時進行的複製操作，None 時不限制
+            link_mode: 多個目標位於同一檔案系統時，off 為每個目標都實際複製，
+                       hardlink／reflink 為只複製一次、其他目標以硬連結／reflink 建立
+            content_index: 持久化的 ContentIndex，目標內容已與來源相同時略過複製，None 時一律複製
         """
         self.log_callback = log_callback
+        self.fanout_copy = fanout_copy
+        self.copy_chunk_size = copy_chunk_size
+        self.copy_backend = CopyBackend(copy_backend, copy_chunk_size)
+        self.folder_sync_mode = folder_sync_mode
+        self.sync_hash = sync_hash
+        self.directory_cache = directory_cache
+        self.source_index = source_index
+        self.io_scheduler = io_scheduler
+        self.link_mode = link_mode
+        self.content_index = content_index
     
-    def log_message(self, message):
+    @supports_level
+    def log_message(self, message, level=logging.INFO):
         """
         輸出日誌訊息
         
         Args:
             message: 訊息內容
+            level: 日誌層級
         """
         if self.log_callback:
-            self.log_callback(message)
+            emit_log(self.log_callback, message, level)
         else:
             print(message)
     
-    def handle_folder_operations(self, source_path, target_path, rename_folder=False):
+    @property
+    def content_index(self):
+        """
+        內容索引，None 時不使用
+
+        Returns:
+            ContentIndex: 內容索引
+        """
+        return self.copy_backend.content_index
+
+    @content_index.setter
+    def content_index(self, content_index):
+        # 複製後端在每次完成複製時寫入索引
+        self.copy_backend.content_index = content_index
+
+    def ensure_directory(self, path):
+        """
+        確保目錄存在，有目錄快取時每個目錄只檢查一次
+
+        Args:
+            path: 目錄路徑
+
+        Returns:
+            bool: 目錄存在或建立成功返回True，否則返回False
+        """
+        return create_directory_safely(path, self.log_message, self.directory_cache)
+
+    def source_exists(self, path):
+        """
+        檢查來源是否存在，有來源索引時從索引回答
+
+        Args:
+            path: 來源路徑
+
+        Returns:
+            bool: 存在返回True，否則返回False
+        """
+        if self.source_index is not None:
+            return self.source_index.lookup(path)[0]
+        return os.path.exists(path)
+
+    def forget_directory(self, path):
+        """
+        目錄被刪除或搬移後，從目錄快取中移除
+
+        Args:
+            path: 目錄路徑
+        """
+        if self.directory_cache is not None:
+            self.directory_cache.invalidate(path)
+
+    @spanned('handle_folder_operations')
+    def handle_folder_operations(self, source_path, target_path, rename_folder=False, sync_mode=None, link_from=None):
         """
         處理資料夾操作（複製/改名）
         
@@ -38,7 +131,9 @@ class FileOperator:
             source_path: 來源資料夾路徑
             target_path: 目標路徑
             rename_folder: 是否重命名資料夾
-            
+            sync_mode: 目標資料夾已存在時的處理方式，None 時使用 folder_sync_mode
+            link_from: 同一檔案系統上已複製完成的資料夾，指定時目標的檔案以連結從此資料夾建立
+
         Returns:
             bool: 操作成功返回True，否則返回False
         """
@@ -47,47 +142,241 @@ class FileOperator:
             target_path = normalize_path(target_path, self.log_message)
             
             # 確保來源路徑存在
-            if not os.path.exists(source_path):
-                self.log_message(f"來源路徑不存在: {source_path}")
+            if not self.source_exists(source_path):
+                self.log_message(f"來源路徑不存在: {source_path}", logging.WARNING)
                 return False
 
             if rename_folder:
                 # 確保目標父資料夾存在
                 parent_path = os.path.dirname(target_path)
-                if not create_directory_safely(parent_path, self.log_message):
+                if not self.ensure_directory(parent_path):
                     return False
 
                 if os.path.dirname(source_path) == os.path.dirname(target_path):
                     # 原地改名
                     if os.path.exists(target_path):
-                        self.log_message(f"目標路徑已存在，無法改名: {target_path}")
+                        self.log_message(f"目標路徑已存在，無法改名: {target_path}", logging.WARNING)
                         return False
                     os.rename(source_path, target_path)
+                    self.forget_directory(source_path)
                     self.log_message(f"資料夾改名: {source_path} -> {target_path}")
                 else:
                     # 複製到新位置並改名
-                    if os.path.exists(target_path):
-                        shutil.rmtree(target_path)
-                    shutil.copytree(source_path, target_path)
-                    self.log_message(f"複製並改名資料夾: {source_path} -> {target_path}")
+                    linked = self.copy_folder(source_path, target_path, sync_mode, link_from)
+                    self.log_message(f"複製並改名資料夾: {source_path} -> {target_path}"
+                                     f"{self._link_note(link_from, linked)}")
             else:
                 # 一般複製，保持原資料夾名稱
-                if not create_directory_safely(target_path, self.log_message):
+                if not self.ensure_directory(target_path):
                     return False
                 
                 target_folder = os.path.join(target_path, os.path.basename(source_path))
-                if os.path.exists(target_folder):
-                    shutil.rmtree(target_folder)
-                shutil.copytree(source_path, target_folder)
-                self.log_message(f"複製資料夾: {source_path} -> {target_folder}")
+                linked = self.copy_folder(source_path, target_folder, sync_mode, link_from)
+                self.log_message(f"複製資料夾: {source_path} -> {target_folder}{self._link_note(link_from, linked)}")
 
             return True
             
         except Exception as e:
-            self.log_message(f"處理資料夾操作時發生錯誤: {e}")
+            self.log_message(f"處理資料夾操作時發生錯誤: {e}", logging.ERROR)
             return False
     
-    def copy_to_multiple_paths(self, source_path, target_paths, is_file=True, new_name=None, rename_folder=False):
+    def _link_note(self, link_from, linked):
+        """
+        以連結建立資料夾時附加在日誌訊息後的說明
+
+        Args:
+            link_from: 連結來源資料夾，None 時為實際複製
+            linked: 以連結建立的檔案數
+
+        Returns:
+            str: 說明文字
+        """
+        if not link_from or not linked:
+            return ''
+        return f"（{linked} 個檔案以 {self.link_mode} 從 {link_from} 建立）"
+
+    def copy_folder(self, source_path, target_path, sync_mode=None, link_from=None):
+        """
+        將資料夾複製到目標路徑，目標已存在時依同步模式取代或增量同步
+
+        Args:
+            source_path: 來源資料夾路徑
+            target_path: 目標資料夾路徑
+            sync_mode: 目標資料夾已存在時的處理方式，None 時使用 folder_sync_mode
+            link_from: 同一檔案系統上已複製完成的資料夾，指定時目標的檔案以連結從此資料夾建立
+
+        Returns:
+            int: 以連結建立的檔案數
+        """
+        sync_mode = sync_mode or self.folder_sync_mode
+        if sync_mode == FOLDER_SYNC_INCREMENTAL and os.path.isdir(target_path):
+            stats = self.sync_folder(source_path, target_path)
+            self.log_message(
+                f"增量同步資料夾 {source_path} -> {target_path}："
+                f"複製 {stats['copied']} 個、略過 {stats['skipped']} 個、刪除 {stats['removed']} 個"
+            )
+            return 0
+
+        if os.path.isdir(target_path) and link_from is None and self.content_index is not None:
+            # 結果與刪除後重新複製相同，但內容相同的檔案不必再複製
+            stats = self.sync_folder(source_path, target_path, by_content=True)
+            self.log_message(
+                f"依內容索引更新資料夾 {source_path} -> {target_path}："
+                f"複製 {stats['copied']} 個、內容相同略過 {stats['skipped']} 個、刪除 {stats['removed']} 個",
+                logging.DEBUG
+            )
+            return 0
+
+        if os.path.isdir(target_path):
+            shutil.rmtree(target_path)
+            self.forget_directory(target_path)
+        elif os.path.exists(target_path):
+            os.remove(target_path)
+        if link_from is None:
+            shutil.copytree(source_path, target_path, copy_function=self.copy_backend.copy_file)
+            return 0
+
+        linked = []
+
+        def link_or_copy(link_source, target_file):
+            # 無法建立連結的檔案改從原始來源複製
+            origin = os.path.join(source_path, os.path.relpath(link_source, link_from))
+            if self._link_file(link_source, target_file, origin):
+                linked.append(target_file)
+            else:
+                self.copy_backend.copy_file(origin, target_file)
+            return target_file
+
+        shutil.copytree(link_from, target_path, copy_function=link_or_copy)
+        return len(linked)
+
+    def sync_folder(self, source_path, target_path, by_content=False):
+        """
+        增量同步資料夾：只複製新增或變更的檔案，並刪除來源中已不存在的項目
+
+        Args:
+            source_path: 來源資料夾路徑
+            target_path: 目標資料夾路徑
+            by_content: 是否以內容索引（而非大小與修改時間）判斷檔案是否變更，
+                內容相同的檔案仍複製來源的權限與修改時間
+
+        Returns:
+            dict: {'copied': 複製數, 'skipped': 未變更略過數, 'removed': 刪除數}
+        """
+        stats = {'copied': 0, 'skipped': 0, 'removed': 0}
+        pending = [(source_path, target_path)]
+        synced_dirs = []
+
+        while pending:
+            source_dir, target_dir = pending.pop()
+            synced_dirs.append((source_dir, target_dir))
+            if not os.path.isdir(target_dir):
+                if os.path.exists(target_dir):
+                    os.remove(target_dir)
+                    stats['removed'] += 1
+                os.makedirs(target_dir)
+
+            with os.scandir(target_dir) as entries:
+                target_entries = {entry.name: entry for entry in entries}
+
+            with os.scandir(source_dir) as entries:
+                for entry in entries:
+                    target_entry = target_entries.pop(entry.name, None)
+                    target_item = os.path.join(target_dir, entry.name)
+
+                    # 目標中的符號連結一律移除後重建，不進入或寫入連結指向的位置
+                    if entry.is_dir():
+                        if target_entry is not None and not target_entry.is_dir(follow_symlinks=False):
+                            os.remove(target_item)
+                            stats['removed'] += 1
+                        pending.append((entry.path, target_item))
+                        continue
+
+                    if target_entry is not None:
+                        if target_entry.is_symlink():
+                            os.remove(target_item)
+                            stats['removed'] += 1
+                        elif target_entry.is_dir(follow_symlinks=False):
+                            shutil.rmtree(target_item)
+                            self.forget_directory(target_item)
+                            stats['removed'] += 1
+                        elif not self._is_file_changed(entry, target_entry, by_content):
+                            stats['skipped'] += 1
+                            if by_content:
+                                self.copy_backend.copy_unchanged_stat(entry.path, target_item)
+                                self.copy_backend.record_unchanged(entry.path, target_item, entry.stat().st_size)
+                            else:
+                                # 以大小與修改時間判斷未變更的檔案仍須驗證內容
+                                self.copy_backend.track_unchanged(entry.path, target_item)
+                            continue
+
+                    self.copy_backend.copy_file(entry.path, target_item)
+                    stats['copied'] += 1
+
+            # 刪除來源中已不存在的項目
+            for name, target_entry in target_entries.items():
+                if target_entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(target_entry.path)
+                    self.forget_directory(target_entry.path)
+                else:
+                    os.remove(target_entry.path)
+                stats['removed'] += 1
+
+        # 子資料夾的變更會影響上層資料夾的修改時間，因此由下而上複製資料夾屬性
+        for source_dir, target_dir in reversed(synced_dirs):
+            shutil.copystat(source_dir, target_dir)
+
+        return stats
+
+    def _is_file_changed(self, source_entry, target_entry, by_content=False):
+        """
+        判斷來源檔案與目標檔案是否不同
+
+        Args:
+            source_entry: 來源檔案的 os.DirEntry
+            target_entry: 目標檔案的 os.DirEntry
+            by_content: 是否以內容索引判斷
+
+        Returns:
+            bool: 檔案不同返回True，否則返回False
+        """
+        if by_content or (self.sync_hash and self.content_index is not None):
+            return not self.content_index.is_identical(source_entry.path, target_entry.path)
+
+        source_stat = source_entry.stat()
+        target_stat = target_entry.stat()
+        if source_stat.st_size != target_stat.st_size:
+            return True
+
+        if self.sync_hash:
+            if self._hash_file(source_entry.path) != self._hash_file(target_entry.path):
+                return True
+            # 內容相同時只更新修改時間，下次就不必再比對
+            if abs(source_stat.st_mtime - target_stat.st_mtime) > SYNC_MTIME_TOLERANCE:
+                shutil.copystat(source_entry.path, target_entry.path)
+            return False
+
+        return abs(source_stat.st_mtime - target_stat.st_mtime) > SYNC_MTIME_TOLERANCE
+
+    def _hash_file(self, file_path):
+        """
+        計算檔案內容的雜湊值
+
+        Args:
+            file_path: 檔案路徑
+
+        Returns:
+            str: 十六進位雜湊值
+        """
+        digest = hashlib.blake2b()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.copy_chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @spanned('copy_to_multiple_paths')
+    def copy_to_multiple_paths(self, source_path, target_paths, is_file=True, new_name=None, rename_folder=False,
+                               sync_mode=None):
         """
         複製到多個目標路徑
         
@@ -97,54 +386,482 @@ class FileOperator:
             is_file: 是否為檔案操作
             new_name: 新檔案名稱（不包含副檔名）
             rename_folder: 是否重命名資料夾
+            sync_mode: 目標資料夾已存在時的處理方式，None 時使用 folder_sync_mode
             
         Returns:
             list: 成功複製的目標路徑列表
         """
-        successful_copies = []
-        
+        source_path = normalize_path(source_path, self.log_message)
+
+        if is_file:
+            return self._copy_file_to_multiple_paths(source_path, target_paths, new_name)
+
+        target_paths = [normalize_path(target_path, self.log_message) for target_path in target_paths]
+        copies, links = target_paths, []
+        if self.link_mode != LINK_MODE_OFF and len(target_paths) > 1:
+            copies, links = self._split_link_targets(target_paths)
+
+        results = self._copy_folder_to_paths(source_path, [(target_path, None) for target_path in copies],
+                                             rename_folder, sync_mode)
+        copied = {target_path for target_path, success in zip(copies, results) if success}
+        if links:
+            # 同一檔案系統上的其他目標從已複製完成的資料夾建立連結，該資料夾複製失敗時改為實際複製
+            jobs = [
+                (target_path, self._folder_destination(source_path, primary, rename_folder)
+                 if primary in copied else None)
+                for target_path, primary in links
+            ]
+            results = self._copy_folder_to_paths(source_path, jobs, rename_folder, sync_mode)
+            copied.update(target_path for (target_path, _), success in zip(jobs, results) if success)
+        return [target_path for target_path in target_paths if target_path in copied]
+
+    def _copy_folder_to_paths(self, source_path, jobs, rename_folder=False, sync_mode=None):
+        """
+        將資料夾複製到多個目標路徑
+
+        Args:
+            source_path: 已正規化的來源資料夾路徑
+            jobs: (已正規化的目標路徑, 連結來源資料夾或 None) 的列表
+            rename_folder: 是否重命名資料夾
+            sync_mode: 目標資料夾已存在時的處理方式，None 時使用 folder_sync_mode
+
+        Returns:
+            list: 各目標是否成功，順序與 jobs 相同
+        """
+        if self.io_scheduler is None:
+            return [self._copy_folder_to_path(source_path, target_path, rename_folder, sync_mode, link_from)
+                    for target_path, link_from in jobs]
+        # 每個目標各自取得來源與目標裝置的名額，先複製名額已空出的目標
+        return self.io_scheduler.run([
+            ((link_from or source_path, target_path),
+             lambda target_path=target_path, link_from=link_from: self._copy_folder_to_path(
+                 source_path, target_path, rename_folder, sync_mode, link_from))
+            for target_path, link_from in jobs
+        ])
+
+    def _folder_destination(self, source_path, target_path, rename_folder=False):
+        """
+        取得資料夾複製後實際所在的路徑
+
+        Args:
+            source_path: 來源資料夾路徑
+            target_path: 目標路徑
+            rename_folder: 是否重命名資料夾
+
+        Returns:
+            str: 複製後的資料夾路徑
+        """
+        if rename_folder:
+            return target_path
+        return os.path.join(target_path, os.path.basename(source_path))
+
+    def _copy_folder_to_path(self, source_path, target_path, rename_folder=False, sync_mode=None, link_from=None):
+        """
+        將資料夾複製到單一目標路徑
+
+        Args:
+            source_path: 已正規化的來源資料夾路徑
+            target_path: 已正規化的目標路徑
+            rename_folder: 是否重命名資料夾
+            sync_mode: 目標資料夾已存在時的處理方式，None 時使用 folder_sync_mode
+            link_from: 同一檔案系統上已複製完成的資料夾，指定時以連結建立
+
+        Returns:
+            bool: 成功返回True，否則返回False
+        """
+        try:
+            # 處理資料夾複製/改名
+            return bool(self.handle_folder_operations(source_path, target_path, rename_folder, sync_mode,
+                                                       link_from))
+        except PermissionError:
+            self.log_message(f"沒有權限複製到 {target_path}", logging.ERROR)
+        except FileNotFoundError:
+            self.log_message(f"找不到檔案或目錄: {source_path} 或 {target_path}", logging.ERROR)
+        except Exception as e:
+            self.log_message(f"複製到 {target_path} 時發生錯誤: {e}", logging.ERROR)
+        return False
+
+    def _copy_file_to_multiple_paths(self, source_path, target_paths, new_name=None):
+        """
+        將單一檔案複製到多個目標資料夾
+
+        Args:
+            source_path: 已正規化的來源檔案路徑
+            target_paths: 目標資料夾路徑列表
+            new_name: 新檔案名稱（不包含副檔名）
+
+        Returns:
+            list: 成功複製的目標路徑列表
+        """
+        # 處理檔案名稱，支援特殊符號
+        base_name = os.path.basename(source_path)
+        file_ext = os.path.splitext(base_name)[1]
+        file_name = new_name + file_ext if new_name else base_name
+
+        # 先準備所有目標，(目標資料夾, 目標檔案)
+        targets = []
+        # 內容已與來源相同、不必複製的目標資料夾
+        unchanged = []
         for target_path in target_paths:
             try:
-                source_path = normalize_path(source_path, self.log_message)
                 target_path = normalize_path(target_path, self.log_message)
-                
-                if is_file:
-                    # 處理檔案複製
-                    if not create_directory_safely(target_path, self.log_message):
+                if not self.ensure_directory(target_path):
+                    continue
+
+                target_file = os.path.join(target_path, file_name)
+
+                # 檢查目標檔案是否已存在
+                if os.path.exists(target_file):
+                    if os.path.samefile(source_path, target_file):
+                        self.log_message(f"目標檔案與來源檔案相同，略過: {target_file}", logging.WARNING)
                         continue
-                    
-                    # 處理檔案名稱，支援特殊符號
-                    base_name = os.path.basename(source_path)
-                    file_ext = os.path.splitext(base_name)[1]
-                    
-                    if new_name:
-                        file_name = new_name + file_ext
-                    else:
-                        file_name = base_name
-                        
-                    target_file = os.path.join(target_path, file_name)
-                    
-                    # 檢查目標檔案是否已存在
-                    if os.path.exists(target_file):
-                        self.log_message(f"目標檔案已存在，將被覆蓋: {target_file}")
-                        
-                    shutil.copy2(source_path, target_file)
-                    self.log_message(f"複製檔案 {source_path} 到 {target_file}")
-                    successful_copies.append(target_path)
-                else:
-                    # 處理資料夾複製/改名
-                    if self.handle_folder_operations(source_path, target_path, rename_folder):
-                        successful_copies.append(target_path)
+                    if self.content_index is not None and self.content_index.is_identical(source_path, target_file):
+                        self.log_message(f"目標檔案內容與來源相同，略過複製: {target_file}", logging.DEBUG)
+                        self.copy_backend.copy_unchanged_stat(source_path, target_file)
+                        self.copy_backend.record_unchanged(source_path, target_file, os.path.getsize(target_file))
+                        unchanged.append(target_path)
+                        continue
+                    self.log_message(f"目標檔案已存在，將被覆蓋: {target_file}", logging.WARNING)
+
+                targets.append((target_path, target_file))
+            except PermissionError:
+                self.log_message(f"沒有權限複製到 {target_path}", logging.ERROR)
+            except Exception as e:
+                self.log_message(f"複製到 {target_path} 時發生錯誤: {e}", logging.ERROR)
+
+        if self.io_scheduler is None or not targets:
+            return unchanged + self._copy_file_to_targets(source_path, targets)
+
+        # 來源只讀取一次同時寫入所有目標，因此一次取得來源與所有目標裝置的名額
+        with self.io_scheduler.slot((source_path,) + tuple(target_path for target_path, _ in targets)):
+            return unchanged + self._copy_file_to_targets(source_path, targets)
+
+    def _copy_file_to_targets(self, source_path, targets):
+        """
+        將單一檔案複製到已準備好的目標，啟用連結模式時同一檔案系統上只實際複製一次
+
+        Args:
+            source_path: 已正規化的來源檔案路徑
+            targets: (目標資料夾, 目標檔案) 的列表
+
+        Returns:
+            list: 成功複製的目標資料夾列表
+        """
+        if self.link_mode == LINK_MODE_OFF or len(targets) < 2:
+            return self._write_file_to_targets(source_path, targets)
+
+        copies, links = self._split_link_targets(targets, key=lambda target: target[0])
+        successful_copies = set(self._write_file_to_targets(source_path, copies))
+        unlinked = []
+        for (target_path, target_file), (primary_path, primary_file) in links:
+            if primary_path in successful_copies and self._link_file(primary_file, target_file, source_path):
+                successful_copies.add(target_path)
+            else:
+                unlinked.append((target_path, target_file))
+        if unlinked:
+            successful_copies.update(self._write_file_to_targets(source_path, unlinked))
+        return [target_path for target_path, _ in targets if target_path in successful_copies]
+
+    def _link_file(self, link_source, target_file, origin):
+        """
+        以連結從已複製完成的檔案建立目標檔案
+
+        Args:
+            link_source: 已複製完成的檔案路徑
+            target_file: 目標檔案路徑
+            origin: 原始來源檔案路徑
+
+        Returns:
+            bool: 建立成功返回True，無法建立時返回False（由呼叫端改為實際複製）
+        """
+        try:
+            if not self.copy_backend.link_file(link_source, target_file, self.link_mode, origin):
+                return False
+        except OSError as e:
+            self.log_message(f"無法以 {self.link_mode} 建立 {target_file}，改為複製: {e}", logging.DEBUG)
+            return False
+        self.log_message(f"以 {self.link_mode} 建立 {target_file}（來自 {link_source}）", logging.DEBUG)
+        return True
+
+    def _split_link_targets(self, items, key=None):
+        """
+        依所在的檔案系統分組：每個檔案系統的第一個目標實際複製，其他目標從它建立連結
+
+        Args:
+            items: 目標列表
+            key: 從目標取得路徑的函數，None 時目標本身即為路徑
+
+        Returns:
+            tuple: (實際複製的目標列表, (以連結建立的目標, 連結來源目標) 列表)
+        """
+        copies = []
+        links = []
+        primaries = {}
+        for item in items:
+            device = self._existing_device(key(item) if key else item)
+            if device is None:
+                copies.append(item)
+            elif device in primaries:
+                links.append((item, primaries[device]))
+            else:
+                primaries[device] = item
+                copies.append(item)
+        return copies, links
+
+    def _existing_device(self, path):
+        """
+        取得路徑所在的檔案系統，路徑尚未建立時以最近一個存在的上層目錄判斷
 
+        Args:
+            path: 路徑
+
+        Returns:
+            int: st_dev，無法判斷時為 None
+        """
+        while path and not os.path.exists(path):
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            return None
+
+    def _write_file_to_targets(self, source_path, targets):
+        """
+        將單一檔案實際複製到已準備好的目標
+
+        Args:
+            source_path: 已正規化的來源檔案路徑
+            targets: (目標資料夾, 目標檔案) 的列表
+
+        Returns:
+            list: 成功複製的目標資料夾列表
+        """
+        # 指定核心複製方式時每個目標各自複製，否則多目標時只讀取來源一次
+        use_fanout = self.fanout_copy and len(targets) > 1 and \
+            self.copy_backend.name in (COPY_BACKEND_AUTO, COPY_BACKEND_BUFFERED)
+        if use_fanout:
+            copied_files = self.copy_file_fanout(source_path, [target_file for _, target_file in targets])
+            return [target_path for target_path, target_file in targets if target_file in copied_files]
+
+        successful_copies = []
+        for target_path, target_file in targets:
+            try:
+                self.copy_backend.copy_file(source_path, target_file)
+                self.log_message(f"複製檔案 {source_path} 到 {target_file}", logging.DEBUG)
+                successful_copies.append(target_path)
             except PermissionError:
-                self.log_message(f"沒有權限複製到 {target_path}")
+                self.log_message(f"沒有權限複製到 {target_path}", logging.ERROR)
             except FileNotFoundError:
-                self.log_message(f"找不到檔案或目錄: {source_path} 或 {target_path}")
+                self.log_message(f"找不到檔案或目錄: {source_path} 或 {target_path}", logging.ERROR)
             except Exception as e:
-                self.log_message(f"複製到 {target_path} 時發生錯誤: {e}")
-        
+                self.log_message(f"複製到 {target_path} 時發生錯誤: {e}", logging.ERROR)
+
         return successful_copies
+
+    def copy_file_fanout(self, source_file, target_files):
+        """
+        只讀取來源檔案一次，同時寫入多個目標檔案
+
+        任一目標寫入失敗時只放棄該目標（並刪除未完成的檔案），其他目標繼續寫入。
+
+        Args:
+            source_file: 來源檔案路徑
+            target_files: 目標檔案路徑列表
+
+        Returns:
+            list: 成功寫入的目標檔案路徑列表
+        """
+        outputs = {}
+        for target_file in target_files:
+            if target_file in outputs:
+                continue
+            try:
+                outputs[target_file] = open(target_file, 'wb')
+            except PermissionError:
+                self.log_message(f"沒有權限複製到 {target_file}", logging.ERROR)
+            except Exception as e:
+                self.log_message(f"複製到 {target_file} 時發生錯誤: {e}", logging.ERROR)
+
+        def discard(target_file):
+            output = outputs.pop(target_file)
+            try:
+                output.close()
+            except Exception:
+                pass
+            try:
+                os.remove(target_file)
+            except OSError:
+                pass
+
+        # 啟用複製驗證時，以同一份讀入的內容計算來源雜湊值
+        hasher = self.copy_backend.new_hasher()
+        copied_bytes = 0
+        try:
+            with open(source_file, 'rb') as source:
+                while outputs:
+                    chunk = source.read(self.copy_chunk_size)
+                    if not chunk:
+                        break
+                    copied_bytes += len(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    for target_file, output in list(outputs.items()):
+                        try:
+                            output.write(chunk)
+                        except Exception as e:
+                            self.log_message(f"寫入 {target_file} 時發生錯誤: {e}", logging.ERROR)
+                            discard(target_file)
+        except Exception as e:
+            # 來源讀取失敗時所有目標都不完整
+            self.log_message(f"讀取來源檔案 {source_file} 時發生錯誤: {e}", logging.ERROR)
+            for target_file in list(outputs):
+                discard(target_file)
+            return []
+
+        copied_files = []
+        for target_file in list(outputs):
+            try:
+                outputs.pop(target_file).close()
+                shutil.copystat(source_file, target_file)
+                self.log_message(f"複製檔案 {source_file} 到 {target_file}", logging.DEBUG)
+                copied_files.append(target_file)
+            except Exception as e:
+                self.log_message(f"複製到 {target_file} 時發生錯誤: {e}", logging.ERROR)
+
+        if copied_files:
+            self.copy_backend.record(COPY_BACKEND_FANOUT, copied_bytes, copied_files)
+            # 有成功的目標代表來源已完整讀到結尾，雜湊值可直接用於驗證
+            digest = hasher.hexdigest() if hasher is not None else None
+            for target_file in copied_files:
+                self.copy_backend.track_copy(source_file, target_file, digest)
+
+        return copied_files
     
+    @spanned('move_to_multiple_paths')
+    def move_to_multiple_paths(self, source_path, target_paths, is_file=True, new_name=None, rename_folder=False,
+                               sync_mode=None, verify_copies=None):
+        """
+        複製到多個目標路徑，並在來源與某個目標位於同一檔案系統時直接改名搬移
+
+        其他目標會先複製完成，最後才以 os.rename 將來源搬到同一檔案系統的目標；
+        若任何複製失敗或改名失敗，則改用複製並保留來源。
+        指定 verify_copies 時其他目標的複本須先通過驗證才會搬移，驗證失敗時保留來源且不再複製。
+
+        Args:
+            source_path: 來源路徑
+            target_paths: 目標路徑列表
+            is_file: 是否為檔案操作
+            new_name: 新檔案名稱（不包含副檔名）
+            rename_folder: 是否重命名資料夾
+            sync_mode: 目標資料夾已存在時的處理方式，None 時使用 folder_sync_mode
+            verify_copies: 以目前執行緒記錄的複製列表呼叫、返回複本是否與來源相同的函數，None 時不驗證
+
+        Returns:
+            tuple: (成功的目標路徑列表, 來源是否已被搬移)
+        """
+        source_path = normalize_path(source_path, self.log_message)
+        target_paths = [normalize_path(path, self.log_message) for path in target_paths]
+
+        move_index = self._find_same_device_target(source_path, target_paths)
+        if move_index is None:
+            return self.copy_to_multiple_paths(source_path, target_paths, is_file, new_name, rename_folder,
+                                               sync_mode), False
+
+        move_target = target_paths[move_index]
+        other_targets = target_paths[:move_index] + target_paths[move_index + 1:]
+        successful_copies = []
+        if other_targets:
+            successful_copies = self.copy_to_multiple_paths(source_path, other_targets, is_file, new_name,
+                                                            rename_folder, sync_mode)
+
+        if len(successful_copies) == len(other_targets):
+            # 搬移後來源就不存在，複本必須在搬移前驗證
+            if verify_copies is not None and successful_copies and \
+                    not verify_copies(self.copy_backend.tracked_copies()):
+                self.log_message(f"{source_path} 的複本未通過驗證，來源不會被搬移", logging.WARNING)
+                return successful_copies, False
+            if self._move_by_rename(source_path, move_target, is_file, new_name, rename_folder):
+                return successful_copies + [move_target], True
+
+        # 無法搬移時改用複製，來源留待最後刪除
+        successful_copies += self.copy_to_multiple_paths(source_path, [move_target], is_file, new_name,
+                                                         rename_folder, sync_mode)
+        return successful_copies, False
+
+    def _find_same_device_target(self, source_path, target_paths):
+        """
+        找出與來源位於同一檔案系統的目標，多個符合時取最後一個
+
+        Args:
+            source_path: 來源路徑
+            target_paths: 目標路徑列表
+
+        Returns:
+            int: 目標在列表中的索引，沒有符合的目標時為 None
+        """
+        try:
+            source_device = os.stat(source_path).st_dev
+        except OSError:
+            return None
+
+        for index in range(len(target_paths) - 1, -1, -1):
+            # 目標可能尚未建立，改用最近一個存在的上層目錄判斷
+            if self._existing_device(target_paths[index]) == source_device:
+                return index
+        return None
+
+    def _move_by_rename(self, source_path, target_path, is_file=True, new_name=None, rename_folder=False):
+        """
+        以改名方式將來源搬移到目標（僅適用於同一檔案系統）
+
+        Args:
+            source_path: 來源路徑
+            target_path: 目標路徑
+            is_file: 是否為檔案操作
+            new_name: 新檔案名稱（不包含副檔名）
+            rename_folder: 是否重命名資料夾
+
+        Returns:
+            bool: 搬移成功返回True，否則返回False
+        """
+        try:
+            if is_file:
+                if not self.ensure_directory(target_path):
+                    return False
+                base_name = os.path.basename(source_path)
+                file_name = new_name + os.path.splitext(base_name)[1] if new_name else base_name
+                destination = os.path.join(target_path, file_name)
+            else:
+                destination = target_path if rename_folder else os.path.join(target_path, os.path.basename(source_path))
+                if not self.ensure_directory(os.path.dirname(destination)):
+                    return False
+
+            if os.path.exists(destination):
+                if os.path.samefile(source_path, destination):
+                    self.log_message(f"目標與來源相同，無法搬移: {destination}", logging.WARNING)
+                    return False
+                if is_file:
+                    self.log_message(f"目標檔案已存在，將被覆蓋: {destination}", logging.WARNING)
+                elif rename_folder and os.path.dirname(source_path) == os.path.dirname(destination):
+                    # 原地改名不取代已存在的資料夾，交由一般的資料夾處理輸出警告
+                    return False
+                else:
+                    shutil.rmtree(destination)
+                    self.forget_directory(destination)
+
+            os.replace(source_path, destination)
+            if not is_file:
+                self.forget_directory(source_path)
+            self.log_message(f"搬移 {source_path} 到 {destination}（同一檔案系統，直接改名）")
+            return True
+
+        except Exception as e:
+            self.log_message(f"以改名方式搬移 {source_path} 失敗，改用複製: {e}", logging.WARNING)
+            return False
+
     def rename_file_in_place(self, file_path, file_name, new_name):
         """
         原地重命名檔案
@@ -165,8 +882,8 @@ class FileOperator:
             source_file = os.path.join(file_path, file_name)
             
             # 檢查源文件是否存在
-            if not os.path.exists(source_file):
-                self.log_message(f"檔案 {source_file} 不存在")
+            if not self.source_exists(source_file):
+                self.log_message(f"檔案 {source_file} 不存在", logging.WARNING)
                 return False
             
             # 獲取檔案副檔名
@@ -178,7 +895,7 @@ class FileOperator:
             
             # 檢查目標檔名是否已存在
             if os.path.exists(target_file):
-                self.log_message(f"目標檔案 {target_file} 已存在，無法重命名")
+                self.log_message(f"目標檔案 {target_file} 已存在，無法重命名", logging.WARNING)
                 return False
             
             # 重命名檔案
@@ -187,9 +904,10 @@ class FileOperator:
             return True
             
         except Exception as e:
-            self.log_message(f"重命名檔案時發生錯誤: {e}")
+            self.log_message(f"重命名檔案時發生錯誤: {e}", logging.ERROR)
             return False
     
+    @spanned('delete_items')
     def delete_items(self, items):
         """
         刪除檔案或資料夾
@@ -207,14 +925,15 @@ class FileOperator:
                 item = normalize_path(item, self.log_message)
                 if os.path.isdir(item):
                     shutil.rmtree(item)
+                    self.forget_directory(item)
                     self.log_message(f"原始資料夾 {item} 已刪除")
                 else:
                     os.remove(item)
-                    self.log_message(f"原始檔案 {item} 已刪除")
+                    self.log_message(f"原始檔案 {item} 已刪除", logging.DEBUG)
                 deleted_count += 1
             except FileNotFoundError:
-                self.log_message(f"原始資料 {item} 已不存在，無法刪除")
+                self.log_message(f"原始資料 {item} 已不存在，無法刪除", logging.WARNING)
             except Exception as e:
-                self.log_message(f"刪除 {item} 失敗: {e}")
+                self.log_message(f"刪除 {item} 失敗: {e}", logging.ERROR)
                 
         return deleted_count
\ No newline at end of file
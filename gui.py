@@ -2,11 +2,79 @@
 圖形使用者介面模組
 """
 import os
+import queue
+import logging
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
-from constants import APP_VERSION
+from constants import APP_VERSION, LOG_MAX_LINES, LOG_FLUSH_INTERVAL_MS, LOG_FILE_NAME, CLEANUP_JUNK_PATTERNS
 from excel_processor import ExcelProcessor
-from utils import clean_empty_directories, normalize_path
+from utils import normalize_path
+from dir_cleaner import clean_empty_directories
+from log_sink import LogSink, LogFile
+from metrics import RunMetrics
+from copy_backends import format_size
+
+# 日誌層級選項（介面顯示名稱 -> 日誌層級）
+GUI_LOG_LEVELS = {
+    '詳細': logging.DEBUG,
+    '一般': logging.INFO,
+    '警告與錯誤': logging.WARNING,
+}
+
+def format_duration(seconds):
+    """
+    將秒數格式化為 時:分:秒
+
+    Args:
+        seconds: 秒數
+
+    Returns:
+        str: 格式化後的字串
+    """
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+class BackgroundJob:
+    """
+    在背景執行緒執行的工作，完成後由主執行緒呼叫 on_done
+    """
+    def __init__(self, target, on_done, cancel, progress=None):
+        """
+        初始化背景工作
+
+        Args:
+            target: 在背景執行緒執行的無參數函數
+            on_done: 完成後在主執行緒以 target 的返回值呼叫的函數
+            cancel: 要求停止工作的函數
+            progress: 取得進度（ExcelProcessor.get_progress 格式）的函數，None 時不顯示進度
+        """
+        self.target = target
+        self.on_done = on_done
+        self.cancel = cancel
+        self.progress = progress
+        self.result = None
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        """
+        執行工作（背景執行緒）
+        """
+        try:
+            self.result = self.target()
+        except Exception as e:
+            self.error = e
+
+    def is_alive(self):
+        """
+        工作是否仍在執行
+
+        Returns:
+            bool: 仍在執行返回True
+        """
+        return self.thread.is_alive()
 
 class FileMoverGUI:
     """
@@ -20,8 +88,23 @@ class FileMoverGUI:
             root: tkinter 主視窗
         """
         self.root = root
+        self.job = None
+        self.closing = False
+        # 背景執行緒要求在主執行緒執行的函數
+        self.main_thread_calls = queue.Queue()
         self.setup_gui()
         
+        # 日誌先寫入緩衝區，再由計時器批次更新到日誌視窗；兩個頁面共用同一個會輪替的日誌檔
+        try:
+            self.log_file = LogFile(os.path.join(os.path.dirname(os.path.abspath(__file__)), LOG_FILE_NAME))
+        except OSError:
+            # 程式目錄無法寫入時只輸出到日誌視窗
+            self.log_file = None
+        self.file_mover_sink = self.create_log_sink(self.file_mover_log, self.log_file)
+        self.folder_cleaner_sink = self.create_log_sink(self.folder_cleaner_log, self.log_file)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(LOG_FLUSH_INTERVAL_MS, self.poll)
+        
     def setup_gui(self):
         """
         設置 GUI 元件
@@ -79,8 +162,8 @@ class FileMoverGUI:
         button_frame = ttk.Frame(parent)
         button_frame.pack(fill=tk.X, padx=10, pady=5)
         
-        upload_button = ttk.Button(button_frame, text="執行變更", command=self.upload_excel)
-        upload_button.grid(row=0, column=0, padx=5, pady=5)
+        self.upload_button = ttk.Button(button_frame, text="執行變更", command=self.upload_excel)
+        self.upload_button.grid(row=0, column=0, padx=5, pady=5)
         
         template_button = ttk.Button(button_frame, text="下載範例檔", command=self.open_example)
         template_button.grid(row=0, column=1, padx=5, pady=5)
@@ -88,6 +171,47 @@ class FileMoverGUI:
         clear_log_button = ttk.Button(button_frame, text="清除日誌", command=self.clear_log)
         clear_log_button.grid(row=0, column=2, padx=5, pady=5)
         
+        # 事先確認刪除原始資料，同一檔案系統上的項目可直接改名搬移
+        self.confirm_delete_upfront = tk.BooleanVar(value=False)
+        upfront_check = ttk.Checkbutton(button_frame, text="執行前確認刪除原始資料（同磁碟直接搬移）",
+                                        variable=self.confirm_delete_upfront)
+        upfront_check.grid(row=1, column=0, columnspan=3, padx=5, pady=5, sticky="w")
+        
+        # 依操作紀錄繼續先前中斷的執行
+        self.resume_run = tk.BooleanVar(value=False)
+        resume_check = ttk.Checkbutton(button_frame, text="從上次中斷處繼續（略過已完成的操作）",
+                                       variable=self.resume_run)
+        resume_check.grid(row=1, column=3, padx=5, pady=5, sticky="w")
+        
+        # 刪除原始資料前以雜湊值驗證複本
+        self.verify_copies = tk.BooleanVar(value=False)
+        verify_check = ttk.Checkbutton(button_frame, text="刪除前驗證複本",
+                                       variable=self.verify_copies)
+        verify_check.grid(row=2, column=3, padx=5, pady=5, sticky="w")
+        
+        # 日誌層級
+        ttk.Label(button_frame, text="日誌層級:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.log_level = tk.StringVar(value='詳細')
+        level_combo = ttk.Combobox(button_frame, textvariable=self.log_level, values=list(GUI_LOG_LEVELS),
+                                   state="readonly", width=12)
+        level_combo.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+        level_combo.bind("<<ComboboxSelected>>", self.change_log_level)
+        
+        # 進度區
+        progress_frame = ttk.Frame(parent)
+        progress_frame.pack(fill=tk.X, padx=10, pady=5)
+        progress_frame.columnconfigure(0, weight=1)
+        
+        self.file_mover_progress = ttk.Progressbar(progress_frame, mode='determinate')
+        self.file_mover_progress.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        
+        self.file_mover_cancel = ttk.Button(progress_frame, text="取消", command=self.cancel_job, state=tk.DISABLED)
+        self.file_mover_cancel.grid(row=0, column=1, padx=5, pady=5)
+        
+        self.file_mover_status = tk.StringVar()
+        ttk.Label(progress_frame, textvariable=self.file_mover_status).grid(
+            row=1, column=0, columnspan=2, padx=5, sticky="w")
+        
         # 日誌區
         log_frame = ttk.LabelFrame(parent, text="處理日誌")
         log_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -105,6 +229,7 @@ class FileMoverGUI:
         # 資料夾路徑變數
         self.folder_path = tk.StringVar()
         self.recursive_clean = tk.BooleanVar(value=True)
+        self.ignore_junk = tk.BooleanVar(value=False)
         
         # 資料夾路徑輸入區
         path_frame = ttk.Frame(parent)
@@ -125,12 +250,27 @@ class FileMoverGUI:
         recursive_check = ttk.Checkbutton(option_frame, text="遞歸清理子資料夾", variable=self.recursive_clean)
         recursive_check.grid(row=0, column=0, padx=5, pady=5, sticky="w")
         
-        clean_button = ttk.Button(option_frame, text="清理空資料夾", command=self.clean_empty_folders)
-        clean_button.grid(row=0, column=1, padx=5, pady=5)
+        junk_check = ttk.Checkbutton(option_frame, text=f"忽略系統檔案（{', '.join(CLEANUP_JUNK_PATTERNS)}）",
+                                     variable=self.ignore_junk)
+        junk_check.grid(row=1, column=0, columnspan=3, padx=5, pady=5, sticky="w")
+        
+        self.clean_button = ttk.Button(option_frame, text="清理空資料夾", command=self.clean_empty_folders)
+        self.clean_button.grid(row=0, column=1, padx=5, pady=5)
         
         clear_log_button = ttk.Button(option_frame, text="清除日誌", command=self.clear_cleaner_log)
         clear_log_button.grid(row=0, column=2, padx=5, pady=5)
         
+        # 進度區
+        progress_frame = ttk.Frame(parent)
+        progress_frame.pack(fill=tk.X, padx=10, pady=5)
+        progress_frame.columnconfigure(0, weight=1)
+        
+        self.cleaner_progress = ttk.Progressbar(progress_frame, mode='indeterminate')
+        self.cleaner_progress.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        
+        self.cleaner_cancel = ttk.Button(progress_frame, text="取消", command=self.cancel_job, state=tk.DISABLED)
+        self.cleaner_cancel.grid(row=0, column=1, padx=5, pady=5)
+        
         # 日誌區
         log_frame = ttk.LabelFrame(parent, text="處理日誌")
         log_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -154,18 +294,226 @@ class FileMoverGUI:
         if folder_path:
             self.folder_path.set(folder_path)
     
-    def log_message(self, message, is_cleaner=False):
+    def create_log_sink(self, log_text, log_file):
+        """
+        建立輸出到日誌視窗的日誌緩衝區
+
+        Args:
+            log_text: 日誌視窗元件
+            log_file: 共用的 LogFile，None 時不寫入檔案
+
+        Returns:
+            LogSink: 日誌緩衝區
+        """
+        emit = lambda lines: self.append_log_lines(log_text, lines)
+        return LogSink(emit, log_file=log_file)
+    
+    def append_log_lines(self, log_text, lines):
+        """
+        將一批訊息加入日誌視窗，只保留最新的 LOG_MAX_LINES 行
+        
+        Args:
+            log_text: 日誌視窗元件
+            lines: 訊息列表
+        """
+        log_text.insert(tk.END, '\n'.join(lines) + '\n')
+        line_count = int(log_text.index('end-1c').split('.')[0]) - 1
+        if line_count > LOG_MAX_LINES:
+            log_text.delete('1.0', f'{line_count - LOG_MAX_LINES + 1}.0')
+        log_text.yview(tk.END)
+    
+    def poll(self):
+        """
+        定期在主執行緒執行背景工作的要求、更新日誌視窗與進度，並處理完成的工作
+        """
+        while True:
+            try:
+                call = self.main_thread_calls.get_nowait()
+            except queue.Empty:
+                break
+            call()
+        
+        self.file_mover_sink.flush()
+        self.folder_cleaner_sink.flush()
+        
+        job = self.job
+        if job is not None:
+            if job.progress:
+                self.update_progress(job.progress())
+            if not job.is_alive():
+                self.finish_job(job)
+        
+        if self.closing and self.job is None:
+            self.destroy()
+            return
+        self.root.after(LOG_FLUSH_INTERVAL_MS, self.poll)
+    
+    def call_in_main_thread(self, func, *args):
+        """
+        在主執行緒執行函數並等待結果，供背景執行緒顯示對話框等操作使用
+        
+        Args:
+            func: 要執行的函數
+            *args: 函數參數
+            
+        Returns:
+            函數的返回值
+        """
+        if threading.current_thread() is threading.main_thread():
+            return func(*args)
+        
+        done = threading.Event()
+        result = {}
+        
+        def call():
+            try:
+                result['value'] = func(*args)
+            finally:
+                done.set()
+        
+        self.main_thread_calls.put(call)
+        done.wait()
+        return result.get('value')
+    
+    def start_job(self, job):
+        """
+        啟動背景工作，同一時間只執行一個工作
+        
+        Args:
+            job: BackgroundJob
+        """
+        self.job = job
+        self.set_running(True, job.progress is not None)
+        job.thread.start()
+    
+    def finish_job(self, job):
+        """
+        背景工作完成後恢復介面並呼叫完成處理函數（主執行緒）
+        
+        Args:
+            job: 已完成的 BackgroundJob
+        """
+        self.job = None
+        self.set_running(False, job.progress is not None)
+        self.file_mover_sink.flush()
+        self.folder_cleaner_sink.flush()
+        if self.closing:
+            return
+        if job.error is not None:
+            messagebox.showerror("Error", f"執行時發生錯誤: {job.error}")
+        else:
+            job.on_done(job.result)
+    
+    def cancel_job(self):
+        """
+        要求停止目前的背景工作，執行中的操作完成後停止
+        """
+        if self.job is not None:
+            self.job.cancel()
+            if self.job.progress:
+                self.file_mover_status.set("正在取消，等待執行中的操作完成...")
+    
+    def set_running(self, running, is_file_mover):
+        """
+        依是否有背景工作切換按鈕與進度條狀態
+        
+        Args:
+            running: 是否有背景工作執行中
+            is_file_mover: 工作是否屬於檔案移動頁面
+        """
+        start_state = tk.DISABLED if running else tk.NORMAL
+        self.upload_button.config(state=start_state)
+        self.clean_button.config(state=start_state)
+        
+        cancel_button = self.file_mover_cancel if is_file_mover else self.cleaner_cancel
+        cancel_button.config(state=tk.NORMAL if running else tk.DISABLED)
+        
+        if is_file_mover:
+            if running:
+                self.file_mover_progress.config(value=0, maximum=1)
+                self.file_mover_status.set("正在讀取與規劃...")
+        elif running:
+            self.cleaner_progress.start()
+        else:
+            self.cleaner_progress.stop()
+    
+    def update_progress(self, progress):
+        """
+        更新檔案移動頁面的進度條與速度
+        
+        Args:
+            progress: ExcelProcessor.get_progress 的返回值
+        """
+        done = progress['operations_done']
+        total = progress['operations_total']
+        elapsed = progress['elapsed']
+        if not elapsed:
+            return
+        
+        if total:
+            self.file_mover_progress.config(maximum=total, value=done)
+        
+        status = f"{done}/{total if total is not None else '?'} 項操作，"
+        status += f"{progress['files'] / elapsed:.1f} 檔案/秒，"
+        status += f"{format_size(int(progress['bytes'] / elapsed))}/秒"
+        if total and done:
+            status += f"，預估剩餘 {format_duration(elapsed / done * (total - done))}"
+        self.file_mover_status.set(status)
+    
+    def on_close(self):
+        """
+        關閉視窗，有背景工作時先要求停止，等工作結束後再關閉
+        """
+        if self.job is not None:
+            if not messagebox.askyesno("確認", "目前仍在處理中，是否停止並關閉？", default="no"):
+                return
+            self.job.cancel()
+            self.closing = True
+            return
+        self.destroy()
+
+    def destroy(self):
+        """
+        送出剩餘的日誌、關閉日誌檔並關閉視窗
+        """
+        self.file_mover_sink.close()
+        self.folder_cleaner_sink.close()
+        if self.log_file is not None:
+            self.log_file.close()
+        self.root.destroy()
+    
+    def change_log_level(self, event=None):
+        """
+        變更日誌視窗顯示的最低日誌層級
+        """
+        level = GUI_LOG_LEVELS[self.log_level.get()]
+        self.file_mover_sink.set_level(level)
+        self.folder_cleaner_sink.set_level(level)
+    
+    def log_message(self, message, is_cleaner=False, level=logging.INFO):
         """
         添加日誌訊息
         
         Args:
             message: 訊息內容
             is_cleaner: 是否為清理器頁面的日誌
+            level: 日誌層級
         """
-        log_text = self.folder_cleaner_log if is_cleaner else self.file_mover_log
-        log_text.insert(tk.END, message + '\n')
-        log_text.yview(tk.END)
-        print(message)  # 同時輸出到控制台，方便除錯
+        log_sink = self.folder_cleaner_sink if is_cleaner else self.file_mover_sink
+        log_sink.log(message, level)
+    
+    def confirm_delete(self, message):
+        """
+        詢問是否刪除原始資料，詢問前先顯示目前的日誌
+        
+        Args:
+            message: 詢問訊息
+            
+        Returns:
+            bool: 使用者確認返回True
+        """
+        self.file_mover_sink.flush()
+        return messagebox.askyesno("刪除確認", message, default="no")
     
     def clear_log(self):
         """
@@ -194,22 +542,39 @@ class FileMoverGUI:
     
     def upload_excel(self):
         """
-        上傳並處理 Excel 檔案
+        上傳並在背景執行緒處理 Excel 檔案
         """
+        if self.job is not None:
+            return
         excel_file = self.excel_path.get()
         if not excel_file:
             messagebox.showerror("Error", "請選擇 Excel 文件")
             return
         
-        # 創建 Excel 處理器
+        # 創建 Excel 處理器，刪除確認對話框在主執行緒顯示
         processor = ExcelProcessor(
-            log_callback=self.log_message,
-            confirm_delete_callback=lambda msg: messagebox.askyesno("刪除確認", msg, default="no")
+            log_callback=self.file_mover_sink,
+            confirm_delete_callback=lambda msg: self.call_in_main_thread(self.confirm_delete, msg),
+            confirm_delete_upfront=self.confirm_delete_upfront.get(),
+            count_rows=True,
+            resume=self.resume_run.get(),
+            verify=self.verify_copies.get()
         )
         
-        # 處理 Excel 檔案
-        if processor.read_and_process_excel(excel_file):
-            messagebox.showinfo("info", "變更成功!")
+        def on_done(success):
+            if processor.cancelled:
+                self.file_mover_status.set("已取消")
+                messagebox.showinfo("info", "處理已取消，原始資料已保留")
+            elif success:
+                messagebox.showinfo("info", "變更成功!")
+        
+        # 在背景執行緒處理 Excel 檔案
+        self.start_job(BackgroundJob(
+            lambda: processor.read_and_process_excel(excel_file),
+            on_done,
+            processor.cancel,
+            processor.get_progress
+        ))
     
     def clean_empty_folders(self):
         """
@@ -220,6 +585,9 @@ class FileMoverGUI:
             messagebox.showerror("Error", "請選擇資料夾")
             return
         
+        if self.job is not None:
+            return
+        
         # 確認清理操作
         if not messagebox.askyesno("確認", f"是否清理 {folder_path} 中的空資料夾？", default="no"):
             return
@@ -230,20 +598,43 @@ class FileMoverGUI:
         # 記錄開始處理
         self.log_message(f"開始清理空資料夾: {folder_path}", True)
         
-        # 執行清理
-        try:
-            deleted_count = clean_empty_directories(
-                folder_path, 
-                recursive=self.recursive_clean.get(),
-                log_callback=lambda msg: self.log_message(msg, True)
-            )
+        cancel_event = threading.Event()
+        recursive = self.recursive_clean.get()
+        junk_patterns = CLEANUP_JUNK_PATTERNS if self.ignore_junk.get() else None
+        metrics = RunMetrics()
+        
+        def clean():
+            try:
+                with metrics.stage('cleanup'):
+                    return clean_empty_directories(
+                        folder_path,
+                        recursive=recursive,
+                        log_callback=self.folder_cleaner_sink,
+                        cancel_event=cancel_event,
+                        junk_patterns=junk_patterns,
+                        max_workers=None
+                    )
+            except Exception as e:
+                self.log_message(f"清理過程中發生錯誤: {str(e)}", True, logging.ERROR)
+                return None
+            finally:
+                metrics.finish()
+                for line in metrics.format_summary():
+                    self.log_message(line, True)
+        
+        def on_done(deleted_count):
+            if deleted_count is None:
+                messagebox.showerror("Error", "清理過程中發生錯誤，請查看日誌")
+                return
             
             # 顯示結果
-            result_msg = f"清理完成！已刪除 {deleted_count} 個空資料夾。"
+            if cancel_event.is_set():
+                result_msg = f"清理已取消，已刪除 {deleted_count} 個空資料夾。"
+            else:
+                result_msg = f"清理完成！已刪除 {deleted_count} 個空資料夾。"
             self.log_message(result_msg, True)
+            self.folder_cleaner_sink.flush()
             messagebox.showinfo("清理結果", result_msg)
-            
-        except Exception as e:
-            error_msg = f"清理過程中發生錯誤: {str(e)}"
-            self.log_message(error_msg, True)
-            messagebox.showerror("Error", error_msg)
\ No newline at end of file
+        
+        # 在背景執行緒執行清理
+        self.start_job(BackgroundJob(clean, on_done, cancel_event.set))
\ No newline at end of file
@@ -0,0 +1,473 @@
+"""
+I/O 排程模組：依儲存裝置分組，限制每個裝置同時進行的複製操作數量
+
+來源與目標位於不同裝置（本機 SSD、NAS、USB 外接硬碟）時，各裝置的速度差異很大。
+每個裝置（或指定的掛載點）各自有同時操作數量的上限與等待佇列，
+慢速的裝置只會讓等待它的操作排隊，不會佔住其他裝置的名額；
+傳統硬碟預設一次只進行一個操作，避免多個操作同時造成大量隨機讀寫。
+"""
+import os
+import sys
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from constants import IO_DEVICE_LIMIT, IO_ROTATIONAL_LIMIT, IO_PATH_CACHE_SIZE
+from log_sink import emit_log, supports_level
+
+def is_rotational(device):
+    """
+    判斷裝置是否為傳統（旋轉式）硬碟，只支援 Linux
+
+    Args:
+        device: st_dev 裝置編號
+
+    Returns:
+        bool: 是傳統硬碟返回True，無法判斷時返回False
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    base = f"/sys/dev/block/{os.major(device)}:{os.minor(device)}"
+    # 分割區本身沒有 queue 資料夾，改讀所屬的磁碟
+    for path in (os.path.join(base, 'queue', 'rotational'), os.path.join(base, '..', 'queue', 'rotational')):
+        try:
+            with open(path, encoding='ascii') as rotational_file:
+                return rotational_file.read().strip() == '1'
+        except (OSError, ValueError):
+            continue
+    return False
+
+def parse_device_limit(text):
+    """
+    解析「路徑=數量」格式的掛載點操作上限
+
+    Args:
+        text: 例如 /mnt/nas=2
+
+    Returns:
+        tuple: (路徑, 上限)
+
+    Raises:
+        ValueError: 格式錯誤或上限小於 1
+    """
+    path, separator, limit = text.rpartition('=')
+    if not separator or not path:
+        raise ValueError(f"格式應為 路徑=數量: {text}")
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError(f"上限必須大於 0: {text}")
+    return path, limit
+
+def mount_point(path, device):
+    """
+    找出路徑所在裝置的掛載點（st_dev 與上層目錄不同的最上層目錄）
+
+    Args:
+        path: 已存在的路徑
+        device: 路徑的 st_dev
+
+    Returns:
+        str: 掛載點路徑
+    """
+    while True:
+        parent = os.path.dirname(path)
+        if parent == path:
+            return path
+        try:
+            if os.stat(parent).st_dev != device:
+                return path
+        except OSError:
+            return path
+        path = parent
+
+class _DeviceGroup:
+    """
+    一個裝置分組的名額與統計
+    """
+    __slots__ = ('label', 'limit', 'active', 'waiting', 'deferred', 'operations', 'wait_seconds', 'max_waiting')
+
+    def __init__(self, label, limit):
+        """
+        初始化裝置分組
+
+        Args:
+            label: 顯示名稱
+            limit: 同時操作數量上限
+        """
+        self.label = label
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        # 名額不足而延後派送的資料列（不阻擋其他操作取得名額）
+        self.deferred = 0
+        self.operations = 0
+        self.wait_seconds = 0.0
+        self.max_waiting = 0
+
+class IOScheduler:
+    """
+    依儲存裝置限制同時進行的 I/O 操作
+
+    操作涉及的每個裝置（來源與目標）都取得名額後才開始；多個裝置的名額一次全部取得，
+    不會因為持有一部分名額而互相等待。可由多個執行緒（以及多個處理器）共用。
+
+    平行執行資料列時，由執行器在派送資料列前以 reserve 預留整列涉及的裝置名額，
+    名額不足的資料列延後派送而不佔用工作執行緒；持有預留名額的執行緒內的操作不再另外取得名額。
+
+    各分組的累計統計涵蓋排程建立以來的所有操作；多個處理器共用時，每次執行另外以 reporting
+    指定的字典記錄自己的操作數與等待時間。
+    """
+    def __init__(self, default_limit=IO_DEVICE_LIMIT, device_limits=None, rotational_limit=IO_ROTATIONAL_LIMIT,
+                 log_callback=None):
+        """
+        初始化 I/O 排程
+
+        Args:
+            default_limit: 每個裝置同時操作數量的預設上限
+            device_limits: 掛載點路徑 -> 上限；位於掛載點下的路徑歸為同一組，不依 st_dev 分組
+            rotational_limit: 傳統硬碟的上限，None 時與其他裝置相同
+            log_callback: 日誌輸出回呼函數
+        """
+        self.default_limit = max(1, default_limit)
+        self.rotational_limit = rotational_limit
+        self.log_callback = log_callback
+        # 較長的掛載點優先比對
+        self.device_limits = sorted(
+            ((os.path.normcase(os.path.abspath(path)), max(1, limit)) for path, limit in (device_limits or {}).items()),
+            key=lambda item: len(item[0]), reverse=True
+        )
+        self._groups = {}
+        # 路徑 -> 分組鍵值
+        self._path_keys = {}
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    @supports_level
+    def log_message(self, message, level=logging.INFO):
+        """
+        輸出日誌訊息
+
+        Args:
+            message: 訊息內容
+            level: 日誌層級
+        """
+        if self.log_callback:
+            emit_log(self.log_callback, message, level)
+        else:
+            print(message)
+
+    def _device_key(self, path):
+        """
+        找出路徑所屬的分組，路徑尚未建立時以最近一個存在的上層目錄判斷
+
+        Args:
+            path: 檔案或目錄路徑
+
+        Returns:
+            tuple: 分組鍵值，無法判斷時為 None
+        """
+        path = os.path.normcase(os.path.abspath(path))
+        key = self._path_keys.get(path)
+        if key is not None:
+            return key
+
+        for root, limit in self.device_limits:
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                key = ('mount', root)
+                self._register(key, root, limit)
+                break
+        else:
+            existing = path
+            while True:
+                try:
+                    device = os.stat(existing).st_dev
+                    break
+                except OSError:
+                    parent = os.path.dirname(existing)
+                    if parent == existing:
+                        return None
+                    existing = parent
+            key = ('device', device)
+            if key not in self._groups:
+                limit = self.default_limit
+                if self.rotational_limit is not None and is_rotational(device):
+                    limit = min(limit, self.rotational_limit)
+                self._register(key, f"{mount_point(existing, device)}（裝置 {device}）", limit)
+
+        if len(self._path_keys) >= IO_PATH_CACHE_SIZE:
+            # 常駐執行時避免記錄無限增加，清除後由之後的操作重新判斷
+            self._path_keys = {}
+        self._path_keys[path] = key
+        return key
+
+    def _register(self, key, label, limit):
+        """
+        建立分組（已存在時不變）
+
+        Args:
+            key: 分組鍵值
+            label: 顯示名稱
+            limit: 同時操作數量上限
+        """
+        with self._condition:
+            if key in self._groups:
+                return
+            self._groups[key] = _DeviceGroup(label, limit)
+        self.log_message(f"I/O 分組 {label}：同時最多 {limit} 個操作", logging.DEBUG)
+
+    def groups_for(self, paths):
+        """
+        取得多個路徑所屬的分組
+
+        Args:
+            paths: 路徑列表
+
+        Returns:
+            tuple: 排序後不重複的分組鍵值
+        """
+        keys = {self._device_key(path) for path in paths}
+        keys.discard(None)
+        return tuple(sorted(keys))
+
+    def _holding_reservation(self):
+        """
+        檢查目前執行緒是否正在執行已預留名額的資料列
+
+        Returns:
+            bool: 已預留名額返回True
+        """
+        return getattr(self._local, 'reserved', False)
+
+    @contextmanager
+    def reporting(self, report):
+        """
+        將目前執行緒取得名額的操作數與等待時間另外記錄到 report
+
+        Args:
+            report: 分組鍵值 -> [操作數, 等待秒數] 的字典，由單次執行持有
+        """
+        previous = getattr(self._local, 'report', None)
+        self._local.report = report
+        try:
+            yield report
+        finally:
+            self._local.report = previous
+
+    def current_report(self):
+        """
+        取得目前執行緒以 reporting 指定的統計字典
+
+        Returns:
+            dict: 統計字典，沒有指定時為 None
+        """
+        return getattr(self._local, 'report', None)
+
+    def _count(self, keys, waited, report):
+        """
+        記錄一次取得名額的操作（呼叫端須持有鎖）
+
+        Args:
+            keys: 分組鍵值
+            waited: 等待秒數
+            report: 單次執行的統計字典，None 時只更新累計統計
+        """
+        for key in keys:
+            group = self._groups[key]
+            group.operations += 1
+            group.wait_seconds += waited
+            if report is not None:
+                entry = report.setdefault(key, [0, 0.0])
+                entry[0] += 1
+                entry[1] += waited
+
+    def _acquire(self, keys, blocking=True, report=None):
+        """
+        取得所有分組的名額
+
+        Args:
+            keys: groups_for 返回的分組鍵值
+            blocking: 名額不足時是否等待
+            report: 單次執行的統計字典
+
+        Returns:
+            bool: 取得名額返回True，不等待且名額不足時返回False
+        """
+        with self._condition:
+            groups = [self._groups[key] for key in keys]
+            # 不等待時也不插隊到已在排隊的操作前面
+            if all(group.active < group.limit and (blocking or not group.waiting) for group in groups):
+                for group in groups:
+                    group.active += 1
+                self._count(keys, 0.0, report)
+                return True
+            if not blocking:
+                return False
+
+            start = time.perf_counter()
+            for group in groups:
+                group.waiting += 1
+                group.max_waiting = max(group.max_waiting, group.waiting + group.deferred)
+            while not all(group.active < group.limit for group in groups):
+                self._condition.wait()
+            for group in groups:
+                group.waiting -= 1
+                group.active += 1
+            self._count(keys, time.perf_counter() - start, report)
+            return True
+
+    def _release(self, keys):
+        """
+        歸還所有分組的名額
+
+        Args:
+            keys: 先前取得的分組鍵值
+        """
+        with self._condition:
+            for key in keys:
+                self._groups[key].active -= 1
+            self._condition.notify_all()
+
+    def reserve(self, keys, deferred_since=None, report=None):
+        """
+        預留資料列涉及的所有分組的名額，名額不足時不等待
+
+        第一次預留失敗時將資料列計入各分組的排隊數；之後重新預留時傳入第一次失敗的時間，
+        取得名額時移出排隊並將延後的時間計入等待統計。
+
+        Args:
+            keys: groups_for 返回的分組鍵值
+            deferred_since: 第一次預留失敗時的 time.perf_counter()，第一次預留時為 None
+            report: 單次執行的統計字典
+
+        Returns:
+            bool: 取得名額返回True，否則返回False
+        """
+        with self._condition:
+            groups = [self._groups[key] for key in keys]
+            if all(group.active < group.limit and not group.waiting for group in groups):
+                for group in groups:
+                    group.active += 1
+                    if deferred_since is not None:
+                        group.deferred -= 1
+                waited = time.perf_counter() - deferred_since if deferred_since is not None else 0.0
+                self._count(keys, waited, report)
+                return True
+            if deferred_since is None:
+                for group in groups:
+                    group.deferred += 1
+                    group.max_waiting = max(group.max_waiting, group.waiting + group.deferred)
+            return False
+
+    def release(self, keys):
+        """
+        歸還 reserve 預留的名額
+
+        Args:
+            keys: 先前預留的分組鍵值
+        """
+        self._release(keys)
+
+    @contextmanager
+    def holding(self):
+        """
+        在目前執行緒執行已預留名額的資料列，區塊內的 slot 與 run 不再另外取得名額
+        """
+        self._local.reserved = True
+        try:
+            yield
+        finally:
+            self._local.reserved = False
+
+    @contextmanager
+    def slot(self, paths):
+        """
+        取得路徑所屬各裝置的名額後才執行區塊
+
+        Args:
+            paths: 操作涉及的路徑（來源與目標）
+        """
+        if self._holding_reservation():
+            yield
+            return
+        keys = self.groups_for(paths)
+        self._acquire(keys, report=self.current_report())
+        try:
+            yield
+        finally:
+            self._release(keys)
+
+    def run(self, jobs):
+        """
+        依序執行多個操作，優先執行裝置名額已空出的操作
+
+        Args:
+            jobs: (路徑列表, 無參數函數) 的列表
+
+        Returns:
+            list: 各函數的返回值，順序與 jobs 相同
+        """
+        if self._holding_reservation():
+            return [func() for _, func in jobs]
+        report = self.current_report()
+        pending = [(index, self.groups_for(paths), func) for index, (paths, func) in enumerate(jobs)]
+        results = [None] * len(pending)
+        while pending:
+            for position, (_, keys, _) in enumerate(pending):
+                if self._acquire(keys, blocking=False, report=report):
+                    break
+            else:
+                # 所有操作的裝置都在忙碌中，等待最早的操作
+                position = 0
+                self._acquire(pending[0][1], report=report)
+            index, keys, func = pending.pop(position)
+            try:
+                results[index] = func()
+            finally:
+                self._release(keys)
+        return results
+
+    def get_report(self, report=None):
+        """
+        取得各分組的統計
+
+        Args:
+            report: 單次執行的統計字典，提供時只列出該次執行的操作數與等待秒數
+
+        Returns:
+            dict: 分組名稱 -> {'limit': 上限, 'operations': 操作數, 'wait_seconds': 等待秒數,
+                  'max_waiting': 排程建立以來最多排隊數}
+        """
+        with self._condition:
+            if report is None:
+                counts = {key: (group.operations, group.wait_seconds) for key, group in self._groups.items()}
+            else:
+                counts = {key: tuple(entry) for key, entry in report.items()}
+            return {
+                self._groups[key].label: {
+                    'limit': self._groups[key].limit,
+                    'operations': operations,
+                    'wait_seconds': round(wait_seconds, 6),
+                    'max_waiting': self._groups[key].max_waiting,
+                }
+                for key, (operations, wait_seconds) in counts.items()
+            }
+
+    def format_report(self, report=None):
+        """
+        將各分組的統計格式化為日誌訊息
+
+        Args:
+            report: 單次執行的統計字典，提供時只列出該次執行的統計
+
+        Returns:
+            list: 文字行列表
+        """
+        lines = []
+        for label, entry in sorted(self.get_report(report).items()):
+            if not entry['operations']:
+                continue
+            lines.append(f"  {label}：上限 {entry['limit']}，{entry['operations']} 個操作，"
+                         f"等待 {entry['wait_seconds']:.2f} 秒，最多 {entry['max_waiting']} 個排隊")
+        if not lines:
+            return []
+        return ["I/O 分組統計："] + lines
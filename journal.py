@@ -0,0 +1,185 @@
+"""
+操作紀錄（journal）模組，記錄每項操作的開始與完成，讓中斷的執行可以從中斷處繼續
+"""
+import os
+import json
+import time
+import threading
+from constants import JOURNAL_FSYNC_BATCH, JOURNAL_FSYNC_INTERVAL
+
+# 紀錄事件
+EVENT_RUN = 'run'  # 開始一次執行
+EVENT_START = 'start'  # 開始一項操作
+EVENT_DONE = 'done'  # 操作完成
+EVENT_VERIFIED = 'verified'  # 操作的複本已通過驗證
+EVENT_FINISHED = 'finished'  # 整次執行（含刪除原始資料）完成
+
+class JournalState:
+    """
+    從紀錄檔讀出的先前執行狀態
+    """
+    def __init__(self):
+        """
+        初始化紀錄狀態
+        """
+        # 操作識別碼 -> 可刪除的原始項目路徑（沒有則為 None）
+        self.completed = {}
+        # 已開始但未完成的操作識別碼
+        self.in_progress = set()
+        # 複本已通過驗證的操作識別碼
+        self.verified = set()
+        self.manifest = None
+        self.finished = False
+
+class OperationJournal:
+    """
+    預寫式操作紀錄
+
+    每項操作在執行前記錄 start、完成後記錄 done，每行一筆 JSON。
+    一般紀錄累積 JOURNAL_FSYNC_BATCH 筆或超過 JOURNAL_FSYNC_INTERVAL 秒才 fsync 一次；
+    遺失尚未 fsync 的 done 紀錄只會讓該操作在繼續執行時重做，不會略過未完成的操作。
+    刪除原始資料前必須呼叫 sync()，確保所有完成紀錄都已寫入磁碟。
+    """
+    def __init__(self, path, fsync_batch=JOURNAL_FSYNC_BATCH, fsync_interval=JOURNAL_FSYNC_INTERVAL):
+        """
+        初始化操作紀錄
+
+        Args:
+            path: 紀錄檔路徑
+            fsync_batch: 累積多少筆紀錄 fsync 一次
+            fsync_interval: 距上次 fsync 超過此秒數時立即 fsync
+        """
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        讀取紀錄檔中先前執行的狀態
+
+        Returns:
+            JournalState: 先前執行的狀態，紀錄檔不存在時為空狀態
+        """
+        state = JournalState()
+        if not os.path.exists(self.path):
+            return state
+
+        with open(self.path, encoding='utf-8') as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 中斷時最後一行可能只寫了一半
+                    continue
+                event = record.get('event')
+                key = record.get('key')
+                if event == EVENT_RUN:
+                    state.manifest = record.get('manifest')
+                    state.finished = False
+                elif event == EVENT_START:
+                    state.in_progress.add(key)
+                elif event == EVENT_DONE:
+                    state.in_progress.discard(key)
+                    state.completed[key] = record.get('original')
+                elif event == EVENT_VERIFIED:
+                    state.verified.add(key)
+                elif event == EVENT_FINISHED:
+                    state.finished = True
+        return state
+
+    def open(self, manifest=None, append=False):
+        """
+        開啟紀錄檔並記錄一次新的執行
+
+        Args:
+            manifest: 設定檔資訊（路徑、大小、修改時間）
+            append: 是否保留先前的紀錄（繼續執行時使用）
+        """
+        self._file = open(self.path, 'a' if append else 'w', encoding='utf-8')
+        self._write({'event': EVENT_RUN, 'manifest': manifest, 'time': time.time()}, sync=True)
+
+    def start(self, key, row_number):
+        """
+        記錄操作開始
+
+        Args:
+            key: 操作識別碼
+            row_number: Excel 列號
+        """
+        self._write({'event': EVENT_START, 'key': key, 'row': row_number})
+
+    def complete(self, key, row_number, original=None):
+        """
+        記錄操作完成
+
+        Args:
+            key: 操作識別碼
+            row_number: Excel 列號
+            original: 完成後可刪除的原始項目路徑
+        """
+        self._write({'event': EVENT_DONE, 'key': key, 'row': row_number, 'original': original})
+
+    def record_verified(self, key, row_number):
+        """
+        記錄操作的複本已通過驗證
+
+        Args:
+            key: 操作識別碼
+            row_number: Excel 列號
+        """
+        self._write({'event': EVENT_VERIFIED, 'key': key, 'row': row_number})
+
+    def finish(self):
+        """
+        記錄整次執行完成
+        """
+        self._write({'event': EVENT_FINISHED, 'time': time.time()}, sync=True)
+
+    def _write(self, record, sync=False):
+        """
+        寫入一筆紀錄，依批次設定 fsync
+
+        Args:
+            record: 紀錄內容
+            sync: 是否立即 fsync
+        """
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._pending += 1
+            if sync or self._pending >= self.fsync_batch or \
+                    time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        """
+        將紀錄寫入磁碟（呼叫端需持有 self._lock）
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """
+        立即將所有紀錄寫入磁碟
+        """
+        with self._lock:
+            if self._file is not None and self._pending:
+                self._sync()
+
+    def close(self):
+        """
+        寫入剩餘紀錄並關閉紀錄檔
+        """
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
@@ -0,0 +1,250 @@
+"""
+日誌輸出模組，提供可由多個執行緒寫入、批次輸出的日誌緩衝區
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from constants import LOG_MAX_LINES, LOG_FILE_BATCH, LOG_FILE_MAX_BYTES, LOG_FILE_BACKUP_COUNT
+
+# 日誌層級名稱（用於介面與命令行參數）
+LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
+def supports_level(func):
+    """
+    標記日誌函數可接受 level 參數
+
+    Args:
+        func: 日誌函數
+
+    Returns:
+        function: 原函數
+    """
+    func.supports_level = True
+    return func
+
+def emit_log(callback, message, level=logging.INFO):
+    """
+    呼叫日誌回呼函數，可接受層級的回呼會收到 level 參數
+
+    Args:
+        callback: 日誌回呼函數
+        message: 訊息內容
+        level: 日誌層級
+    """
+    if getattr(callback, 'supports_level', False):
+        callback(message, level=level)
+    else:
+        callback(message)
+
+class LogFile:
+    """
+    有大小上限的日誌檔
+
+    超過 max_bytes 時將目前的檔案改名為 <檔名>.1（較舊的依序改為 .2、.3…，最多保留 backup_count 個），
+    再建立新的檔案。多個 LogSink 寫入同一個檔案時應共用同一個 LogFile，輪替時才不會寫到舊檔案。
+    """
+    def __init__(self, path, max_bytes=LOG_FILE_MAX_BYTES, backup_count=LOG_FILE_BACKUP_COUNT):
+        """
+        開啟日誌檔（附加模式）
+
+        Args:
+            path: 日誌檔路徑
+            max_bytes: 輪替的檔案大小上限，0 為不輪替
+            backup_count: 保留的舊日誌檔數量，0 時超過上限直接清空
+
+        Raises:
+            OSError: 無法開啟日誌檔
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, lines):
+        """
+        寫入多行日誌，超過大小上限時輪替
+
+        Args:
+            lines: 含換行字元的字串列表
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.writelines(lines)
+            self._file.flush()
+            if self.max_bytes and self._file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        """
+        輪替日誌檔（呼叫端需持有 self._lock）
+        """
+        self._file.close()
+        mode = 'w'
+        try:
+            if self.backup_count > 0:
+                for index in range(self.backup_count - 1, 0, -1):
+                    older = f"{self.path}.{index}"
+                    if os.path.exists(older):
+                        os.replace(older, f"{self.path}.{index + 1}")
+                os.replace(self.path, f"{self.path}.1")
+        except OSError:
+            # 無法改名時繼續寫入原檔案，下次寫入再嘗試
+            mode = 'a'
+        self._file = open(self.path, mode, encoding='utf-8')
+
+    def close(self):
+        """
+        關閉日誌檔
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class LogSink:
+    """
+    日誌緩衝區
+
+    任何執行緒都可以寫入訊息，訊息會先放在緩衝區，
+    由 flush 在輸出端的執行緒（例如 GUI 的 root.after 計時器）批次送出。
+    畫面輸出只保留最新的 max_lines 行並依層級過濾，日誌檔則記錄所有訊息。
+    """
+    supports_level = True
+
+    def __init__(self, emit_callback=None, level=logging.DEBUG, log_file=None,
+                 max_lines=LOG_MAX_LINES, file_batch=LOG_FILE_BATCH, with_levels=False):
+        """
+        初始化日誌緩衝區
+
+        Args:
+            emit_callback: 接收訊息列表的輸出函數，None 時輸出到標準輸出
+            level: 顯示的最低日誌層級
+            log_file: 完整日誌檔路徑或共用的 LogFile，None 時不寫入檔案（以路徑指定時由 LogSink 開啟與關閉）
+            max_lines: 緩衝區最多保留的顯示行數，超過時捨棄最舊的訊息
+            file_batch: 累積多少行才寫入日誌檔
+            with_levels: 為 True 時輸出函數收到 (訊息, 層級) 的列表，讓接收端能再依層級過濾
+        """
+        self.emit_callback = emit_callback
+        self.level = level
+        if isinstance(log_file, LogFile):
+            self._file = log_file
+            self._owns_file = False
+        else:
+            self._file = LogFile(log_file) if log_file else None
+            self._owns_file = True
+        self.log_file = self._file.path if self._file else None
+        self.file_batch = file_batch
+        self.with_levels = with_levels
+        self._display = deque(maxlen=max_lines)
+        self._dropped = 0
+        self._file_lines = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._stop = threading.Event()
+
+    def __call__(self, message, level=logging.INFO):
+        """
+        寫入訊息，讓 LogSink 可直接作為 log_callback 使用
+
+        Args:
+            message: 訊息內容
+            level: 日誌層級
+        """
+        self.log(message, level)
+
+    def log(self, message, level=logging.INFO):
+        """
+        寫入訊息
+
+        Args:
+            message: 訊息內容
+            level: 日誌層級
+        """
+        with self._lock:
+            if self._file:
+                timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+                self._file_lines.append(f"{timestamp} [{logging.getLevelName(level)}] {message}\n")
+                if len(self._file_lines) >= self.file_batch:
+                    self._write_file()
+            if level >= self.level:
+                if len(self._display) == self._display.maxlen:
+                    self._dropped += 1
+                self._display.append((message, level))
+
+    def _write_file(self):
+        """
+        將累積的日誌寫入檔案（呼叫端需持有 self._lock）
+        """
+        if self._file and self._file_lines:
+            self._file.write(self._file_lines)
+            self._file_lines = []
+
+    def set_level(self, level):
+        """
+        設定顯示的最低日誌層級
+
+        Args:
+            level: 日誌層級
+        """
+        self.level = level
+
+    def flush(self):
+        """
+        將緩衝區的訊息批次送到輸出函數，應在輸出端所在的執行緒呼叫
+        """
+        with self._flush_lock:
+            with self._lock:
+                lines = list(self._display)
+                self._display.clear()
+                dropped, self._dropped = self._dropped, 0
+                self._write_file()
+
+            if dropped:
+                note = f"（已略過 {dropped} 行較舊的日誌"
+                note += f"，完整內容請見 {self.log_file}）" if self.log_file else "）"
+                lines.insert(0, (note, logging.WARNING))
+            if not lines:
+                return
+            if self.emit_callback:
+                self.emit_callback(lines if self.with_levels else [message for message, _ in lines])
+            else:
+                print('\n'.join(message for message, _ in lines))
+
+    def start(self, interval=0.2):
+        """
+        啟動背景執行緒定期輸出（適用於命令行，GUI 請改用 root.after 呼叫 flush）
+
+        Args:
+            interval: 輸出間隔秒數
+        """
+        def run():
+            while not self._stop.wait(interval):
+                self.flush()
+
+        self._stop.clear()
+        self._timer = threading.Thread(target=run, daemon=True)
+        self._timer.start()
+
+    def close(self):
+        """
+        停止背景輸出、送出剩餘訊息並關閉日誌檔（共用的 LogFile 由建立者關閉）
+        """
+        self._stop.set()
+        if self._timer:
+            self._timer.join()
+            self._timer = None
+        self.flush()
+        with self._lock:
+            if self._file and self._owns_file:
+                self._file.close()
+            self._file = None
@@ -1,32 +1,311 @@
 """
 主程式入口
+
+命令行模式只在解析參數後才載入處理模組，且不會載入 tkinter；
+圖形界面相關模組只在未指定設定檔時載入，沒有 Tk 的伺服器也能執行命令行模式。
 """
 import sys
-import tkinter as tk
-from gui import FileMoverGUI
-from excel_processor import ExcelProcessor
+import logging
+import argparse
+from constants import (COPY_BACKENDS, COPY_BACKEND_AUTO, COPY_CHUNK_SIZE, FOLDER_SYNC_MODES, FOLDER_SYNC_REPLACE,
+                       HASH_ALGORITHMS, HASH_BLAKE2B, DELETE_POLICIES, DELETE_KEEP, DELETE_ASK, DELETE_YES,
+                       WATCH_POLL_INTERVAL, IO_DEVICE_LIMIT, LINK_MODES, LINK_MODE_OFF)
+from log_sink import LogSink, LOG_LEVELS
+
+def parse_arguments(argv=None):
+    """
+    解析命令行參數
+
+    Args:
+        argv: 命令行參數列表，None 時使用 sys.argv
+
+    Returns:
+        argparse.Namespace: 解析後的參數
+    """
+    parser = argparse.ArgumentParser(description='檔案與資料夾管理工具')
+    parser.add_argument('excel', nargs='?', help='要處理的 Excel 檔案路徑，未指定時啟動圖形界面')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='平行處理的工作執行緒數量（預設依 CPU 數量決定，1 為依序處理）')
+    parser.add_argument('--revalidate-dirs', action='store_true',
+                        help='目錄快取命中時仍確認目錄存在（執行期間目標目錄可能被其他程式刪除時使用）')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='試跑模式：只列出操作計畫、預估位元組數與操作數量，不實際變更任何檔案')
+    parser.add_argument('--delete', choices=DELETE_POLICIES, default=DELETE_KEEP,
+                        help='處理完成後是否刪除原始資料：keep 保留（預設），ask 在終端機詢問，'
+                             'yes 直接刪除（同一檔案系統上的項目直接改名搬移）')
+    parser.add_argument('--move', action='store_const', dest='delete', const=DELETE_YES,
+                        help='搬移模式，等同 --delete yes')
+    parser.add_argument('--copy-backend', choices=COPY_BACKENDS, default=COPY_BACKEND_AUTO,
+                        help='檔案複製方式（預設 auto：依序嘗試 reflink、copy_file_range、sendfile、分段緩衝複製）')
+    parser.add_argument('--copy-chunk-size', type=int, default=COPY_CHUNK_SIZE,
+                        help=f'分段緩衝複製時每次讀取的位元組數（預設 {COPY_CHUNK_SIZE}）')
+    parser.add_argument('--folder-sync', choices=FOLDER_SYNC_MODES, default=FOLDER_SYNC_REPLACE,
+                        help='目標資料夾已存在時的處理方式：replace 刪除後重新複製，incremental 只複製新增或變更的檔案')
+    parser.add_argument('--sync-hash', action='store_true',
+                        help='增量同步時，大小相同的檔案以內容雜湊值判斷是否變更')
+    parser.add_argument('--resume', action='store_true',
+                        help='依操作紀錄繼續先前中斷的執行：略過已完成的操作，只重做中斷的操作')
+    parser.add_argument('--journal', default=None,
+                        help='操作紀錄檔路徑，預設寫在設定檔旁（<設定檔名稱>_journal.jsonl）')
+    parser.add_argument('--verify', action='store_true',
+                        help='複製後以雜湊值驗證複本，只刪除通過驗證的原始資料')
+    parser.add_argument('--verify-algorithm', choices=HASH_ALGORITHMS, default=HASH_BLAKE2B,
+                        help='驗證使用的雜湊演算法（xxh64、xxh3_128 需安裝 xxhash）')
+    parser.add_argument('--verify-workers', type=int, default=None,
+                        help='驗證的工作執行緒數量，預設依 CPU 數量決定')
+    parser.add_argument('--report', default=None,
+                        help='執行報告（JSON）路徑，預設寫在設定檔旁（<設定檔名稱>_report.json）')
+    parser.add_argument('--profile', default=None, metavar='PATH',
+                        help='以 cProfile 分析執行效能，統計寫入指定檔案，主要步驟耗時與熱點函數摘要寫入 <PATH>.txt')
+    parser.add_argument('--link', choices=LINK_MODES, default=LINK_MODE_OFF,
+                        help='多個目標位於同一檔案系統時只實際複製一次，其他目標以硬連結（hardlink）'
+                             '或 reflink 建立；不支援時自動改為複製（預設 off）')
+    parser.add_argument('--content-index', default=None, metavar='PATH',
+                        help='內容索引（SQLite）檔案路徑：跨執行記錄檔案狀態與雜湊值，略過內容已與來源相同的目標，'
+                             '並列出不同資料列中內容相同的來源檔案')
+    parser.add_argument('--io-limit', type=int, default=None,
+                        help=f'依儲存裝置排程複製操作，每個裝置同時最多 N 個操作（指定 --device-limit 時預設 {IO_DEVICE_LIMIT}，'
+                             '傳統硬碟一次一個）')
+    parser.add_argument('--device-limit', type=device_limit_argument, action='append', default=[],
+                        metavar='PATH=N',
+                        help='指定掛載點（如 NAS、USB 硬碟）同時最多 N 個操作，可重複指定；位於其下的路徑歸為同一組')
+    parser.add_argument('--watch', default=None, metavar='INBOX',
+                        help='監看模式：持續處理放入收件資料夾的 .xlsx／.csv 設定檔（不可同時指定設定檔）')
+    parser.add_argument('--done-dir', default=None,
+                        help='監看模式中處理成功的設定檔與報告移入的資料夾（預設 INBOX/done）')
+    parser.add_argument('--failed-dir', default=None,
+                        help='監看模式中處理失敗的設定檔與報告移入的資料夾（預設 INBOX/failed）')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='監看模式中同時處理的設定檔數量（預設 1）')
+    parser.add_argument('--poll-interval', type=float, default=WATCH_POLL_INTERVAL,
+                        help=f'監看模式檢查收件資料夾的間隔秒數（預設 {WATCH_POLL_INTERVAL}）')
+    parser.add_argument('--no-inotify', action='store_true',
+                        help='監看模式不使用 inotify，一律定時檢查')
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='debug',
+                        help='輸出到畫面的最低日誌層級（預設 debug：輸出所有訊息）')
+    parser.add_argument('--log-file', default=None,
+                        help='將完整日誌（不受 --log-level 影響）寫入指定檔案')
+    args = parser.parse_args(argv)
+    if args.io_limit is not None and args.io_limit < 1:
+        parser.error('--io-limit 必須大於 0')
+    if args.watch and (args.excel or args.report or args.journal or args.resume):
+        parser.error('--watch 不可與設定檔、--report、--journal 或 --resume 同時使用')
+    if args.verify:
+        from verification import available_algorithms
+
+        if args.verify_algorithm not in available_algorithms():
+            parser.error(f"雜湊演算法 {args.verify_algorithm} 需要安裝 xxhash（pip install xxhash）")
+    return args
+
+def console_confirm(log_sink):
+    """
+    建立在終端機詢問是否刪除原始資料的確認函數
+
+    Args:
+        log_sink: 命令行的 LogSink，詢問前先輸出緩衝區中的日誌
+
+    Returns:
+        function: 以確認訊息呼叫、返回是否刪除的函數
+    """
+    def confirm(message):
+        log_sink.flush()
+        if not sys.stdin or not sys.stdin.isatty():
+            log_sink.log("無法在非互動式終端機詢問，原始資料將保留", logging.WARNING)
+            return False
+        try:
+            answer = input(f"{message} [y/N] ")
+        except EOFError:
+            return False
+        return answer.strip().lower() in ('y', 'yes', '是')
+    return confirm
+
+def device_limit_argument(text):
+    """
+    解析 --device-limit 參數
+
+    Args:
+        text: 路徑=數量
+
+    Returns:
+        tuple: (路徑, 上限)
+    """
+    from io_scheduler import parse_device_limit
+
+    try:
+        return parse_device_limit(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def create_io_scheduler(args, log_callback):
+    """
+    依命令行參數建立 I/O 排程，未指定 --io-limit 或 --device-limit 時不限制
+
+    Args:
+        args: 解析後的命令行參數
+        log_callback: 日誌回呼函數
+
+    Returns:
+        IOScheduler: I/O 排程，不限制時為 None
+    """
+    if args.io_limit is None and not args.device_limit:
+        return None
+    from io_scheduler import IOScheduler
+
+    return IOScheduler(args.io_limit or IO_DEVICE_LIMIT, dict(args.device_limit), log_callback=log_callback)
+
+def create_processor(args, log_callback, confirm_delete, **options):
+    """
+    依命令行參數建立 Excel 處理器
+
+    Args:
+        args: 解析後的命令行參數
+        log_callback: 日誌回呼函數
+        confirm_delete: 確認刪除原始資料的函數
+        **options: 其他 ExcelProcessor 參數
+
+    Returns:
+        ExcelProcessor: 處理器
+    """
+    from excel_processor import ExcelProcessor
+
+    return ExcelProcessor(
+        log_callback=log_callback,
+        confirm_delete_callback=confirm_delete,
+        max_workers=args.workers,
+        # 確定刪除時事先確認，同一檔案系統上的項目可直接改名搬移
+        confirm_delete_upfront=args.delete == DELETE_YES,
+        copy_backend=args.copy_backend,
+        copy_chunk_size=args.copy_chunk_size,
+        folder_sync_mode=args.folder_sync,
+        sync_hash=args.sync_hash,
+        dry_run=args.dry_run,
+        revalidate_directories=args.revalidate_dirs,
+        verify=args.verify,
+        verify_algorithm=args.verify_algorithm,
+        verify_workers=args.verify_workers,
+        link_mode=args.link,
+        content_index_path=args.content_index,
+        **options
+    )
+
+def run_cli(args):
+    """
+    以命令行模式處理設定檔
+
+    Args:
+        args: 解析後的命令行參數
+
+    Returns:
+        int: 結束碼，處理成功為 0
+    """
+    # 日誌先寫入緩衝區，由背景執行緒批次輸出
+    log_sink = LogSink(level=LOG_LEVELS[args.log_level], log_file=args.log_file)
+    log_sink.start()
+
+    if args.delete == DELETE_ASK:
+        confirm_delete = console_confirm(log_sink)
+    else:
+        confirm_delete = lambda msg: args.delete == DELETE_YES
+
+    # 建立 Excel 處理器
+    processor = create_processor(args, log_sink, confirm_delete, report_path=args.report,
+                                 journal_path=args.journal, resume=args.resume,
+                                 io_scheduler=create_io_scheduler(args, log_sink))
+
+    profiler = None
+    if args.profile:
+        from profiling import Profiler
+
+        profiler = Profiler(args.profile)
+        profiler.start()
+
+    # 處理 Excel 檔案
+    try:
+        success = processor.read_and_process_excel(args.excel)
+    finally:
+        if profiler:
+            if profiler.stop():
+                log_sink.log(f"效能分析已寫入: {args.profile}（摘要: {profiler.summary_path}）")
+            else:
+                log_sink.log(f"無法寫入效能分析: {args.profile}", logging.ERROR)
+        log_sink.close()
+    return 0 if success else 1
+
+def run_watch(args):
+    """
+    以監看模式持續處理放入收件資料夾的設定檔
+
+    Args:
+        args: 解析後的命令行參數
+
+    Returns:
+        int: 結束碼
+    """
+    import signal
+    from utils import DirectoryCache
+    from watch_daemon import ManifestWatcher
+
+    log_sink = LogSink(level=LOG_LEVELS[args.log_level], log_file=args.log_file)
+    log_sink.start()
+    if args.delete == DELETE_ASK:
+        log_sink.log("監看模式無法逐一詢問，原始資料將保留（可改用 --delete yes）", logging.WARNING)
+    confirm_delete = lambda msg: args.delete == DELETE_YES
+    # 所有工作共用同一個目錄快取，已建立的目標目錄不必每個工作重新建立；
+    # 目錄可能在兩個工作之間被刪除，命中快取時一律確認目錄仍然存在
+    directory_cache = DirectoryCache(revalidate=True)
+    # 同時處理多個設定檔時，各裝置的操作上限由所有工作共同計算
+    io_scheduler = create_io_scheduler(args, log_sink)
+
+    watcher = ManifestWatcher(
+        args.watch,
+        lambda log_callback: create_processor(args, log_callback, confirm_delete,
+                                              directory_cache=directory_cache, io_scheduler=io_scheduler),
+        done_dir=args.done_dir,
+        failed_dir=args.failed_dir,
+        jobs=args.jobs,
+        poll_interval=args.poll_interval,
+        use_inotify=not args.no_inotify,
+        log_callback=log_sink
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log_sink.close()
+    return 0
+
+def run_gui():
+    """
+    啟動圖形界面
+    """
+    import tkinter as tk
+    from gui import FileMoverGUI
+
+    root = tk.Tk()
+    app = FileMoverGUI(root)
+    root.mainloop()
 
 def main():
     """
     主程式入口函數
+
+    Returns:
+        int: 結束碼
     """
-    if len(sys.argv) > 1:
+    args = parse_arguments()
+
+    if args.watch:
+        return run_watch(args)
+
+    if args.excel:
         # 從命令行執行時，不創建GUI
-        excel_file_path = sys.argv[1]
-        
-        # 建立 Excel 處理器
-        processor = ExcelProcessor(
-            log_callback=print,
-            confirm_delete_callback=lambda msg: False  # 不刪除原始檔案
-        )
-        
-        # 處理 Excel 檔案
-        processor.read_and_process_excel(excel_file_path)
-    else:
-        # 正常啟動GUI
-        root = tk.Tk()
-        app = FileMoverGUI(root)
-        root.mainloop()
+        return run_cli(args)
+
+    # 正常啟動GUI
+    run_gui()
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+設定檔（manifest）讀取模組，以串流方式逐列讀取 Excel 或 CSV 檔案
+"""
+import os
+import csv
+import math
+
+# 以 openpyxl 唯讀模式串流讀取的副檔名
+STREAMING_EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+CSV_EXTENSIONS = ('.csv',)
+
+def cell_value(row, column):
+    """
+    取得資料列中的儲存格內容
+
+    Args:
+        row: 資料列（dict 或 pandas Series）
+        column: 欄位名稱
+
+    Returns:
+        str: 儲存格內容，空白儲存格返回None
+    """
+    value = row.get(column)
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, str) and value == '':
+        return None
+    return str(value)
+
+class ManifestReader:
+    """
+    逐列讀取設定檔的讀取器
+
+    開啟時只讀取標題列，資料列在迭代時才逐列讀取，
+    因此可在讀取資料前先檢查欄位，且記憶體用量不隨檔案大小增加。
+    """
+    def __init__(self, file_path):
+        """
+        開啟設定檔並讀取標題列
+
+        Args:
+            file_path: 設定檔路徑
+        """
+        self.file_path = file_path
+        self.columns = []
+        self._rows = None
+        self._close = None
+
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension in STREAMING_EXCEL_EXTENSIONS:
+            self._open_excel()
+        elif extension in CSV_EXTENSIONS:
+            self._open_csv()
+        else:
+            self._open_with_pandas()
+
+    def _open_excel(self):
+        """
+        以 openpyxl 唯讀模式開啟 Excel 檔案
+        """
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        self._close = workbook.close
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+        self.columns = [str(value) if value is not None else '' for value in header]
+        self._rows = rows
+
+    def _open_csv(self):
+        """
+        開啟 CSV 檔案（支援含 BOM 的 UTF-8）
+        """
+        csv_file = open(self.file_path, newline='', encoding='utf-8-sig')
+        self._close = csv_file.close
+        rows = csv.reader(csv_file)
+        self.columns = next(rows, [])
+        self._rows = rows
+
+    def _open_with_pandas(self):
+        """
+        以 pandas 讀取其他格式（如 .xls），無法串流時的備援方式
+        """
+        import pandas as pd
+
+        df = pd.read_excel(self.file_path)
+        self.columns = [str(column) for column in df.columns]
+        self._rows = df.itertuples(index=False, name=None)
+
+    def __iter__(self):
+        """
+        逐列產生資料列
+
+        Yields:
+            dict: 欄位名稱 -> 儲存格內容，完全空白的資料列會被略過
+        """
+        columns = self.columns
+        for values in self._rows:
+            if all(value is None or value == '' for value in values):
+                continue
+            yield dict(zip(columns, values))
+
+    def close(self):
+        """
+        關閉設定檔
+        """
+        if self._close:
+            self._close()
+            self._close = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def count_manifest_rows(file_path):
+    """
+    計算設定檔中非空白資料列的數量（逐列讀取，不保留資料列內容）
+
+    Args:
+        file_path: 設定檔路徑
+
+    Returns:
+        int: 資料列數
+    """
+    with ManifestReader(file_path) as reader:
+        return sum(1 for _ in reader)
@@ -0,0 +1,359 @@
+"""
+執行統計模組，記錄各階段耗時、操作延遲分布、各目標的複製量與錯誤數
+"""
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from constants import LATENCY_BUCKETS_MS, METRICS_SUMMARY_TARGETS
+from copy_backends import format_size
+
+# 階段名稱 -> 顯示名稱
+STAGE_LABELS = {
+    'read_manifest': '讀取設定檔',
+    'plan': '規劃',
+    'copy': '執行操作',
+    'verify': '驗證複本',
+    'delete': '刪除原始資料',
+    'cleanup': '清理空資料夾',
+}
+
+class LatencyHistogram:
+    """
+    操作延遲分布，依 LATENCY_BUCKETS_MS 的上限分組（毫秒）
+    """
+    def __init__(self):
+        """
+        初始化延遲分布
+        """
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # 最後一組為超過最大上限的操作
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, seconds):
+        """
+        加入一次操作的耗時
+
+        Args:
+            seconds: 耗時秒數
+        """
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        milliseconds = seconds * 1000
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if milliseconds <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, fraction):
+        """
+        以分組上限估計百分位數
+
+        Args:
+            fraction: 百分位（0~1）
+
+        Returns:
+            float: 估計的耗時毫秒數上限，落在最後一組時為最長耗時
+        """
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets[:-1]):
+            seen += count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[index]
+        return self.max * 1000
+
+    def to_dict(self):
+        """
+        轉換為可輸出為 JSON 的字典
+
+        Returns:
+            dict: 延遲分布
+        """
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS]
+        labels.append(f">{LATENCY_BUCKETS_MS[-1]}ms")
+        return {
+            'count': self.count,
+            'total_seconds': round(self.total, 6),
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': round(self.max * 1000, 3),
+            'buckets': dict(zip(labels, self.buckets)),
+        }
+
+class RunMetrics:
+    """
+    單次執行的統計資料
+
+    所有記錄方法皆可從多個執行緒呼叫。階段耗時為獨佔時間：
+    在某階段中進入另一個階段時（例如執行操作時邊讀取設定檔），內層的時間不計入外層。
+    """
+    def __init__(self):
+        """
+        初始化執行統計
+        """
+        self.started_at = time.time()
+        self.finished = False
+        self.stages = {}
+        self.operations = {}
+        self.targets = {}
+        self.errors = {'warnings': 0, 'errors': 0}
+        self.failed_rows = 0
+        self._target_roots = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started = time.perf_counter()
+        self._elapsed = None
+
+    @contextmanager
+    def stage(self, name):
+        """
+        計算區塊的耗時並計入指定階段
+
+        Args:
+            name: 階段名稱
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed - nested
+
+    def timed(self, iterable, name):
+        """
+        逐項產生可迭代物件的內容，取得每一項的時間計入指定階段
+
+        Args:
+            iterable: 可迭代物件
+            name: 階段名稱
+
+        Yields:
+            可迭代物件的每一項
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def record_operation(self, kind, seconds):
+        """
+        記錄一次操作的耗時
+
+        Args:
+            kind: 操作類型
+            seconds: 耗時秒數
+        """
+        with self._lock:
+            histogram = self.operations.get(kind)
+            if histogram is None:
+                histogram = self.operations[kind] = LatencyHistogram()
+            histogram.add(seconds)
+
+    def add_target_roots(self, paths):
+        """
+        登記目標根目錄，之後複製到其下的檔案會計入該目標
+
+        Args:
+            paths: 目標路徑列表
+        """
+        with self._lock:
+            self._target_roots.update(os.path.normcase(path) for path in paths if path)
+
+    def _target_root(self, target_file):
+        """
+        找出檔案所屬的目標根目錄（呼叫端需持有 self._lock）
+
+        Args:
+            target_file: 目標檔案路徑
+
+        Returns:
+            str: 目標根目錄，沒有登記的目標時為檔案所在目錄
+        """
+        path = os.path.normcase(target_file)
+        parent = os.path.dirname(path)
+        while parent and parent != path:
+            if parent in self._target_roots:
+                return parent
+            path = parent
+            parent = os.path.dirname(path)
+        return os.path.dirname(target_file)
+
+    def record_copy(self, target_file, size, linked=False):
+        """
+        記錄複製到目標的檔案
+
+        Args:
+            target_file: 目標檔案路徑
+            size: 檔案位元組數
+            linked: 是否以連結建立（計入檔案數，但不計入寫入的位元組數）
+        """
+        with self._lock:
+            entry = self._target_entry(target_file)
+            entry['files'] += 1
+            if linked:
+                entry['linked'] += 1
+            else:
+                entry['bytes'] += size
+
+    def record_unchanged(self, target_file, size):
+        """
+        記錄內容與來源相同、略過複製的目標檔案
+
+        Args:
+            target_file: 目標檔案路徑
+            size: 檔案位元組數
+        """
+        with self._lock:
+            entry = self._target_entry(target_file)
+            entry['unchanged'] += 1
+            entry['unchanged_bytes'] += size
+
+    def _target_entry(self, target_file):
+        """
+        取得檔案所屬目標的統計（呼叫端需持有 self._lock）
+
+        Args:
+            target_file: 目標檔案路徑
+
+        Returns:
+            dict: 目標的統計
+        """
+        return self.targets.setdefault(self._target_root(target_file),
+                                       {'files': 0, 'bytes': 0, 'linked': 0, 'unchanged': 0, 'unchanged_bytes': 0})
+
+    def record_log(self, level):
+        """
+        依日誌層級計算警告與錯誤數
+
+        Args:
+            level: 日誌層級
+        """
+        if level >= logging.ERROR:
+            key = 'errors'
+        elif level >= logging.WARNING:
+            key = 'warnings'
+        else:
+            return
+        with self._lock:
+            self.errors[key] += 1
+
+    def record_failed_rows(self, count=1):
+        """
+        記錄無法執行、未全部完成或未通過驗證的資料列
+
+        Args:
+            count: 資料列數
+        """
+        with self._lock:
+            self.failed_rows += count
+
+    def finish(self):
+        """
+        結束統計，記錄總耗時
+        """
+        if not self.finished:
+            self._elapsed = time.perf_counter() - self._started
+            self.finished = True
+
+    def to_dict(self):
+        """
+        轉換為可輸出為 JSON 的字典
+
+        Returns:
+            dict: 執行統計
+        """
+        elapsed = self._elapsed if self._elapsed is not None else time.perf_counter() - self._started
+        with self._lock:
+            return {
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+                'elapsed_seconds': round(elapsed, 6),
+                'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+                'operations': {kind: histogram.to_dict() for kind, histogram in self.operations.items()},
+                'targets': {root: dict(entry) for root, entry in sorted(self.targets.items())},
+                'files_copied': sum(entry['files'] for entry in self.targets.values()),
+                'bytes_copied': sum(entry['bytes'] for entry in self.targets.values()),
+                'files_linked': sum(entry['linked'] for entry in self.targets.values()),
+                'files_unchanged': sum(entry['unchanged'] for entry in self.targets.values()),
+                'bytes_unchanged': sum(entry['unchanged_bytes'] for entry in self.targets.values()),
+                'errors': dict(self.errors),
+                'failed_rows': self.failed_rows,
+            }
+
+    def write_report(self, report_path, extra=None):
+        """
+        將統計寫入 JSON 報告檔
+
+        Args:
+            report_path: 報告檔路徑
+            extra: 要一併寫入的其他欄位
+
+        Returns:
+            bool: 寫入成功返回True，否則返回False
+        """
+        report = self.to_dict()
+        if extra:
+            report.update(extra)
+        try:
+            with open(report_path, 'w', encoding='utf-8') as report_file:
+                json.dump(report, report_file, ensure_ascii=False, indent=2)
+            return True
+        except OSError:
+            return False
+
+    def format_summary(self, operation_labels=None):
+        """
+        將統計格式化為日誌訊息
+
+        Args:
+            operation_labels: 操作類型 -> 顯示名稱
+
+        Returns:
+            list: 統計訊息列表
+        """
+        report = self.to_dict()
+        operation_labels = operation_labels or {}
+        lines = [f"執行統計：總耗時 {report['elapsed_seconds']:.2f} 秒"]
+
+        if report['stages']:
+            parts = [f"{STAGE_LABELS.get(name, name)} {seconds:.2f} 秒"
+                     for name, seconds in report['stages'].items()]
+            lines.append("  階段耗時：" + "，".join(parts))
+
+        for kind, histogram in report['operations'].items():
+            lines.append(
+                f"  {operation_labels.get(kind, kind)}：{histogram['count']} 次，"
+                f"平均 {histogram['mean_ms']:.1f} ms，P95 ≤ {histogram['p95_ms']:g} ms，"
+                f"最長 {histogram['max_ms']:.1f} ms"
+            )
+
+        targets = sorted(report['targets'].items(), key=lambda item: item[1]['bytes'], reverse=True)
+        for root, entry in targets[:METRICS_SUMMARY_TARGETS]:
+            linked = f"，其中 {entry['linked']} 個以連結建立" if entry['linked'] else ''
+            unchanged = f"，{entry['unchanged']} 個內容相同略過" if entry['unchanged'] else ''
+            lines.append(f"  目標 {root}：{entry['files']} 個檔案 ({format_size(entry['bytes'])}){linked}{unchanged}")
+        if len(targets) > METRICS_SUMMARY_TARGETS:
+            lines.append(f"  其他 {len(targets) - METRICS_SUMMARY_TARGETS} 個目標請見報告檔")
+
+        failed = f"，未完成 {report['failed_rows']} 列" if report['failed_rows'] else ''
+        lines.append(f"  警告 {report['errors']['warnings']} 個，錯誤 {report['errors']['errors']} 個{failed}")
+        return lines
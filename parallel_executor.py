@@ -0,0 +1,266 @@
+"""
+平行執行模組，讓互不相干的 Excel 資料列同時執行
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from constants import MAX_DEFAULT_WORKERS
+from log_sink import emit_log, supports_level
+
+def default_worker_count():
+    """
+    取得預設的工作執行緒數量
+
+    檔案操作以等待 I/O 為主，因此執行緒數量可以高於 CPU 核心數。
+
+    Returns:
+        int: 預設的工作執行緒數量
+    """
+    return min(MAX_DEFAULT_WORKERS, (os.cpu_count() or 1) + 4)
+
+def path_ancestors(path):
+    """
+    依序產生路徑的所有上層目錄
+
+    Args:
+        path: 路徑
+
+    Yields:
+        str: 上層目錄路徑
+    """
+    parent = os.path.dirname(path)
+    while parent and parent != path:
+        yield parent
+        path = parent
+        parent = os.path.dirname(path)
+
+class PathConflictTracker:
+    """
+    追蹤各工作所涉及的路徑，找出必須依序執行的相依工作
+
+    兩個工作若涉及相同路徑，或其中一個路徑位於另一個路徑之下，
+    就視為互相衝突，必須依照 Excel 中的順序執行。
+    已完成的工作會被移除，因此記憶體用量只與尚未完成的工作數量有關。
+    """
+    def __init__(self):
+        """
+        初始化路徑衝突追蹤器
+        """
+        # 路徑 -> 最後一個直接涉及此路徑的工作編號
+        self._last_exact = {}
+        # 目錄 -> 在此目錄之下（且晚於最後一次直接涉及）的工作編號
+        self._under = {}
+        # 工作編號 -> 涉及的路徑
+        self._task_keys = {}
+
+    def register(self, index, paths):
+        """
+        登記工作涉及的路徑，並回傳它必須等待的工作
+
+        Args:
+            index: 工作編號，必須依序遞增
+            paths: 工作涉及的路徑列表
+
+        Returns:
+            set: 必須先完成（且尚未完成）的工作編號集合
+        """
+        keys = {os.path.normcase(path) for path in paths if path}
+        dependencies = set()
+
+        for key in keys:
+            if key in self._last_exact:
+                dependencies.add(self._last_exact[key])
+            dependencies.update(self._under.get(key, ()))
+            for ancestor in path_ancestors(key):
+                if ancestor in self._last_exact:
+                    dependencies.add(self._last_exact[ancestor])
+
+        for key in keys:
+            self._last_exact[key] = index
+            # 之後在此路徑之下的工作會透過上層目錄的比對等待本工作
+            self._under.pop(key, None)
+            for ancestor in path_ancestors(key):
+                self._under.setdefault(ancestor, set()).add(index)
+
+        self._task_keys[index] = keys
+        dependencies.discard(index)
+        return dependencies
+
+    def release(self, index):
+        """
+        移除已完成的工作，之後登記的工作不必再等待它
+
+        Args:
+            index: 已完成的工作編號
+        """
+        for key in self._task_keys.pop(index, ()):
+            if self._last_exact.get(key) == index:
+                del self._last_exact[key]
+            for ancestor in path_ancestors(key):
+                indexes = self._under.get(ancestor)
+                if indexes is not None:
+                    indexes.discard(index)
+                    if not indexes:
+                        del self._under[ancestor]
+
+class _TaskState:
+    """
+    執行中工作的狀態
+    """
+    __slots__ = ('func', 'pending', 'dependents', 'io_keys', 'deferred_at')
+
+    def __init__(self, func, pending, io_keys=()):
+        self.func = func
+        self.pending = pending
+        self.dependents = []
+        self.io_keys = io_keys
+        self.deferred_at = None
+
+class ParallelRowExecutor:
+    """
+    以執行緒池執行工作，並確保路徑衝突的工作依序執行
+
+    指定 IOScheduler 時，工作在派送前預留所涉及裝置的名額；名額不足的工作延後到有名額空出時再派送，
+    慢速裝置的工作只在執行器中排隊，不會佔住其他裝置的工作所需的工作執行緒。
+    """
+    def __init__(self, max_workers=None, log_callback=None, max_pending=None, io_scheduler=None):
+        """
+        初始化平行執行器
+
+        Args:
+            max_workers: 最大工作執行緒數量，None 時使用預設值
+            log_callback: 日誌輸出回呼函數
+            max_pending: 同時登記（執行中或等待中）的工作上限，None 時為工作執行緒數量的 4 倍
+            io_scheduler: IOScheduler，依儲存裝置限制同時執行的工作，None 時不限制
+        """
+        self.max_workers = max_workers or default_worker_count()
+        self.max_pending = max_pending or self.max_workers * 4
+        self.log_callback = log_callback
+        self.io_scheduler = io_scheduler
+
+    @supports_level
+    def log_message(self, message, level=logging.INFO):
+        """
+        輸出日誌訊息
+
+        Args:
+            message: 訊息內容
+            level: 日誌層級
+        """
+        if self.log_callback:
+            emit_log(self.log_callback, message, level)
+        else:
+            print(message)
+
+    def run(self, tasks, poll_callback=None, poll_interval=0.1):
+        """
+        執行所有工作
+
+        工作可以是產生器，執行器會邊讀取邊執行，
+        同時登記的工作數量不超過 max_pending。
+
+        Args:
+            tasks: 產生 (涉及路徑列表, 無參數函數) 的可迭代物件
+            poll_callback: 等待期間在呼叫端執行緒定期執行的函數
+            poll_interval: 呼叫 poll_callback 的間隔秒數
+
+        Returns:
+            list: 依工作順序排列的執行結果（不含 None）
+        """
+        results = {}
+        tracker = PathConflictTracker()
+        states = {}
+        # 相依工作已完成、等待裝置名額的工作編號
+        deferred = []
+        scheduler = self.io_scheduler
+        # 名額統計記錄到呼叫端執行緒所屬的執行
+        io_report = scheduler.current_report() if scheduler is not None else None
+        lock = threading.Lock()
+        slots = threading.Semaphore(self.max_pending)
+        idle = threading.Event()
+        idle.set()
+
+        def poll():
+            # 其他處理器也可能歸還名額，定期重新嘗試延後的工作
+            if scheduler is not None:
+                submit_deferred()
+            if poll_callback:
+                poll_callback()
+
+        def run_reserved(func):
+            with scheduler.holding():
+                return func()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            def submit(index):
+                state = states[index]
+                if scheduler is None:
+                    future = pool.submit(state.func)
+                else:
+                    if not scheduler.reserve(state.io_keys, state.deferred_at, io_report):
+                        if state.deferred_at is None:
+                            state.deferred_at = time.perf_counter()
+                        with lock:
+                            deferred.append(index)
+                        return
+                    future = pool.submit(run_reserved, state.func)
+                future.add_done_callback(lambda f, i=index: on_done(i, f))
+
+            def submit_deferred():
+                with lock:
+                    waiting = sorted(deferred)
+                    deferred.clear()
+                for index in waiting:
+                    submit(index)
+
+            def on_done(index, future):
+                try:
+                    result = future.result()
+                    if result is not None:
+                        results[index] = result
+                except Exception as e:
+                    self.log_message(f"第 {index + 1} 項工作執行失敗: {e}", logging.ERROR)
+
+                if scheduler is not None:
+                    scheduler.release(states[index].io_keys)
+                ready = []
+                with lock:
+                    state = states.pop(index)
+                    tracker.release(index)
+                    for dependent in state.dependents:
+                        dependent_state = states[dependent]
+                        dependent_state.pending -= 1
+                        if dependent_state.pending == 0:
+                            ready.append(dependent)
+                    if not states:
+                        idle.set()
+                slots.release()
+
+                # 先派送等待較久的工作，再派送剛解除相依的工作
+                if scheduler is not None:
+                    submit_deferred()
+                for dependent in ready:
+                    submit(dependent)
+
+            for index, (paths, func) in enumerate(tasks):
+                while not slots.acquire(timeout=poll_interval):
+                    poll()
+
+                io_keys = scheduler.groups_for(paths) if scheduler is not None else ()
+                with lock:
+                    dependencies = tracker.register(index, paths)
+                    states[index] = _TaskState(func, len(dependencies), io_keys)
+                    for dependency in dependencies:
+                        states[dependency].dependents.append(index)
+                    idle.clear()
+
+                if not dependencies:
+                    submit(index)
+
+            while not idle.wait(poll_interval):
+                poll()
+
+        poll()
+        return [results[index] for index in sorted(results)]
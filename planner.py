@@ -0,0 +1,470 @@
+"""
+操作規劃模組，將 Excel 資料列轉換為操作計畫，執行前即可檢查與試跑
+"""
+import os
+import json
+import hashlib
+import logging
+from constants import *
+from utils import normalize_path
+from manifest_reader import cell_value
+from parallel_executor import path_ancestors
+from copy_backends import format_size
+from log_sink import emit_log, supports_level
+from source_index import SourceIndex
+
+# 操作類型
+OP_RENAME = 'rename'  # 純重命名
+OP_COPY_FILE = 'copy_file'  # 檔案複製（可改名）
+OP_COPY_FOLDER = 'copy_folder'  # 資料夾複製（可改名）
+OP_CREATE_FOLDER = 'create_folder'  # 建立新資料夾
+
+OPERATION_LABELS = {
+    OP_RENAME: '純重命名',
+    OP_COPY_FILE: '檔案複製',
+    OP_COPY_FOLDER: '資料夾複製',
+    OP_CREATE_FOLDER: '建立資料夾',
+}
+
+# Excel 資料從第 2 列開始（第 1 列為標題）
+FIRST_DATA_ROW = 2
+
+class Operation:
+    """
+    單一資料列對應的操作
+    """
+    def __init__(self, kind, row_number, source=None, file_name=None, new_name=None,
+                 target_paths=None, rename_folder=False, destinations=None, size=None):
+        """
+        初始化操作
+
+        Args:
+            kind: 操作類型（OP_RENAME、OP_COPY_FILE、OP_COPY_FOLDER、OP_CREATE_FOLDER）
+            row_number: Excel 中的列號
+            source: 來源檔案或資料夾的完整路徑
+            file_name: 來源檔案名稱
+            new_name: 新檔案名稱（不包含副檔名）
+            target_paths: 目標路徑列表
+            rename_folder: 是否重命名資料夾
+            destinations: 操作完成後產生的路徑列表
+            size: 來源大小（位元組），未知時為 None
+        """
+        self.kind = kind
+        self.row_number = row_number
+        self.source = source
+        self.file_name = file_name
+        self.new_name = new_name
+        self.target_paths = target_paths or []
+        self.rename_folder = rename_folder
+        self.destinations = destinations or []
+        self.size = size
+
+    @property
+    def paths(self):
+        """
+        操作會讀取或寫入的路徑，用於判斷操作之間是否衝突
+
+        Returns:
+            list: 路徑列表
+        """
+        if self.source:
+            return [self.source] + self.destinations
+        return list(self.destinations)
+
+    @property
+    def key(self):
+        """
+        操作的識別碼，由操作內容（不含列號）計算，同一設定檔在不同次執行中相同
+
+        Returns:
+            str: 識別碼
+        """
+        content = json.dumps(
+            [self.kind, self.source, self.file_name, self.new_name, self.target_paths, self.rename_folder],
+            ensure_ascii=False
+        )
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+    @property
+    def estimated_bytes(self):
+        """
+        預估寫入的位元組數
+
+        Returns:
+            int: 位元組數
+        """
+        if not self.size or self.kind == OP_RENAME:
+            return 0
+        return self.size * len(self.destinations)
+
+    def describe(self):
+        """
+        以一行文字描述操作
+
+        Returns:
+            str: 操作描述
+        """
+        label = OPERATION_LABELS[self.kind]
+        if self.kind == OP_CREATE_FOLDER:
+            detail = ', '.join(self.destinations)
+        else:
+            detail = f"{self.source} -> {', '.join(self.destinations)}"
+        size = f"（{format_size(self.size)}）" if self.size else ''
+        return f"第 {self.row_number} 列 {label}: {detail}{size}"
+
+class OperationPlan:
+    """
+    操作計畫的統計與檢查結果
+    """
+    def __init__(self):
+        """
+        初始化操作計畫
+        """
+        self.operations = []
+        self.counts = {kind: 0 for kind in OPERATION_LABELS}
+        self.estimated_bytes = 0
+        self.skipped_rows = 0
+        # 略過的資料列中，因來源不存在或欄位不完整而無法執行的列數
+        self.invalid_rows = 0
+        self.removed_duplicates = 0
+        self.issues = []
+
+    def add(self, operation, keep=False):
+        """
+        加入操作並更新統計
+
+        Args:
+            operation: Operation 物件
+            keep: 是否保留在 operations 列表中
+        """
+        self.counts[operation.kind] += 1
+        self.estimated_bytes += operation.estimated_bytes
+        if keep:
+            self.operations.append(operation)
+
+    def format_summary(self):
+        """
+        將計畫統計格式化為日誌訊息
+
+        Returns:
+            list: 訊息列表
+        """
+        counts = '，'.join(f"{OPERATION_LABELS[kind]} {count} 項" for kind, count in self.counts.items())
+        lines = [
+            f"操作計畫: {counts}",
+            f"預估寫入 {format_size(self.estimated_bytes)}，"
+            f"略過 {self.skipped_rows} 列，移除重複建立資料夾 {self.removed_duplicates} 個",
+        ]
+        if self.issues:
+            lines.append(f"發現 {len(self.issues)} 個問題:")
+            lines.extend(f"  {issue}" for issue in self.issues)
+        return lines
+
+class OperationPlanner:
+    """
+    將 Excel 資料列轉換為操作的規劃器
+
+    規劃時會移除重複的建立資料夾操作、找出寫入同一目標的衝突，
+    並以每個來源資料夾只列出一次的方式批次確認來源是否存在。
+    規劃狀態會隨資料列累積，因此可以邊讀取邊規劃。
+    """
+    def __init__(self, log_callback=None, estimate_folder_bytes=False, source_index=None, completed_keys=None):
+        """
+        初始化操作規劃器
+
+        Args:
+            log_callback: 日誌輸出回呼函數
+            estimate_folder_bytes: 是否走訪來源資料夾以預估複製的位元組數
+            source_index: 共用的 SourceIndex，None 時建立新的索引
+            completed_keys: 先前的執行中已完成的操作識別碼（繼續中斷的執行時使用），
+                這些操作的來源可能已被搬移或刪除，不檢查是否存在
+        """
+        self.log_callback = log_callback
+        self.estimate_folder_bytes = estimate_folder_bytes
+        self.completed_keys = completed_keys or ()
+        self.plan = OperationPlan()
+        self.source_index = source_index if source_index is not None else SourceIndex()
+        # 前面的操作會產生的路徑（os.path.normcase 後）-> 是否為資料夾；會移除的路徑
+        self._planned_outputs = {}
+        self._planned_removals = set()
+        # 已建立（或將被建立）的資料夾
+        self._created_dirs = set()
+        # 目標路徑 -> 寫入此路徑的 (列號, 來源)
+        self._writers = {}
+
+    @supports_level
+    def log_message(self, message, level=logging.INFO):
+        """
+        輸出日誌訊息
+
+        Args:
+            message: 訊息內容
+            level: 日誌層級
+        """
+        if self.log_callback:
+            emit_log(self.log_callback, message, level)
+        else:
+            print(message)
+
+    def get_all_target_paths(self, row):
+        """
+        獲取所有目標路徑
+
+        Args:
+            row: Excel 資料列
+
+        Returns:
+            list: 目標路徑列表
+        """
+        paths = []
+        for column in (COL_NEW_FOLDER_PATH, COL_NEW_FOLDER_PATH2, COL_NEW_FOLDER_PATH3):
+            path = cell_value(row, column)
+            if path:
+                paths.append(normalize_path(path, self.log_message))
+
+        # 記錄找到的路徑
+        self.log_message(f"找到的目標路徑: {paths}", logging.DEBUG)
+        return paths
+
+    def lookup_source(self, path):
+        """
+        查詢來源路徑的狀態
+
+        Args:
+            path: 已正規化的來源路徑
+
+        Returns:
+            tuple: (是否存在, 是否為資料夾, 大小)；由前面的操作產生的路徑大小為 None，
+                   類型無法得知時是否為資料夾為 None
+        """
+        key = os.path.normcase(path)
+        if key in self._planned_removals:
+            return False, False, None
+        if key in self._planned_outputs:
+            return True, self._planned_outputs[key], None
+        if any(ancestor in self._planned_outputs for ancestor in path_ancestors(key)):
+            return True, None, None
+        return self.source_index.lookup(path)
+
+    def _folder_size(self, path):
+        """
+        計算資料夾內所有檔案的總大小
+
+        Args:
+            path: 資料夾路徑
+
+        Returns:
+            int: 位元組數
+        """
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
+        return total
+
+    def _report_missing_file(self, file_path, full_file_path):
+        """
+        輸出來源檔案不存在的訊息，並提示來源資料夾中名稱最接近的檔案
+
+        Args:
+            file_path: 來源資料夾路徑
+            full_file_path: 來源檔案完整路徑
+        """
+        self.log_message(f"檔案 {full_file_path} 不存在", logging.WARNING)
+        suggestions = self.source_index.suggest(file_path, os.path.basename(full_file_path))
+        if suggestions is None:
+            self.log_message(f"無法列出目錄內容: {file_path}", logging.WARNING)
+        elif suggestions:
+            self.log_message(f"目錄 {file_path} 中名稱相近的項目: {', '.join(suggestions)}")
+        else:
+            self.log_message(f"目錄 {file_path} 中沒有名稱相近的項目")
+
+    def _is_completed(self, operation):
+        """
+        檢查操作是否已在先前的執行中完成
+
+        Args:
+            operation: Operation 物件
+
+        Returns:
+            bool: 已完成返回True
+        """
+        return operation.key in self.completed_keys
+
+    def parse_row(self, row, row_number):
+        """
+        將 Excel 資料列轉換為操作
+
+        Args:
+            row: Excel 資料列
+            row_number: Excel 中的列號
+
+        Returns:
+            Operation: 對應的操作，無法執行時返回None
+        """
+        # 處理檔案路徑和文件名，支援特殊符號
+        file_path = cell_value(row, COL_FILE_PATH)
+        file_name = cell_value(row, COL_FILE)
+        new_name = cell_value(row, COL_NEW_NAME)
+
+        # 正規化路徑
+        if file_path:
+            file_path = normalize_path(file_path, self.log_message)
+
+        # 檢查Rename Folder欄位的值
+        rename_folder = False
+        folder_value = cell_value(row, COL_RENAME_FOLDER)
+        if folder_value:
+            folder_value = folder_value.strip().lower()
+            rename_folder = folder_value == '是' or folder_value == 'true' or folder_value == '1'
+
+        target_paths = self.get_all_target_paths(row)
+
+        # 情況四: 純重命名操作 - 有文件路徑、文件名和新名稱，但沒有目標路徑
+        if file_path and file_name and new_name and not target_paths:
+            source = os.path.join(file_path, file_name)
+            destination = os.path.join(file_path, new_name + os.path.splitext(file_name)[1])
+            operation = Operation(OP_RENAME, row_number, source, file_name, new_name,
+                                  destinations=[destination])
+            if self._is_completed(operation):
+                return operation
+            exists, is_dir, _ = self.lookup_source(source)
+            if not exists or is_dir:
+                self._report_missing_file(file_path, source)
+                return None
+            return operation
+
+        # 情況一：檔案操作（複製/改名）
+        if file_path and file_name and target_paths:
+            source = os.path.join(file_path, file_name)
+            target_name = new_name + os.path.splitext(file_name)[1] if new_name else file_name
+            destinations = [os.path.join(path, target_name) for path in target_paths]
+            operation = Operation(OP_COPY_FILE, row_number, source, file_name, new_name, target_paths,
+                                  destinations=destinations)
+            if self._is_completed(operation):
+                return operation
+            exists, is_dir, operation.size = self.lookup_source(source)
+            if not exists or is_dir is True:
+                self._report_missing_file(file_path, source)
+                return None
+            return operation
+
+        # 情況二：資料夾操作（複製/改名）
+        if file_path and not file_name:
+            if rename_folder:
+                # 改名模式：直接使用New Folder Path作為目標路徑
+                destinations = list(target_paths)
+            else:
+                folder_name = os.path.basename(file_path)
+                destinations = [os.path.join(path, folder_name) for path in target_paths]
+            operation = Operation(OP_COPY_FOLDER, row_number, file_path, None, None, target_paths,
+                                  rename_folder, destinations)
+            if self._is_completed(operation):
+                return operation
+            exists, is_dir, _ = self.lookup_source(file_path)
+            if not exists or is_dir is False:
+                self.log_message(f"指定的路徑 {file_path} 不是資料夾", logging.WARNING)
+                return None
+            if self.estimate_folder_bytes:
+                operation.size = self._folder_size(file_path)
+            return operation
+
+        # 情況三：建立新資料夾
+        if not file_path and not file_name and target_paths:
+            return Operation(OP_CREATE_FOLDER, row_number, target_paths=target_paths,
+                             destinations=list(target_paths))
+
+        # 檢查是否有未處理的情況
+        if not file_path:
+            self.log_message("未指定檔案路徑，無法進行操作", logging.WARNING)
+        if not file_name and not (not file_path):
+            self.log_message("未指定檔案名稱，無法進行檔案操作", logging.WARNING)
+        if not new_name and not target_paths and file_path and file_name:
+            self.log_message("未指定新名稱或目標路徑，無法進行操作", logging.WARNING)
+        return None
+
+    def _record(self, operation):
+        """
+        記錄操作的影響，並檢查重複建立資料夾與目標衝突
+
+        Args:
+            operation: Operation 物件
+
+        Returns:
+            Operation: 需要執行的操作，完全重複時返回None
+        """
+        if operation.kind == OP_CREATE_FOLDER:
+            new_dirs = [path for path in operation.destinations
+                        if os.path.normcase(path) not in self._created_dirs]
+            self.plan.removed_duplicates += len(operation.destinations) - len(new_dirs)
+            if not new_dirs:
+                return None
+            operation.target_paths = operation.destinations = new_dirs
+        else:
+            for destination in operation.destinations:
+                key = os.path.normcase(destination)
+                previous = self._writers.get(key)
+                if previous and previous[1] != operation.source:
+                    self.plan.issues.append(
+                        f"目標衝突: 第 {previous[0]} 列與第 {operation.row_number} 列都會寫入 "
+                        f"{destination}，後者將覆蓋前者"
+                    )
+                self._writers[key] = (operation.row_number, operation.source)
+
+        # 改名會移除原本的路徑（資料夾在同一層改名時也是）
+        if operation.kind == OP_RENAME or (
+                operation.kind == OP_COPY_FOLDER and operation.rename_folder and
+                any(os.path.dirname(operation.source) == os.path.dirname(path) for path in operation.destinations)):
+            self._planned_removals.add(os.path.normcase(operation.source))
+
+        creates_dirs = operation.kind in (OP_CREATE_FOLDER, OP_COPY_FOLDER)
+        for destination in operation.destinations:
+            key = os.path.normcase(destination)
+            self._planned_outputs[key] = creates_dirs
+            self._planned_removals.discard(key)
+            if creates_dirs:
+                self._created_dirs.add(key)
+        for path in operation.target_paths:
+            self._created_dirs.add(os.path.normcase(path))
+
+        return operation
+
+    def iter_operations(self, rows, keep=False):
+        """
+        邊讀取資料列邊產生操作
+
+        Args:
+            rows: 資料列的可迭代物件
+            keep: 是否將操作保留在 plan.operations 中
+
+        Yields:
+            Operation: 需要執行的操作
+        """
+        for index, row in enumerate(rows):
+            operation = self.parse_row(row, index + FIRST_DATA_ROW)
+            if operation is None:
+                self.plan.invalid_rows += 1
+            else:
+                operation = self._record(operation)
+            if operation is None:
+                self.plan.skipped_rows += 1
+                continue
+            self.plan.add(operation, keep)
+            yield operation
+
+    def build_plan(self, rows):
+        """
+        讀取所有資料列並建立完整的操作計畫
+
+        Args:
+            rows: 資料列的可迭代物件
+
+        Returns:
+            OperationPlan: 操作計畫
+        """
+        for _ in self.iter_operations(rows, keep=True):
+            pass
+        return self.plan
@@ -0,0 +1,267 @@
+"""
+效能分析模組：具名區段計時的掛鉤（hook）與 cProfile 效能分析
+
+沒有掛上任何掛鉤時，span() 只回傳共用的空區段，spanned() 包裝的函數只多一次清單檢查，
+因此未啟用效能分析時幾乎沒有額外開銷；cProfile 與 pstats 也只在實際分析時才載入。
+"""
+import time
+import functools
+import threading
+from constants import PROFILE_TOP_FUNCTIONS
+
+# 區段掛鉤：每個區段結束時以 (區段名稱, 耗時秒數) 呼叫，可從多個執行緒呼叫
+_span_hooks = []
+_hooks_lock = threading.Lock()
+
+def add_span_hook(hook):
+    """
+    掛上區段掛鉤
+
+    Args:
+        hook: 以 (區段名稱, 耗時秒數) 呼叫的函數
+    """
+    global _span_hooks
+    with _hooks_lock:
+        # 以替換清單的方式修改，計時中的區段不受影響
+        _span_hooks = _span_hooks + [hook]
+
+def remove_span_hook(hook):
+    """
+    移除區段掛鉤
+
+    Args:
+        hook: 先前掛上的函數
+    """
+    global _span_hooks
+    with _hooks_lock:
+        _span_hooks = [existing for existing in _span_hooks if existing is not hook]
+
+class _NullSpan:
+    """
+    沒有掛鉤時使用的空區段
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    """
+    計時中的具名區段
+    """
+    __slots__ = ('name', 'hooks', 'start')
+
+    def __init__(self, name, hooks):
+        """
+        初始化區段
+
+        Args:
+            name: 區段名稱
+            hooks: 區段開始時的掛鉤清單
+        """
+        self.name = name
+        self.hooks = hooks
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        for hook in self.hooks:
+            hook(self.name, elapsed)
+        return False
+
+def span(name):
+    """
+    以 with 計時具名區段，結束時通知所有掛鉤
+
+    Args:
+        name: 區段名稱
+
+    Returns:
+        context manager: 區段
+    """
+    hooks = _span_hooks
+    if not hooks:
+        return _NULL_SPAN
+    return _Span(name, hooks)
+
+def spanned(name):
+    """
+    將整個函數計時為具名區段的裝飾器
+
+    Args:
+        name: 區段名稱
+
+    Returns:
+        function: 裝飾器
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            hooks = _span_hooks
+            if not hooks:
+                return func(*args, **kwargs)
+            with _Span(name, hooks):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+class SpanRecorder:
+    """
+    彙總各區段的次數與耗時的掛鉤
+    """
+    def __init__(self):
+        """
+        初始化區段彙總
+        """
+        # 區段名稱 -> [次數, 總耗時, 最長耗時]
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, name, seconds):
+        """
+        記錄一次區段耗時
+
+        Args:
+            name: 區段名稱
+            seconds: 耗時秒數
+        """
+        with self._lock:
+            entry = self.spans.get(name)
+            if entry is None:
+                self.spans[name] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+
+    def format_lines(self):
+        """
+        將區段彙總格式化為文字（依總耗時排序）
+
+        Returns:
+            list: 文字行列表
+        """
+        with self._lock:
+            items = sorted(self.spans.items(), key=lambda item: item[1][1], reverse=True)
+        lines = []
+        for name, (count, total, longest) in items:
+            lines.append(f"{name}: {count} 次，共 {total:.3f} 秒，平均 {total / count * 1000:.2f} ms，"
+                         f"最長 {longest * 1000:.2f} ms")
+        return lines
+
+class Profiler:
+    """
+    以 cProfile 分析整次執行，並以區段掛鉤記錄主要步驟的耗時
+
+    開始後新建立的執行緒（例如平行執行與驗證的工作執行緒）各自使用一個 cProfile，
+    結束時合併為同一份統計。
+    """
+    def __init__(self, output_path, top=PROFILE_TOP_FUNCTIONS):
+        """
+        初始化效能分析
+
+        Args:
+            output_path: cProfile 統計檔路徑，摘要另寫入 <路徑>.txt
+            top: 摘要中列出的函數數量
+        """
+        self.output_path = output_path
+        self.summary_path = output_path + '.txt'
+        self.top = top
+        self.recorder = SpanRecorder()
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def _new_profile(self):
+        """
+        建立並啟用目前執行緒的 cProfile
+
+        Returns:
+            cProfile.Profile: 已啟用的 cProfile
+        """
+        import cProfile
+
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+        return profile
+
+    def _profile_thread(self, frame, event, arg):
+        """
+        新執行緒的第一個事件：改由該執行緒自己的 cProfile 接手
+        """
+        self._new_profile()
+
+    def start(self):
+        """
+        開始效能分析
+        """
+        add_span_hook(self.recorder)
+        threading.setprofile(self._profile_thread)
+        self._new_profile()
+
+    def stop(self):
+        """
+        結束效能分析，寫入 cProfile 統計檔與摘要
+
+        Returns:
+            bool: 寫入成功返回True，否則返回False
+        """
+        import pstats
+
+        threading.setprofile(None)
+        remove_span_hook(self.recorder)
+        with self._lock:
+            profiles, self._profiles = self._profiles, []
+        for profile in profiles:
+            profile.disable()
+
+        stats = None
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # 沒有任何呼叫紀錄的 cProfile
+                continue
+
+        try:
+            if stats is not None:
+                stats.dump_stats(self.output_path)
+            with open(self.summary_path, 'w', encoding='utf-8') as summary_file:
+                summary_file.write('\n'.join(self.summary_lines(stats)) + '\n')
+            return True
+        except OSError:
+            return False
+
+    def summary_lines(self, stats=None):
+        """
+        產生效能分析摘要：主要步驟的耗時，以及累計耗時與自身耗時最高的函數
+
+        Args:
+            stats: 合併後的 pstats.Stats
+
+        Returns:
+            list: 文字行列表
+        """
+        import io
+
+        lines = ['== 主要步驟 ==']
+        lines.extend(self.recorder.format_lines() or ['（沒有記錄）'])
+        if stats is not None:
+            for title, sort_key in (('累計耗時最高的函數', 'cumulative'), ('自身耗時最高的函數', 'tottime')):
+                output = io.StringIO()
+                stats.stream = output
+                stats.sort_stats(sort_key).print_stats(self.top)
+                lines.append('')
+                lines.append(f"== {title} ==")
+                lines.append(output.getvalue().strip())
+        return lines
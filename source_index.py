@@ -0,0 +1,131 @@
+"""
+來源索引模組，每個來源資料夾只列出一次，之後的存在、類型與大小查詢都從記憶體回答
+"""
+import os
+import difflib
+import threading
+from constants import SOURCE_SUGGESTION_COUNT, SOURCE_SUGGESTION_CUTOFF
+
+class SourceIndex:
+    """
+    單次執行期間共用的來源資料夾列表
+
+    設定檔常有上千列指向同幾百個來源資料夾，逐列以 os.path.exists 檢查會重複存取同一個資料夾；
+    此索引第一次查詢某資料夾下的路徑時以 os.scandir 列出整個資料夾，之後同一資料夾的查詢不再存取磁碟。
+    列表中沒有的名稱（例如本次執行前面的操作才產生的檔案，或不分大小寫的檔案系統上大小寫不同的名稱）
+    會直接檢查磁碟，因此不會把實際存在的來源誤判為不存在。
+    多個執行緒同時要求同一個資料夾時，只有一個執行緒實際列出，其他執行緒等待結果。
+    """
+    def __init__(self):
+        """
+        初始化來源索引
+        """
+        # 資料夾（os.path.normcase 後）-> {名稱: (是否為資料夾, 大小)}，無法列出時為 None
+        self._listings = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.directories_listed = 0
+
+    def listing(self, directory):
+        """
+        取得資料夾內容（每個資料夾只列出一次）
+
+        Args:
+            directory: 資料夾路徑
+
+        Returns:
+            dict: {名稱: (是否為資料夾, 大小)}，無法列出時返回None
+        """
+        key = os.path.normcase(directory)
+        while True:
+            with self._lock:
+                if key in self._listings:
+                    return self._listings[key]
+                event = self._pending.get(key)
+                if event is None:
+                    event = self._pending[key] = threading.Event()
+                    break
+            # 其他執行緒正在列出同一個資料夾
+            event.wait()
+
+        listing = None
+        try:
+            listing = self._scan(directory)
+        finally:
+            with self._lock:
+                self._listings[key] = listing
+                self.directories_listed += 1
+                self._pending.pop(key).set()
+        return listing
+
+    def _scan(self, directory):
+        """
+        列出資料夾內容
+
+        Args:
+            directory: 資料夾路徑
+
+        Returns:
+            dict: {名稱: (是否為資料夾, 大小)}，無法列出時返回None
+        """
+        listing = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                        listing[entry.name] = (is_dir, None if is_dir else entry.stat().st_size)
+                    except OSError:
+                        listing[entry.name] = (False, None)
+        except OSError:
+            return None
+        return listing
+
+    def lookup(self, path):
+        """
+        查詢路徑的狀態
+
+        Args:
+            path: 已正規化的路徑
+
+        Returns:
+            tuple: (是否存在, 是否為資料夾, 大小)；資料夾的大小為 None
+        """
+        parent, name = os.path.split(path)
+        listing = self.listing(parent) if name else None
+        if listing is not None and name in listing:
+            is_dir, size = listing[name]
+            return True, is_dir, size
+
+        # 無法列出上層資料夾（例如根目錄或沒有權限）、名稱大小寫不同或列出後才產生的路徑，直接檢查
+        if os.path.isdir(path):
+            return True, True, None
+        if os.path.isfile(path):
+            try:
+                return True, False, os.path.getsize(path)
+            except OSError:
+                return True, False, None
+        return False, False, None
+
+    def suggest(self, directory, name, limit=SOURCE_SUGGESTION_COUNT):
+        """
+        找出資料夾中與指定名稱最接近的名稱
+
+        Args:
+            directory: 資料夾路徑
+            name: 找不到的名稱
+            limit: 最多返回的名稱數量
+
+        Returns:
+            list: 相近的名稱（由近到遠），資料夾無法列出時返回None
+        """
+        listing = self.listing(directory)
+        if listing is None:
+            return None
+        # 只有大小寫不同的名稱最可能是要找的檔案
+        lowered = name.lower()
+        matches = [candidate for candidate in listing if candidate.lower() == lowered]
+        for candidate in difflib.get_close_matches(name, listing, limit, SOURCE_SUGGESTION_CUTOFF):
+            if candidate not in matches:
+                matches.append(candidate)
+        return matches[:limit]
@@ -0,0 +1,73 @@
+"""
+測試共用的設定與輔助工具
+"""
+import os
+import sys
+import csv
+import logging
+import pytest
+
+# 模組位於專案根目錄
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import (COL_FILE_PATH, COL_FILE, COL_NEW_NAME, COL_NEW_FOLDER_PATH, COL_NEW_FOLDER_PATH2,
+                       COL_NEW_FOLDER_PATH3, COL_RENAME_FOLDER)
+
+MANIFEST_COLUMNS = [COL_FILE_PATH, COL_FILE, COL_NEW_NAME, COL_NEW_FOLDER_PATH, COL_NEW_FOLDER_PATH2,
+                    COL_NEW_FOLDER_PATH3, COL_RENAME_FOLDER]
+
+class LogRecorder:
+    """
+    記錄收到的日誌訊息與層級，可作為 log_callback 使用
+    """
+    supports_level = True
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, message, level=logging.INFO):
+        self.records.append((message, level))
+
+    def messages(self, level=None):
+        """
+        取得指定層級（含以上）的訊息
+
+        Args:
+            level: 最低日誌層級，None 時返回所有訊息
+
+        Returns:
+            list: 訊息列表
+        """
+        return [message for message, record_level in self.records if level is None or record_level >= level]
+
+@pytest.fixture
+def log_recorder():
+    return LogRecorder()
+
+@pytest.fixture
+def write_manifest(tmp_path):
+    """
+    建立 CSV 設定檔，每列以欄位名稱 -> 值的字典指定
+    """
+    def write(rows, name='manifest.csv'):
+        path = tmp_path / name
+        with open(path, 'w', newline='', encoding='utf-8') as manifest:
+            writer = csv.DictWriter(manifest, fieldnames=MANIFEST_COLUMNS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+        return str(path)
+    return write
+
+def drop_finished_marker(journal_path):
+    """
+    移除操作紀錄最後的完成標記，模擬在寫入完成標記前中斷的執行
+
+    Args:
+        journal_path: 操作紀錄檔路徑
+    """
+    with open(journal_path, encoding='utf-8') as journal:
+        lines = journal.readlines()
+    assert '"finished"' in lines[-1]
+    with open(journal_path, 'w', encoding='utf-8') as journal:
+        journal.writelines(lines[:-1])
@@ -0,0 +1,52 @@
+"""
+複製後端在核心複製失敗或不完整時的備援
+"""
+import os
+import errno
+import copy_backends
+from constants import COPY_BACKEND_BUFFERED
+from copy_backends import CopyBackend
+
+def make_source(tmp_path, size=300000):
+    source = tmp_path / 'source.bin'
+    source.write_bytes(os.urandom(size))
+    return source
+
+def use_copier(monkeypatch, backend, copier):
+    monkeypatch.setitem(copy_backends._KERNEL_COPIERS, 'fake', copier)
+    backend._methods = ['fake']
+
+def test_short_kernel_copy_falls_back_to_buffered(tmp_path, monkeypatch):
+    source = make_source(tmp_path)
+    backend = CopyBackend()
+    calls = []
+
+    def short_copy(src_fd, dst_fd, size):
+        calls.append(size)
+        written = os.write(dst_fd, os.read(src_fd, size // 2))
+        return written
+
+    use_copier(monkeypatch, backend, short_copy)
+    for name in ('first.bin', 'second.bin'):
+        backend.copy_file(str(source), str(tmp_path / name))
+        assert (tmp_path / name).read_bytes() == source.read_bytes()
+
+    # 不完整的複製只影響該檔案，下一個檔案仍會先嘗試核心複製
+    assert len(calls) == 2
+    assert backend.get_report()[COPY_BACKEND_BUFFERED]['files'] == 2
+
+def test_unsupported_kernel_copy_is_not_retried(tmp_path, monkeypatch):
+    source = make_source(tmp_path)
+    backend = CopyBackend()
+    calls = []
+
+    def unsupported(src_fd, dst_fd, size):
+        calls.append(size)
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    use_copier(monkeypatch, backend, unsupported)
+    for name in ('first.bin', 'second.bin'):
+        backend.copy_file(str(source), str(tmp_path / name))
+        assert (tmp_path / name).read_bytes() == source.read_bytes()
+
+    assert len(calls) == 1
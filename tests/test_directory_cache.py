@@ -0,0 +1,40 @@
+"""
+跨多次執行共用的目錄快取
+"""
+import shutil
+from constants import COL_FILE_PATH, COL_FILE, COL_NEW_FOLDER_PATH
+from excel_processor import ExcelProcessor
+from utils import DirectoryCache
+
+def test_cache_skips_create_for_known_directories(tmp_path):
+    cache = DirectoryCache()
+    calls = []
+    create = lambda: calls.append(1) or True
+    assert cache.ensure(str(tmp_path / 'a' / 'b'), create)
+    assert cache.ensure(str(tmp_path / 'a' / 'b'), create)
+    assert cache.contains(str(tmp_path / 'a'))
+    assert len(calls) == 1
+
+def test_failed_creation_is_retried(tmp_path):
+    cache = DirectoryCache()
+    assert not cache.ensure(str(tmp_path / 'a'), lambda: False)
+    assert cache.ensure(str(tmp_path / 'a'), lambda: True)
+
+def test_shared_cache_survives_directories_removed_between_runs(tmp_path, write_manifest, log_recorder):
+    source = tmp_path / 'src'
+    source.mkdir()
+    (source / 'a.txt').write_text('a')
+    target = tmp_path / 'dst' / 'sub'
+    manifest = write_manifest([{COL_FILE_PATH: str(source), COL_FILE: 'a.txt', COL_NEW_FOLDER_PATH: str(target)}])
+    cache = DirectoryCache(revalidate=True)
+    processor = ExcelProcessor(log_callback=log_recorder, max_workers=1, directory_cache=cache,
+                               confirm_delete_callback=lambda message: False)
+
+    assert processor.read_and_process_excel(manifest)
+    assert cache.contains(str(target))
+    shutil.rmtree(tmp_path / 'dst')
+    assert processor.read_and_process_excel(manifest)
+
+    assert (target / 'a.txt').read_text() == 'a'
+    assert not processor.has_failures()
+    assert cache.contains(str(target))
@@ -0,0 +1,29 @@
+"""
+依儲存裝置排程的複製
+"""
+from file_operations import FileOperator
+from io_scheduler import IOScheduler
+
+def test_fanout_reads_source_once_across_device_groups(tmp_path, log_recorder, monkeypatch):
+    source = tmp_path / 'a.bin'
+    source.write_bytes(b'x' * 4096)
+    targets = [tmp_path / 'dst1', tmp_path / 'dst2']
+    for target in targets:
+        target.mkdir()
+    # 以掛載點設定讓兩個目標分屬不同的裝置分組
+    scheduler = IOScheduler(device_limits={str(target): 1 for target in targets}, log_callback=log_recorder)
+    assert len(scheduler.groups_for([str(source)] + [str(target) for target in targets])) == 3
+
+    operator = FileOperator(log_callback=log_recorder, io_scheduler=scheduler)
+    writes = []
+    write = operator._write_file_to_targets
+    monkeypatch.setattr(operator, '_write_file_to_targets',
+                        lambda source_path, group: writes.append(len(group)) or write(source_path, group))
+    report = {}
+    with scheduler.reporting(report):
+        copied = operator.copy_to_multiple_paths(str(source), [str(target) for target in targets])
+
+    assert sorted(copied) == sorted(str(target) for target in targets)
+    assert writes == [2]
+    assert all((target / 'a.bin').read_bytes() == source.read_bytes() for target in targets)
+    assert sum(operations for operations, _ in report.values()) == 3
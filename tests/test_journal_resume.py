@@ -0,0 +1,77 @@
+"""
+依操作紀錄繼續中斷的執行
+"""
+import os
+from constants import COL_FILE_PATH, COL_FILE, COL_NEW_FOLDER_PATH, JOURNAL_SUFFIX
+from excel_processor import ExcelProcessor
+from conftest import drop_finished_marker
+
+def make_processor(log_recorder, upfront, resume=False):
+    return ExcelProcessor(log_callback=log_recorder, confirm_delete_callback=lambda message: True,
+                          confirm_delete_upfront=upfront, max_workers=1, resume=resume)
+
+def make_sources(tmp_path):
+    source = tmp_path / 'src'
+    source.mkdir()
+    for name in ('a.txt', 'b.txt'):
+        (source / name).write_text(name)
+    return source
+
+def file_rows(source, target):
+    return [{COL_FILE_PATH: str(source), COL_FILE: name, COL_NEW_FOLDER_PATH: str(target)}
+            for name in ('a.txt', 'b.txt')]
+
+def test_resume_after_move_treats_moved_rows_as_done(tmp_path, write_manifest, log_recorder):
+    source = make_sources(tmp_path)
+    target = tmp_path / 'dst'
+    manifest = write_manifest(file_rows(source, target))
+
+    processor = make_processor(log_recorder, upfront=True)
+    assert processor.read_and_process_excel(manifest)
+    assert not (source / 'a.txt').exists()
+    assert (target / 'a.txt').read_text() == 'a.txt'
+
+    drop_finished_marker(os.path.splitext(manifest)[0] + JOURNAL_SUFFIX)
+    resumed_log = type(log_recorder)()
+    resumed = make_processor(resumed_log, upfront=True, resume=True)
+    assert resumed.read_and_process_excel(manifest)
+
+    assert not resumed.has_failures()
+    assert not any('不存在' in message for message in resumed_log.messages())
+    assert (target / 'b.txt').read_text() == 'b.txt'
+
+def test_resume_after_delete_skips_originals_already_removed(tmp_path, write_manifest, log_recorder):
+    source = make_sources(tmp_path)
+    target = tmp_path / 'dst'
+    manifest = write_manifest(file_rows(source, target))
+
+    processor = make_processor(log_recorder, upfront=False)
+    assert processor.read_and_process_excel(manifest)
+    assert not (source / 'a.txt').exists()
+
+    drop_finished_marker(os.path.splitext(manifest)[0] + JOURNAL_SUFFIX)
+    resumed_log = type(log_recorder)()
+    resumed = make_processor(resumed_log, upfront=False, resume=True)
+    assert resumed.read_and_process_excel(manifest)
+
+    assert not resumed.has_failures()
+    assert not any('不存在' in message for message in resumed_log.messages())
+    assert sorted(os.listdir(target)) == ['a.txt', 'b.txt']
+
+def test_resume_redoes_rows_that_never_completed(tmp_path, write_manifest, log_recorder):
+    source = make_sources(tmp_path)
+    target = tmp_path / 'dst'
+    manifest = write_manifest(file_rows(source, target)[:1])
+    processor = make_processor(log_recorder, upfront=False)
+    assert processor.read_and_process_excel(manifest)
+    drop_finished_marker(os.path.splitext(manifest)[0] + JOURNAL_SUFFIX)
+
+    # 加入尚未執行的資料列後繼續
+    manifest = write_manifest(file_rows(source, target))
+    resumed_log = type(log_recorder)()
+    resumed = make_processor(resumed_log, upfront=False, resume=True)
+    assert resumed.read_and_process_excel(manifest)
+
+    assert not resumed.has_failures()
+    assert (target / 'b.txt').read_text() == 'b.txt'
+    assert not (source / 'b.txt').exists()
@@ -0,0 +1,88 @@
+"""
+日誌層級在 LogSink、處理器與監看模式之間的傳遞
+"""
+import os
+import logging
+from constants import COL_FILE_PATH, COL_FILE, COL_NEW_FOLDER_PATH
+from excel_processor import ExcelProcessor
+from log_sink import LogSink, LogFile
+from watch_daemon import ManifestWatcher
+
+def test_sink_filters_display_by_level_but_logs_everything(tmp_path):
+    shown = []
+    log_file = tmp_path / 'sink.log'
+    sink = LogSink(shown.extend, level=logging.WARNING, log_file=str(log_file))
+    sink.log('細節', logging.DEBUG)
+    sink.log('注意', logging.WARNING)
+    sink.close()
+
+    assert shown == ['注意']
+    content = log_file.read_text(encoding='utf-8')
+    assert '[DEBUG] 細節' in content
+    assert '[WARNING] 注意' in content
+
+def test_sink_with_levels_emits_message_level_pairs():
+    shown = []
+    sink = LogSink(shown.extend, with_levels=True)
+    sink.log('細節', logging.DEBUG)
+    sink.log('錯誤', logging.ERROR)
+    sink.flush()
+
+    assert shown == [('細節', logging.DEBUG), ('錯誤', logging.ERROR)]
+
+def test_processor_forwards_levels_to_level_aware_callback(tmp_path, write_manifest, log_recorder):
+    manifest = write_manifest([{COL_FILE_PATH: str(tmp_path), COL_FILE: 'missing.txt',
+                                COL_NEW_FOLDER_PATH: str(tmp_path / 'dst')}])
+    processor = ExcelProcessor(log_callback=log_recorder, max_workers=1)
+    processor.read_and_process_excel(manifest)
+
+    assert any('missing.txt' in message for message in log_recorder.messages(logging.WARNING))
+    assert any(level == logging.DEBUG for _, level in log_recorder.records)
+
+def test_job_warning_reaches_watcher_sink_at_warning_level(tmp_path, write_manifest):
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    write_manifest([{COL_FILE_PATH: str(tmp_path), COL_FILE: 'missing.txt',
+                     COL_NEW_FOLDER_PATH: str(tmp_path / 'dst')}], name='inbox/job.csv')
+    shown = []
+    log_file = tmp_path / 'watch.log'
+    sink = LogSink(shown.extend, level=logging.WARNING, log_file=str(log_file))
+    watcher = ManifestWatcher(str(inbox), lambda log_callback: ExcelProcessor(log_callback=log_callback,
+                                                                               max_workers=1),
+                              use_inotify=False, log_callback=sink)
+    for directory in (watcher.processing_dir, watcher.done_dir, watcher.failed_dir):
+        os.makedirs(directory)
+    watcher._run_job('job.csv')
+    sink.close()
+
+    assert (inbox / 'failed' / 'job.csv').exists()
+    assert any('missing.txt' in message for message in shown)
+    content = log_file.read_text(encoding='utf-8')
+    assert '[DEBUG]' in content
+    assert not any('[INFO]' in line and '[DEBUG]' in line for line in content.splitlines())
+
+def test_log_file_rotates_and_keeps_backup_count(tmp_path):
+    path = tmp_path / 'app.log'
+    log_file = LogFile(str(path), max_bytes=100, backup_count=2)
+    for index in range(10):
+        log_file.write([f"{index:02d}" + 'x' * 60 + '\n'])
+    log_file.close()
+
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == ['app.log', 'app.log.1', 'app.log.2']
+    assert all(entry.stat().st_size <= 200 for entry in tmp_path.iterdir())
+    assert (tmp_path / 'app.log.1').read_text(encoding='utf-8').startswith('08')
+    assert (tmp_path / 'app.log.2').read_text(encoding='utf-8').startswith('06')
+
+def test_sinks_share_a_log_file_that_outlives_them(tmp_path):
+    path = tmp_path / 'shared.log'
+    log_file = LogFile(str(path))
+    first = LogSink(lambda lines: None, log_file=log_file)
+    second = LogSink(lambda lines: None, log_file=log_file)
+    first.log('第一頁')
+    first.close()
+    second.log('第二頁')
+    second.close()
+    log_file.close()
+
+    content = path.read_text(encoding='utf-8')
+    assert '第一頁' in content and '第二頁' in content
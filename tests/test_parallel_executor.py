@@ -0,0 +1,48 @@
+"""
+平行執行時依路徑相依關係維持 Excel 中的順序
+"""
+import time
+import threading
+from parallel_executor import PathConflictTracker, ParallelRowExecutor
+
+def test_tracker_orders_rows_on_same_or_nested_paths():
+    tracker = PathConflictTracker()
+    assert tracker.register(0, ['/data/a']) == set()
+    assert tracker.register(1, ['/data/a/file.txt']) == {0}
+    assert tracker.register(2, ['/data']) == {0, 1}
+    assert tracker.register(3, ['/other']) == set()
+
+def test_tracker_forgets_released_rows():
+    tracker = PathConflictTracker()
+    tracker.register(0, ['/data/a'])
+    tracker.register(1, ['/data/a/b'])
+    tracker.register(2, ['/data'])
+    tracker.release(0)
+    assert tracker.register(3, ['/data/a']) == {1, 2}
+    tracker.release(1)
+    tracker.release(2)
+    assert tracker.register(4, ['/data/a/b/c']) == {3}
+
+def test_executor_runs_conflicting_rows_in_order():
+    order = []
+    lock = threading.Lock()
+
+    def task(name, delay):
+        def run():
+            time.sleep(delay)
+            with lock:
+                order.append(name)
+            return name
+        return run
+
+    tasks = [
+        (['/data/a'], task('first', 0.05)),
+        (['/other'], task('independent', 0)),
+        (['/data/a/b'], task('nested', 0)),
+        (['/data'], task('parent', 0)),
+    ]
+    results = ParallelRowExecutor(4).run(tasks)
+
+    assert results == ['first', 'independent', 'nested', 'parent']
+    assert order.index('first') < order.index('nested') < order.index('parent')
+    assert order[0] == 'independent'
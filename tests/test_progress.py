@@ -0,0 +1,28 @@
+"""
+以資料列數作為進度總數的串流處理
+"""
+from constants import COL_FILE_PATH, COL_FILE, COL_NEW_FOLDER_PATH
+from excel_processor import ExcelProcessor
+from manifest_reader import count_manifest_rows
+
+def test_count_manifest_rows_skips_blank_rows(tmp_path):
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text('File Path,File\na,b\n,\nc,d\n', encoding='utf-8')
+    assert count_manifest_rows(str(manifest)) == 2
+
+def test_row_count_progress_streams_without_building_a_plan(tmp_path, write_manifest, log_recorder):
+    source = tmp_path / 'src'
+    source.mkdir()
+    for name in ('a.txt', 'b.txt'):
+        (source / name).write_text(name)
+    target = str(tmp_path / 'dst')
+    manifest = write_manifest([{COL_FILE_PATH: str(source), COL_FILE: name, COL_NEW_FOLDER_PATH: target}
+                               for name in ('a.txt', 'missing.txt', 'b.txt')])
+    processor = ExcelProcessor(log_callback=log_recorder, max_workers=1, count_rows=True,
+                               confirm_delete_callback=lambda message: False)
+    processor.read_and_process_excel(manifest)
+
+    progress = processor.get_progress()
+    assert progress['operations_total'] == 3
+    assert progress['operations_done'] == 3
+    assert processor._plan.operations == []
@@ -0,0 +1,35 @@
+"""
+直接搬移來源時的複本驗證
+"""
+from constants import COL_FILE_PATH, COL_FILE, COL_NEW_FOLDER_PATH, COL_NEW_FOLDER_PATH2
+from excel_processor import ExcelProcessor
+from verification import CopyVerifier
+
+def run_move(tmp_path, write_manifest, log_recorder):
+    source = tmp_path / 'src'
+    source.mkdir()
+    (source / 'a.txt').write_text('內容')
+    manifest = write_manifest([{COL_FILE_PATH: str(source), COL_FILE: 'a.txt',
+                                COL_NEW_FOLDER_PATH: str(tmp_path / 'dst1'),
+                                COL_NEW_FOLDER_PATH2: str(tmp_path / 'dst2')}])
+    processor = ExcelProcessor(log_callback=log_recorder, confirm_delete_callback=lambda message: True,
+                               confirm_delete_upfront=True, max_workers=1, verify=True)
+    processor.read_and_process_excel(manifest)
+    return processor, source
+
+def test_copies_are_verified_before_the_source_is_moved(tmp_path, write_manifest, log_recorder):
+    processor, source = run_move(tmp_path, write_manifest, log_recorder)
+
+    assert not (source / 'a.txt').exists()
+    assert (tmp_path / 'dst1' / 'a.txt').read_text() == '內容'
+    assert (tmp_path / 'dst2' / 'a.txt').read_text() == '內容'
+    assert not processor.has_failures()
+    assert any('1 個檔案，0 個內容不符' in message for message in log_recorder.messages())
+
+def test_source_is_kept_when_a_copy_fails_verification(tmp_path, write_manifest, log_recorder, monkeypatch):
+    monkeypatch.setattr(CopyVerifier, '_hash', lambda self, file_path: str(file_path))
+    processor, source = run_move(tmp_path, write_manifest, log_recorder)
+
+    assert (source / 'a.txt').read_text() == '內容'
+    assert not (tmp_path / 'dst2' / 'a.txt').exists()
+    assert processor.has_failures()
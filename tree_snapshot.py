@@ -0,0 +1,125 @@
+"""
+目錄樹快照模組，記錄每個目錄的修改時間與內容，讓空資料夾清理只重新列出有變更的目錄
+"""
+import os
+import json
+import time
+import threading
+from constants import SNAPSHOT_VERSION, SNAPSHOT_MTIME_GUARD
+
+class TreeSnapshot:
+    """
+    持久化的目錄樹快照
+
+    每個目錄記錄修改時間（奈秒）、非目錄項目數量、子目錄名稱與可忽略的檔案名稱。
+    目錄內新增、刪除或重新命名項目都會更新該目錄的修改時間，
+    因此修改時間不變的目錄可以直接沿用快照的內容，只需 stat 一次而不必重新列出。
+    修改時間太接近上次掃描開始時間的目錄，可能在掃描後同一時間單位內又被修改，一律重新列出。
+    """
+    def __init__(self, path, root, junk_patterns=None):
+        """
+        初始化目錄樹快照
+
+        Args:
+            path: 快照檔路徑
+            root: 清理的根目錄
+            junk_patterns: 可忽略的檔名樣式列表（與快照記錄的不同時不沿用快照）
+        """
+        self.path = path
+        self.root = root
+        self.junk_patterns = list(junk_patterns or ())
+        self._previous = {}
+        self._trusted_before = 0
+        self._current = {}
+        self._started = time.time_ns()
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.listed = 0
+
+    def load(self):
+        """
+        讀取先前的快照
+
+        Returns:
+            bool: 有可沿用的快照返回True，否則返回False
+        """
+        try:
+            with open(self.path, encoding='utf-8') as snapshot_file:
+                data = json.load(snapshot_file)
+        except (OSError, ValueError):
+            return False
+        if (data.get('version') != SNAPSHOT_VERSION or data.get('root') != self.root
+                or data.get('junk_patterns') != self.junk_patterns):
+            return False
+        self._previous = data.get('directories', {})
+        self._trusted_before = data.get('started_ns', 0) - int(SNAPSHOT_MTIME_GUARD * 1e9)
+        return True
+
+    def lookup(self, dir_path, mtime_ns):
+        """
+        取得修改時間未變更的目錄內容
+
+        Args:
+            dir_path: 目錄路徑
+            mtime_ns: 目錄目前的修改時間（奈秒）
+
+        Returns:
+            tuple: (非目錄項目數量, 子目錄名稱列表, 可忽略的檔案名稱列表)，需要重新列出時為 None
+        """
+        entry = self._previous.get(dir_path)
+        if entry is None or entry[0] != mtime_ns or mtime_ns >= self._trusted_before:
+            with self._lock:
+                self.listed += 1
+            return None
+        with self._lock:
+            self.reused += 1
+            self._current[dir_path] = entry
+        return entry[1], entry[2], entry[3]
+
+    def record(self, dir_path, mtime_ns, files, subdir_names, junk_names):
+        """
+        記錄重新列出的目錄內容
+
+        Args:
+            dir_path: 目錄路徑
+            mtime_ns: 列出前取得的修改時間（奈秒）
+            files: 非目錄項目數量（不含可忽略的檔案）
+            subdir_names: 子目錄名稱列表
+            junk_names: 可忽略的檔案名稱列表
+        """
+        with self._lock:
+            self._current[dir_path] = [mtime_ns, files, subdir_names, junk_names]
+
+    def discard(self, dir_path):
+        """
+        移除已刪除的目錄，並讓上層目錄下次重新列出
+
+        Args:
+            dir_path: 已刪除的目錄路徑
+        """
+        with self._lock:
+            self._current.pop(dir_path, None)
+            self._current.pop(os.path.dirname(dir_path), None)
+
+    def save(self):
+        """
+        寫入本次執行的快照（先寫入暫存檔再取代，中斷時不會留下不完整的快照）
+
+        Returns:
+            bool: 寫入成功返回True，否則返回False
+        """
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'root': self.root,
+            'junk_patterns': self.junk_patterns,
+            'started_ns': self._started,
+            'directories': self._current,
+        }
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as snapshot_file:
+                json.dump(data, snapshot_file, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+            return True
+        except OSError:
+            return False
@@ -2,12 +2,42 @@
 工具函數模組，提供路徑處理和日誌記錄功能
 """
 import os
+import re
 import shutil
 import logging
+import threading
+from collections import OrderedDict
+from constants import PATH_CACHE_SIZE
+from log_sink import emit_log, supports_level
 
 # 設定日誌
 logger = logging.getLogger(__name__)
 
+@supports_level
+def _log_to_logger(message, level=logging.INFO):
+    """
+    未提供日誌回呼函數時，輸出到標準日誌
+
+    Args:
+        message: 訊息內容
+        level: 日誌層級
+    """
+    logger.log(level, message)
+
+# 可顯示 ASCII 字元（32~126）以外的字元視為特殊符號
+_SPECIAL_CHARS = re.compile(r'[^\x20-\x7e]')
+
+# 路徑正規化結果的 LRU 快取：原始路徑（相對路徑另含工作目錄）-> 正規化後的路徑
+_path_cache = OrderedDict()
+_path_cache_lock = threading.Lock()
+
+def clear_path_cache():
+    """
+    清除路徑正規化快取，之後每個路徑的特殊符號提示會重新輸出一次
+    """
+    with _path_cache_lock:
+        _path_cache.clear()
+
 def normalize_path(path, log_callback=None):
     """
     正規化路徑，處理特殊符號和路徑格式
@@ -23,25 +53,38 @@ def normalize_path(path, log_callback=None):
         return None
     
     # 日誌函數處理，如果沒有提供則使用標準日誌
-    log_func = log_callback if log_callback else logger.info
+    log_func = log_callback if log_callback else _log_to_logger
     
     # 將路徑轉換為絕對路徑
     try:
         # 確保路徑是有效的 Unicode 字符串
         if not isinstance(path, str):
             path = str(path)
+
+        # 相對路徑的結果取決於目前工作目錄
+        key = path if os.path.isabs(path) else (os.getcwd(), path)
+        with _path_cache_lock:
+            normalized_path = _path_cache.get(key)
+            if normalized_path is not None:
+                _path_cache.move_to_end(key)
+                return normalized_path
             
         # 使用較安全的標準化方法
         normalized_path = os.path.abspath(os.path.normpath(path))
+
+        with _path_cache_lock:
+            first_seen = key not in _path_cache
+            _path_cache[key] = normalized_path
+            if len(_path_cache) > PATH_CACHE_SIZE:
+                _path_cache.popitem(last=False)
         
-        # 檢查是否包含非ASCII字符
-        has_special_chars = any(not (32 <= ord(c) <= 126) for c in path)
-        if has_special_chars:
-            log_func(f"路徑包含特殊符號: {path}")
+        # 檢查是否包含非ASCII字符，每個路徑只提示一次
+        if first_seen and _SPECIAL_CHARS.search(path):
+            emit_log(log_func, f"路徑包含特殊符號: {path}", logging.DEBUG)
             
         return normalized_path
     except Exception as e:
-        log_func(f"路徑規範化錯誤: {e}, 路徑: {path}")
+        emit_log(log_func, f"路徑規範化錯誤: {e}, 路徑: {path}", logging.ERROR)
         return path
 
 def safe_path_join(parts, log_callback=None):
@@ -56,7 +99,7 @@ def safe_path_join(parts, log_callback=None):
         str: 連接後的路徑
     """
     # 日誌函數處理
-    log_func = log_callback if log_callback else logger.info
+    log_func = log_callback if log_callback else _log_to_logger
     
     try:
         # 確保所有部分都被視為字符串
@@ -64,8 +107,8 @@ def safe_path_join(parts, log_callback=None):
         
         # 檢查路徑中是否包含非ASCII字符
         for part in path_parts:
-            if any(not (32 <= ord(c) <= 126) for c in part):
-                log_func(f"路徑部分包含特殊符號: {part}")
+            if _SPECIAL_CHARS.search(part):
+                emit_log(log_func, f"路徑部分包含特殊符號: {part}", logging.DEBUG)
         
         # 在Windows上，處理UNC路徑
         if os.name == 'nt' and len(path_parts) > 1 and path_parts[0].startswith('\\\\'):
@@ -75,24 +118,120 @@ def safe_path_join(parts, log_callback=None):
             
         return joined_path
     except Exception as e:
-        log_func(f"路徑連接錯誤: {e}, 路徑部分: {parts}")
+        emit_log(log_func, f"路徑連接錯誤: {e}, 路徑部分: {parts}", logging.ERROR)
         # 回退方案：使用字符串拼接
         separator = '\\' if os.name == 'nt' else '/'
         return separator.join([p.rstrip('\\').rstrip('/') for p in parts if p])
 
-def create_directory_safely(path, log_callback=None):
+class DirectoryCache:
+    """
+    單次執行期間共用的目錄快取
+
+    記錄已確認存在的目錄，讓每個目錄在一次執行中最多只檢查和建立一次；建立失敗不記錄，下次要求時重新嘗試。
+    多個執行緒同時要求同一個目錄時，只有一個執行緒實際檢查，其他執行緒等待結果。
+    """
+    def __init__(self, revalidate=False):
+        """
+        初始化目錄快取
+
+        Args:
+            revalidate: 命中快取時是否仍以 os.path.isdir 確認目錄存在（目錄可能被外部刪除時使用）
+        """
+        self.revalidate = revalidate
+        self._results = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def ensure(self, path, create):
+        """
+        確保目錄存在，快取中沒有記錄時才呼叫 create
+
+        Args:
+            path: 目錄路徑
+            create: 實際檢查並建立目錄的函數，返回是否成功
+
+        Returns:
+            bool: 目錄存在或建立成功返回True，否則返回False
+        """
+        key = os.path.normcase(path)
+        while True:
+            with self._lock:
+                if self._results.get(key):
+                    if not self.revalidate or os.path.isdir(path):
+                        return True
+                    del self._results[key]
+                event = self._pending.get(key)
+                if event is None:
+                    event = self._pending[key] = threading.Event()
+                    break
+            # 其他執行緒正在處理同一個目錄
+            event.wait()
+
+        result = False
+        try:
+            result = create()
+        finally:
+            with self._lock:
+                if result:
+                    self._results[key] = True
+                    # 目錄存在代表所有上層目錄也存在
+                    parent = os.path.dirname(key)
+                    while parent and parent != key and self._results.get(parent) is None:
+                        self._results[parent] = True
+                        key, parent = parent, os.path.dirname(parent)
+                self._pending.pop(os.path.normcase(path)).set()
+        return result
+
+    def contains(self, path):
+        """
+        檢查目錄是否已確認存在
+
+        Args:
+            path: 目錄路徑
+
+        Returns:
+            bool: 已確認存在返回True
+        """
+        with self._lock:
+            return self._results.get(os.path.normcase(path)) is True
+
+    def invalidate(self, path):
+        """
+        移除目錄及其所有子目錄的快取（目錄被刪除或取代時呼叫）
+
+        Args:
+            path: 目錄路徑
+        """
+        key = os.path.normcase(path)
+        prefix = key.rstrip(os.sep) + os.sep
+        with self._lock:
+            for cached in [cached for cached in self._results if cached == key or cached.startswith(prefix)]:
+                del self._results[cached]
+
+    def clear(self):
+        """
+        清除所有快取
+        """
+        with self._lock:
+            self._results.clear()
+
+def create_directory_safely(path, log_callback=None, cache=None):
     """
     安全地創建目錄，處理各種錯誤情況
     
     Args:
         path: 要創建的目錄路徑
         log_callback: 日誌回呼函數
+        cache: DirectoryCache，提供時每個目錄在一次執行中只檢查和建立一次
         
     Returns:
         bool: 目錄創建成功返回True，否則返回False
     """
+    if cache is not None:
+        return cache.ensure(str(path), lambda: create_directory_safely(path, log_callback))
+
     # 日誌函數處理
-    log_func = log_callback if log_callback else logger.info
+    log_func = log_callback if log_callback else _log_to_logger
     
     try:
         # 確保路徑是字符串
@@ -101,23 +240,40 @@ def create_directory_safely(path, log_callback=None):
         # 檢查目錄是否已存在
         if os.path.exists(path):
             if os.path.isdir(path):
-                log_func(f"目錄已存在: {path}")
+                emit_log(log_func, f"目錄已存在: {path}", logging.DEBUG)
                 return True
             else:
-                log_func(f"路徑存在但不是目錄: {path}")
+                emit_log(log_func, f"路徑存在但不是目錄: {path}", logging.WARNING)
                 return False
         
         # 創建目錄
         os.makedirs(path, exist_ok=True)
-        log_func(f"成功創建目錄: {path}")
+        emit_log(log_func, f"成功創建目錄: {path}", logging.DEBUG)
         return True
     except PermissionError:
-        log_func(f"沒有權限創建目錄: {path}")
+        emit_log(log_func, f"沒有權限創建目錄: {path}", logging.ERROR)
         return False
     except Exception as e:
-        log_func(f"創建目錄時發生錯誤: {e}, 路徑: {path}")
+        emit_log(log_func, f"創建目錄時發生錯誤: {e}, 路徑: {path}", logging.ERROR)
         return False
 
+def contains_files(path):
+    """
+    檢查路徑是否為檔案，或是包含至少一個檔案的目錄（含子目錄）
+
+    Args:
+        path: 檔案或目錄路徑
+
+    Returns:
+        bool: 是檔案或目錄中有檔案返回True，否則返回False
+    """
+    if not os.path.isdir(path):
+        return os.path.exists(path)
+    for _, _, filenames in os.walk(path):
+        if filenames:
+            return True
+    return False
+
 def is_directory_empty(path):
     """
     檢查目錄是否為空
@@ -138,64 +294,3 @@ def is_directory_empty(path):
     except Exception:
         # 如果檢查過程中發生錯誤，假設目錄不為空
         return False
-
-def clean_empty_directories(root_path, recursive=True, log_callback=None):
-    """
-    清理空目錄
-    
-    Args:
-        root_path: 要清理的根目錄路徑
-        recursive: 是否遞歸清理子目錄
-        log_callback: 日誌回呼函數
-        
-    Returns:
-        int: 已刪除的空目錄數量
-    """
-    # 日誌函數處理
-    log_func = log_callback if log_callback else logger.info
-    
-    # 正規化根目錄路徑
-    root_path = normalize_path(root_path, log_callback)
-    
-    if not os.path.isdir(root_path):
-        log_func(f"指定的路徑不是目錄: {root_path}")
-        return 0
-    
-    empty_dirs_count = 0
-    
-    try:
-        # 如果不是遞歸模式，僅檢查指定目錄是否為空
-        if not recursive:
-            if is_directory_empty(root_path):
-                os.rmdir(root_path)
-                log_func(f"已刪除空目錄: {root_path}")
-                return 1
-            return 0
-        
-        # 遞歸模式：從底層開始清理
-        for dirpath, dirnames, filenames in os.walk(root_path, topdown=False):
-            # 跳過根目錄本身
-            if dirpath == root_path:
-                continue
-                
-            if not dirnames and not filenames:
-                try:
-                    os.rmdir(dirpath)
-                    empty_dirs_count += 1
-                    log_func(f"已刪除空目錄: {dirpath}")
-                except Exception as e:
-                    log_func(f"刪除目錄時發生錯誤: {e}, 路徑: {dirpath}")
-        
-        # 最後檢查根目錄本身是否為空
-        if is_directory_empty(root_path):
-            try:
-                os.rmdir(root_path)
-                empty_dirs_count += 1
-                log_func(f"已刪除空目錄: {root_path}")
-            except Exception as e:
-                log_func(f"刪除目錄時發生錯誤: {e}, 路徑: {root_path}")
-                
-        return empty_dirs_count
-    except Exception as e:
-        log_func(f"清理空目錄時發生錯誤: {e}")
-        return empty_dirs_count
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""
+複製驗證模組，以雜湊值確認複本與來源內容相同
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from constants import COPY_CHUNK_SIZE, HASH_BLAKE2B, HASH_SHA256, HASH_XXH64, HASH_XXH3_128
+from log_sink import emit_log, supports_level
+
+try:
+    import xxhash
+except ImportError:  # xxhash 為選用套件
+    xxhash = None
+
+def available_algorithms():
+    """
+    取得目前環境可用的雜湊演算法
+
+    Returns:
+        list: 演算法名稱列表
+    """
+    algorithms = [HASH_BLAKE2B, HASH_SHA256]
+    if xxhash is not None:
+        algorithms += [HASH_XXH64, HASH_XXH3_128]
+    return algorithms
+
+def new_hasher(algorithm):
+    """
+    建立雜湊物件
+
+    Args:
+        algorithm: 演算法名稱
+
+    Returns:
+        雜湊物件（具有 update 與 hexdigest 方法）
+    """
+    if algorithm == HASH_BLAKE2B:
+        return hashlib.blake2b()
+    if algorithm == HASH_SHA256:
+        return hashlib.sha256()
+    if xxhash is not None and algorithm == HASH_XXH64:
+        return xxhash.xxh64()
+    if xxhash is not None and algorithm == HASH_XXH3_128:
+        return xxhash.xxh3_128()
+    raise ValueError(f"不支援的雜湊演算法: {algorithm}")
+
+def hash_file(file_path, algorithm, chunk_size=COPY_CHUNK_SIZE):
+    """
+    以固定大小的區塊串流計算檔案的雜湊值
+
+    Args:
+        file_path: 檔案路徑
+        algorithm: 演算法名稱
+        chunk_size: 每次讀取的位元組數
+
+    Returns:
+        str: 十六進位雜湊值
+    """
+    hasher = new_hasher(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as source:
+        while True:
+            read = source.readinto(buffer)
+            if not read:
+                break
+            hasher.update(view[:read])
+    return hasher.hexdigest()
+
+class CopyVerifier:
+    """
+    以執行緒池平行驗證複本
+
+    每項操作完成後立即送出驗證，與後續的複製同時進行；
+    複製時已計算的來源雜湊值會直接使用，不再讀取來源。
+    """
+    def __init__(self, algorithm=HASH_BLAKE2B, max_workers=None, chunk_size=COPY_CHUNK_SIZE, log_callback=None):
+        """
+        初始化複製驗證器
+
+        Args:
+            algorithm: 雜湊演算法名稱
+            max_workers: 驗證的工作執行緒數量，None 時使用預設值
+            chunk_size: 計算雜湊值時每次讀取的位元組數
+            log_callback: 日誌輸出回呼函數
+        """
+        new_hasher(algorithm)  # 確認演算法可用
+        self.algorithm = algorithm
+        self.chunk_size = chunk_size
+        self.log_callback = log_callback
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = []
+        self._lock = threading.Lock()
+        self.files_verified = 0
+        self.mismatches = 0
+
+    @supports_level
+    def log_message(self, message, level=logging.INFO):
+        """
+        輸出日誌訊息
+
+        Args:
+            message: 訊息內容
+            level: 日誌層級
+        """
+        if self.log_callback:
+            emit_log(self.log_callback, message, level)
+        else:
+            print(message)
+
+    def _hash(self, file_path):
+        """
+        計算檔案雜湊值（在執行緒池中執行）
+
+        Args:
+            file_path: 檔案路徑
+
+        Returns:
+            str: 十六進位雜湊值
+        """
+        return hash_file(file_path, self.algorithm, self.chunk_size)
+
+    def _start(self, copies):
+        """
+        將複本與尚未計算的來源雜湊值送入執行緒池
+
+        Args:
+            copies: (來源檔案, 目標檔案, 複製時計算的來源雜湊值或 None) 列表
+
+        Returns:
+            tuple: (來源檔案 -> 雜湊值或 Future, [(來源檔案, 目標檔案, 目標雜湊值的 Future)])
+        """
+        sources = {}
+        checks = []
+        for source_file, target_file, source_digest in copies:
+            if source_digest:
+                sources[source_file] = source_digest
+            elif source_file not in sources:
+                sources[source_file] = self._pool.submit(self._hash, source_file)
+            checks.append((source_file, target_file, self._pool.submit(self._hash, target_file)))
+        return sources, checks
+
+    def _check(self, sources, checks):
+        """
+        等待雜湊值計算完成並比對
+
+        Args:
+            sources: 來源檔案 -> 雜湊值或 Future
+            checks: [(來源檔案, 目標檔案, 目標雜湊值的 Future)]
+
+        Returns:
+            bool: 所有複本都與來源相同返回True
+        """
+        ok = True
+        for source_file, target_file, target_future in checks:
+            try:
+                source_digest = sources[source_file]
+                if not isinstance(source_digest, str):
+                    source_digest = source_digest.result()
+                target_digest = target_future.result()
+            except OSError as e:
+                self.log_message(f"驗證 {target_file} 時發生錯誤: {e}", logging.ERROR)
+                ok = False
+                continue
+            with self._lock:
+                self.files_verified += 1
+                if source_digest != target_digest:
+                    self.mismatches += 1
+            if source_digest != target_digest:
+                self.log_message(f"驗證失敗: {target_file} 與來源 {source_file} 內容不符", logging.ERROR)
+                ok = False
+        return ok
+
+    def submit(self, original, copies, on_verified=None):
+        """
+        送出一項操作的複本驗證
+
+        Args:
+            original: 操作的原始項目路徑
+            copies: (來源檔案, 目標檔案, 複製時計算的來源雜湊值或 None) 列表
+            on_verified: 全部複本驗證成功後呼叫的無參數函數
+        """
+        sources, checks = self._start(copies)
+        with self._lock:
+            self._pending.append((original, sources, checks, on_verified))
+
+    def verify(self, copies):
+        """
+        立即驗證複本並等待結果（用於來源即將被搬移、之後無法再比對的情況）
+
+        Args:
+            copies: (來源檔案, 目標檔案, 複製時計算的來源雜湊值或 None) 列表
+
+        Returns:
+            bool: 所有複本都與來源相同返回True
+        """
+        return self._check(*self._start(copies))
+
+    def results(self):
+        """
+        等待所有已送出的驗證完成
+
+        Returns:
+            set: 所有複本都與來源相同的原始項目路徑集合
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        verified = set()
+        for original, sources, checks, on_verified in pending:
+            if self._check(sources, checks):
+                verified.add(original)
+                if on_verified:
+                    on_verified()
+        return verified
+
+    def shutdown(self):
+        """
+        關閉執行緒池
+        """
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,336 @@
+"""
+監看資料夾模組：持續監看收件資料夾，自動處理放入的設定檔
+"""
+import os
+import sys
+import time
+import shutil
+import select
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from constants import (WATCH_EXTENSIONS, WATCH_POLL_INTERVAL, WATCH_SETTLE_SECONDS, WATCH_PROCESSING_DIR,
+                       WATCH_DONE_DIR, WATCH_FAILED_DIR, REPORT_SUFFIX, JOURNAL_SUFFIX)
+from log_sink import emit_log, supports_level
+
+# inotify 事件（linux/inotify.h）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+class InotifyWatch:
+    """
+    以 inotify 等待資料夾內有檔案寫入完成或移入（僅 Linux）
+    """
+    def __init__(self, path):
+        """
+        建立 inotify 監看
+
+        Args:
+            path: 監看的資料夾
+
+        Raises:
+            OSError: 系統不支援 inotify 或無法監看資料夾
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError("此系統不支援 inotify")
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失敗")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"無法監看資料夾: {path}")
+
+    def wait(self, timeout):
+        """
+        等待事件，收到事件或逾時後返回
+
+        Args:
+            timeout: 最長等待秒數
+
+        Returns:
+            bool: 收到事件返回True，逾時返回False
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # 只需要知道有變更，事件內容不解析，之後重新列出資料夾
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        """
+        關閉監看
+        """
+        os.close(self.fd)
+
+class ManifestWatcher:
+    """
+    監看收件資料夾並處理放入的設定檔
+
+    設定檔寫入完成（修改時間超過 WATCH_SETTLE_SECONDS 秒未變更）後，先移到 processing 資料夾再處理，
+    完成後連同執行報告與操作紀錄移到 done（成功）或 failed（失敗）資料夾。
+    每個工作執行緒使用一個常駐的 ExcelProcessor，所有處理器共用同一個目錄快取，
+    路徑正規化快取也在整個程序中共用，因此後續的工作不必重新建立這些快取。
+    程式中斷時留在 processing 資料夾中的設定檔，下次啟動時會依操作紀錄從中斷處繼續。
+    """
+    def __init__(self, inbox, processor_factory, done_dir=None, failed_dir=None, jobs=1,
+                 poll_interval=WATCH_POLL_INTERVAL, settle_seconds=WATCH_SETTLE_SECONDS,
+                 use_inotify=True, log_callback=None):
+        """
+        初始化資料夾監看
+
+        Args:
+            inbox: 收件資料夾
+            processor_factory: 以日誌回呼函數呼叫、返回 ExcelProcessor 的函數（每個工作執行緒呼叫一次）
+            done_dir: 成功的設定檔移入的資料夾，None 時為收件資料夾下的 done
+            failed_dir: 失敗的設定檔移入的資料夾，None 時為收件資料夾下的 failed
+            jobs: 同時處理的設定檔數量
+            poll_interval: 無法使用 inotify 時檢查收件資料夾的間隔秒數
+            settle_seconds: 設定檔修改後需經過多少秒才視為寫入完成
+            use_inotify: 是否優先使用 inotify
+            log_callback: 日誌輸出回呼函數
+        """
+        self.inbox = inbox
+        self.processor_factory = processor_factory
+        self.processing_dir = os.path.join(inbox, WATCH_PROCESSING_DIR)
+        self.done_dir = done_dir or os.path.join(inbox, WATCH_DONE_DIR)
+        self.failed_dir = failed_dir or os.path.join(inbox, WATCH_FAILED_DIR)
+        self.jobs = max(1, jobs)
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.use_inotify = use_inotify
+        self.log_callback = log_callback
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self._stop = threading.Event()
+        self._queued = set()
+        self._processors = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @supports_level
+    def log_message(self, message, level=logging.INFO):
+        """
+        輸出日誌訊息
+
+        Args:
+            message: 訊息內容
+            level: 日誌層級
+        """
+        if self.log_callback:
+            emit_log(self.log_callback, message, level)
+        else:
+            print(message)
+
+    @supports_level
+    def _job_log(self, message, level=logging.INFO):
+        """
+        處理器的日誌回呼函數，同時處理多個設定檔時在訊息前加上設定檔名稱
+
+        Args:
+            message: 訊息內容
+            level: 日誌層級
+        """
+        job = getattr(self._local, 'job', None)
+        if job and self.jobs > 1:
+            message = f"[{job}] {message}"
+        self.log_message(message, level)
+
+    def stop(self):
+        """
+        要求停止監看，執行中的工作在目前的操作完成後停止（可從任何執行緒呼叫）
+        """
+        self._stop.set()
+        with self._lock:
+            processors = list(self._processors)
+        for processor in processors:
+            processor.cancel()
+
+    def _is_manifest(self, name):
+        """
+        判斷檔名是否為要處理的設定檔（略過隱藏檔與 Excel 的暫存鎖定檔）
+
+        Args:
+            name: 檔名
+
+        Returns:
+            bool: 是設定檔返回True
+        """
+        if name.startswith('.') or name.startswith('~$'):
+            return False
+        return os.path.splitext(name)[1].lower() in WATCH_EXTENSIONS
+
+    def _ready_manifests(self):
+        """
+        列出收件資料夾中已寫入完成且尚未排入的設定檔
+
+        Returns:
+            tuple: (可處理的檔名列表, 尚在寫入中的設定檔最早何時可處理（秒數），沒有時為 None)
+        """
+        ready = []
+        wait = None
+        now = time.time()
+        try:
+            with os.scandir(self.inbox) as entries:
+                for entry in entries:
+                    if entry.name in self._queued or not self._is_manifest(entry.name):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        age = now - entry.stat().st_mtime
+                    except OSError:
+                        continue
+                    if age >= self.settle_seconds:
+                        ready.append(entry.name)
+                    else:
+                        remaining = self.settle_seconds - age
+                        wait = remaining if wait is None else min(wait, remaining)
+        except OSError as e:
+            self.log_message(f"無法讀取收件資料夾: {e}", logging.ERROR)
+        return sorted(ready), wait
+
+    def _processor(self):
+        """
+        取得目前工作執行緒的常駐 ExcelProcessor
+
+        Returns:
+            ExcelProcessor: 處理器
+        """
+        processor = getattr(self._local, 'processor', None)
+        if processor is None:
+            processor = self._local.processor = self.processor_factory(self._job_log)
+            with self._lock:
+                self._processors.append(processor)
+        return processor
+
+    def _move(self, path, directory):
+        """
+        將檔案移到指定資料夾，同名檔案已存在時在檔名前加上時間
+
+        Args:
+            path: 檔案路徑
+            directory: 目的資料夾
+
+        Returns:
+            str: 移動後的路徑
+        """
+        name = os.path.basename(path)
+        target = os.path.join(directory, name)
+        if os.path.exists(target):
+            target = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}_{name}")
+        shutil.move(path, target)
+        return target
+
+    def _run_job(self, name, resume=False):
+        """
+        處理一個設定檔（在工作執行緒中執行）
+
+        Args:
+            name: 設定檔檔名
+            resume: 是否依操作紀錄繼續先前中斷的執行
+        """
+        self._local.job = name
+        source = os.path.join(self.inbox, name)
+        manifest = os.path.join(self.processing_dir, name)
+        try:
+            if self._stop.is_set():
+                return
+            if not resume:
+                try:
+                    os.replace(source, manifest)
+                except OSError as e:
+                    self.log_message(f"無法取得設定檔 {name}: {e}", logging.WARNING)
+                    return
+
+            processor = self._processor()
+            processor.resume = resume
+            self.log_message(f"開始處理設定檔: {name}{'（繼續中斷的執行）' if resume else ''}")
+            success = False
+            try:
+                success = processor.read_and_process_excel(manifest)
+            except Exception as e:
+                self.log_message(f"處理設定檔 {name} 時發生錯誤: {e}", logging.ERROR)
+
+            if processor.cancelled:
+                # 留在 processing 資料夾，下次啟動時從中斷處繼續
+                self.log_message(f"設定檔 {name} 的處理已中斷，下次啟動時繼續", logging.WARNING)
+                return
+
+            # 部分資料列失敗時整個設定檔視為失敗，留待檢查後重新放入收件資料夾
+            success = success and not processor.has_failures()
+            destination = self.done_dir if success else self.failed_dir
+            stem = os.path.splitext(manifest)[0]
+            for path in (manifest, stem + REPORT_SUFFIX, stem + JOURNAL_SUFFIX):
+                if os.path.exists(path):
+                    self._move(path, destination)
+            with self._lock:
+                if success:
+                    self.jobs_done += 1
+                else:
+                    self.jobs_failed += 1
+            if success:
+                self.log_message(f"設定檔 {name} 處理完成，已移到 {destination}")
+            else:
+                self.log_message(f"設定檔 {name} 處理失敗，已移到 {destination}", logging.ERROR)
+        except Exception as e:
+            self.log_message(f"處理設定檔 {name} 時發生錯誤: {e}", logging.ERROR)
+        finally:
+            self._local.job = None
+            with self._lock:
+                self._queued.discard(name)
+
+    def run(self):
+        """
+        開始監看，直到呼叫 stop 為止
+        """
+        for directory in (self.processing_dir, self.done_dir, self.failed_dir):
+            os.makedirs(directory, exist_ok=True)
+
+        watch = None
+        if self.use_inotify:
+            try:
+                watch = InotifyWatch(self.inbox)
+            except OSError as e:
+                self.log_message(f"無法使用 inotify（{e}），改為每 {self.poll_interval} 秒檢查一次", logging.WARNING)
+        mode = 'inotify' if watch else f"每 {self.poll_interval} 秒檢查"
+        self.log_message(f"開始監看 {self.inbox}（{mode}，同時處理 {self.jobs} 個設定檔）")
+
+        pool = ThreadPoolExecutor(max_workers=self.jobs)
+        try:
+            # 上次中斷時留在 processing 資料夾的設定檔
+            for name in sorted(os.listdir(self.processing_dir)):
+                if self._is_manifest(name):
+                    with self._lock:
+                        self._queued.add(name)
+                    pool.submit(self._run_job, name, True)
+
+            while not self._stop.is_set():
+                ready, wait = self._ready_manifests()
+                for name in ready:
+                    with self._lock:
+                        self._queued.add(name)
+                    pool.submit(self._run_job, name)
+                timeout = self.poll_interval if wait is None else min(self.poll_interval, wait + 0.1)
+                if watch:
+                    # 仍定時醒來，確認尚在寫入的設定檔與停止要求
+                    watch.wait(timeout)
+                else:
+                    self._stop.wait(timeout)
+        finally:
+            self.stop()
+            pool.shutdown(wait=True)
+            if watch:
+                watch.close()
+            self.log_message(f"停止監看：成功 {self.jobs_done} 個，失敗 {self.jobs_failed} 個設定檔")